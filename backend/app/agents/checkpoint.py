@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+import pandas as pd
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.checkpoint.sqlite import JsonPlusSerializerCompat, SqliteSaver
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def frame_from_columns(columns: Dict[str, List[Any]], dates: List[str]) -> pd.DataFrame:
+    df = pd.DataFrame(columns)
+    if dates:
+        df["date"] = [date.fromisoformat(value) for value in dates]
+    return df
+
+
+class StateSerializer(JsonPlusSerializerCompat):
+    """JSON checkpoint serializer that also handles OHLC frames and ``date`` values.
+
+    Frames are stored column-wise, one list per column, instead of a record per row.
+    """
+
+    def _default(self, obj):
+        if isinstance(obj, pd.DataFrame):
+            columns = {
+                name: obj[name].tolist() for name in obj.columns if name != "date"
+            }
+            dates = [value.isoformat() for value in obj["date"]] if "date" in obj else []
+            return {
+                "lc": 2,
+                "type": "constructor",
+                "id": [*__name__.split("."), "frame_from_columns"],
+                "method": None,
+                "args": [],
+                "kwargs": {"columns": columns, "dates": dates},
+            }
+        if isinstance(obj, date) and not isinstance(obj, datetime):
+            return self._encode_constructor_args(
+                date, method="fromisoformat", args=[obj.isoformat()]
+            )
+        return super()._default(obj)
+
+
+class ThreadedSqliteSaver(SqliteSaver):
+    """SqliteSaver usable from ``ainvoke``: async methods run the sync ones in a thread.
+
+    One connection is shared across threads, so reads take the same lock as writes.
+    """
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        with self.lock:
+            return super().get_tuple(config)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        with self.lock:
+            items = list(super().list(config, filter=filter, before=before, limit=limit))
+        yield from items
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata)
+
+    def prune(self, older_than: timedelta) -> int:
+        """Drop every run whose newest checkpoint is older than ``older_than``."""
+        cutoff = (datetime.now(timezone.utc) - older_than).isoformat()
+        with self.lock, self.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM checkpoints WHERE thread_id IN ("
+                "SELECT thread_id FROM checkpoints GROUP BY thread_id "
+                "HAVING max(json_extract(checkpoint, '$.ts')) < ?)",
+                (cutoff,),
+            )
+            return cursor.rowcount
+
+
+_checkpointer: ThreadedSqliteSaver | None = None
+_checkpointer_lock = threading.Lock()
+
+
+def get_checkpointer() -> ThreadedSqliteSaver | None:
+    global _checkpointer
+    if not settings.graph_checkpoint_enabled:
+        return None
+    with _checkpointer_lock:
+        if _checkpointer is None:
+            path = settings.graph_checkpoint_path
+            if path != ":memory:":
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(path, check_same_thread=False)
+            _checkpointer = ThreadedSqliteSaver(conn, serde=StateSerializer())
+    return _checkpointer
+
+
+def prune_checkpoints() -> None:
+    checkpointer = get_checkpointer()
+    if checkpointer is None:
+        return
+    try:
+        removed = checkpointer.prune(timedelta(hours=settings.graph_checkpoint_retention_hours))
+        if removed:
+            logger.info(f"Pruned {removed} expired graph checkpoints")
+    except sqlite3.Error as e:
+        logger.warning(f"Pruning graph checkpoints failed: {e}")
+
+
+def run_config(thread_id: str) -> RunnableConfig:
+    return {"configurable": {"thread_id": thread_id}}
@@ -30,4 +30,6 @@ def run_data_analyst(state: Dict) -> Dict:
         "hist": latest_hist,
         "signal": signal,
     }
+    # The frame is only needed here; dropping it keeps later checkpoints small
+    state["ohlc_df"] = None
     return state
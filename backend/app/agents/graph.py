@@ -1,14 +1,41 @@
 from __future__ import annotations
 
-from typing import Dict, TypedDict
+import asyncio
+import functools
+from typing import Awaitable, Callable, Dict, List, TypedDict
 
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import END, StateGraph
 
+from app.agents.checkpoint import get_checkpointer, run_config
 from app.agents.data_analyst import run_data_analyst
-from app.agents.reporter import run_reporter_agent
-from app.agents.researcher import run_research_agent
-from app.agents.tools import fetch_ohlc, fetch_stock_id, store_analysis, store_embedding
-from app.db.client import get_pg_connection, get_supabase_client
+from app.agents.researcher import (
+    arun_batch_research_agent,
+    arun_research_agent,
+    run_batch_research_agent,
+    run_research_agent,
+)
+from app.agents.semantic_cache import (
+    afetch_prior_analyses,
+    fetch_prior_analyses,
+    run_semantic_cache,
+)
+from app.agents.tools import (
+    enqueue_embedding,
+    enqueue_embedding_async,
+    fetch_ohlc,
+    fetch_ohlc_async,
+    fetch_stock_id,
+    fetch_stock_id_async,
+    store_analysis,
+    store_analysis_async,
+)
+from app.core.config import settings
+from app.core.timing import span
+from app.db.repository import get_repository
+from app.services.embedding_batcher import get_embedding_batcher
+from app.services.embeddings import embed_text, embed_text_async
+from app.services.embedding_worker import embedding_worker
 
 
 class AnalystState(TypedDict):
@@ -21,27 +48,103 @@ class AnalystState(TypedDict):
     research_summary: str
     final_report: str
     analysis_id: str
+    reused_analysis_id: str | None
+    prior_analyses: List[Dict]
+    embedding_status: str
 
 
-def ingest_or_fetch_data(state: AnalystState) -> AnalystState:
-    supabase = get_supabase_client()
-    stock_id = fetch_stock_id(supabase, state["ticker"])
+Node = Callable[[AnalystState], AnalystState]
+
+
+def _timed(name: str, func: Node) -> Node:
+    @functools.wraps(func)
+    def wrapper(state: AnalystState) -> AnalystState:
+        with span(f"node.{name}", ticker=state.get("ticker")):
+            return func(state)
+
+    return wrapper
+
+
+def _atimed(
+    name: str, func: Callable[[AnalystState], Awaitable[AnalystState]]
+) -> Callable[[AnalystState], Awaitable[AnalystState]]:
+    @functools.wraps(func)
+    async def wrapper(state: AnalystState) -> AnalystState:
+        with span(f"node.{name}", ticker=state.get("ticker")):
+            return await func(state)
+
+    return wrapper
+
+
+def _add_node(graph: StateGraph, name: str, func: Node, afunc=None) -> None:
+    if afunc is None:
+        graph.add_node(name, _timed(name, func))
+    else:
+        graph.add_node(
+            name, RunnableLambda(_timed(name, func), afunc=_atimed(name, afunc))
+        )
+
+
+# Nodes that run in parallel with another node return only the keys they set;
+# LangGraph rejects two full-state writes to the same key within one step.
+
+
+# The a-prefixed twins await the async client, so graphs run with ainvoke keep the
+# event loop free during database round trips instead of holding an executor thread.
+
+
+def _stock_id(state: AnalystState, stock_id: str | None) -> Dict:
     if not stock_id:
         raise ValueError(f"Unknown ticker: {state['ticker']}")
+    return {"stock_id": stock_id}
+
+
+def resolve_stock(state: AnalystState) -> Dict:
+    return _stock_id(state, fetch_stock_id(get_repository(), state["ticker"]))
 
-    df = fetch_ohlc(supabase, stock_id, state["start_date"], state["end_date"])
+
+async def aresolve_stock(state: AnalystState) -> Dict:
+    return _stock_id(state, await fetch_stock_id_async(get_repository(), state["ticker"]))
+
+
+def _ohlc(df) -> Dict:
     if df.empty:
         raise ValueError("No OHLC data found for the date range")
+    return {"ohlc_df": df}
 
-    state["ohlc_df"] = df
-    state["stock_id"] = stock_id
-    return state
+
+def load_ohlc(state: AnalystState) -> Dict:
+    return _ohlc(
+        fetch_ohlc(get_repository(), state["ticker"], state["start_date"], state["end_date"])
+    )
 
 
-def store_results(state: AnalystState) -> AnalystState:
-    supabase = get_supabase_client()
+async def aload_ohlc(state: AnalystState) -> Dict:
+    repo = get_repository()
+    return _ohlc(
+        await fetch_ohlc_async(repo, state["ticker"], state["start_date"], state["end_date"])
+    )
+
+
+def store_results(state: AnalystState) -> Dict:
     analysis = store_analysis(
-        supabase,
+        get_repository(),
+        state["stock_id"],
+        state["start_date"],
+        state["end_date"],
+        state["indicators"]["rsi"],
+        state["indicators"]["macd"],
+        state["indicators"]["signal"],
+        state["final_report"],
+        hist=state["indicators"].get("hist"),
+        ticker=state["ticker"],
+    )
+    return {"analysis_id": analysis["id"]}
+
+
+async def astore_results(state: AnalystState) -> Dict:
+    analysis = await store_analysis_async(
+        get_repository(),
         state["stock_id"],
         state["start_date"],
         state["end_date"],
@@ -49,36 +152,237 @@ def store_results(state: AnalystState) -> AnalystState:
         state["indicators"]["macd"],
         state["indicators"]["signal"],
         state["final_report"],
+        hist=state["indicators"].get("hist"),
+        ticker=state["ticker"],
     )
-    state["analysis_id"] = analysis["id"]
+    return {"analysis_id": analysis["id"]}
+
+
+def _embeds_inline() -> bool:
+    return not settings.embedding_deferred and settings.embedding_cache_enabled
+
+
+def embed_report(state: AnalystState) -> Dict:
+    # The vector lands in the embedding cache, so the batcher in index_embedding only
+    # has to write it. Stores without embeddings (DuckDB) skip both nodes, since the
+    # vectors would reference analyses Postgres does not have.
+    if not get_repository().stores_embeddings:
+        return {"embedding_status": "disabled"}
+    if not _embeds_inline():
+        return {"embedding_status": "pending"}
+    embed_text(state["final_report"])
+    return {"embedding_status": "embedded"}
+
+
+async def aembed_report(state: AnalystState) -> Dict:
+    if not get_repository().stores_embeddings:
+        return {"embedding_status": "disabled"}
+    if not _embeds_inline():
+        return {"embedding_status": "pending"}
+    await embed_text_async(state["final_report"])
+    return {"embedding_status": "embedded"}
+
 
-    pg_conn = get_pg_connection()
-    try:
-        store_embedding(pg_conn, analysis["id"], state["final_report"])
-    finally:
-        pg_conn.close()
+def index_embedding(state: AnalystState) -> Dict:
+    # Separate from store_results so a resumed run never inserts the analysis twice
+    if not get_repository().stores_embeddings:
+        return {"embedding_status": "disabled"}
+    if settings.embedding_deferred:
+        # The embedding worker picks this up after the response is sent
+        enqueue_embedding(get_repository(), state["analysis_id"])
+        embedding_worker.wake()
+        return {"embedding_status": "queued"}
+    # Concurrent analyses share one embedding request and one insert
+    get_embedding_batcher().submit(state["analysis_id"], state["final_report"]).result()
+    return {"embedding_status": "stored"}
 
-    return state
+
+async def aindex_embedding(state: AnalystState) -> Dict:
+    if not get_repository().stores_embeddings:
+        return {"embedding_status": "disabled"}
+    if settings.embedding_deferred:
+        await enqueue_embedding_async(get_repository(), state["analysis_id"])
+        embedding_worker.wake()
+        return {"embedding_status": "queued"}
+    future = get_embedding_batcher().submit(state["analysis_id"], state["final_report"])
+    await asyncio.wrap_future(future)
+    return {"embedding_status": "stored"}
+
+
+def _fan_out(graph: StateGraph, source: str, targets: List[str]) -> None:
+    # Without a reducer-annotated key, LangGraph 0.0.69 allows one plain edge per node;
+    # a branch returning several destinations runs them in the same step instead
+    graph.add_conditional_edges(source, lambda state: targets, targets)
+
+
+def _add_prepare_nodes(graph: StateGraph) -> None:
+    """resolve_stock, then the OHLC fetch and prior-analysis lookup side by side."""
+    _add_node(graph, "resolve_stock", resolve_stock, aresolve_stock)
+    _add_node(graph, "load_ohlc", load_ohlc, aload_ohlc)
+    _add_node(graph, "fetch_prior_analyses", fetch_prior_analyses, afetch_prior_analyses)
+    _add_node(graph, "data_analyst", run_data_analyst)
+    _add_node(graph, "semantic_cache", run_semantic_cache)
+
+    graph.set_entry_point("resolve_stock")
+    _fan_out(graph, "resolve_stock", ["load_ohlc", "fetch_prior_analyses"])
+    graph.add_edge("load_ohlc", "data_analyst")
+    graph.add_edge(["data_analyst", "fetch_prior_analyses"], "semantic_cache")
+
+
+# Run in this order. store_results comes first on its own: when a failing node shares a
+# step with a parallel sibling, LangGraph 0.0.69 can surface a KeyError instead of the
+# node's exception, hiding the real insert error.
+PERSIST_NODES = ["store_results", "embed_report", "index_embedding"]
+
+
+def route_after_semantic_cache(state: Dict) -> str:
+    # A reused thesis skips research and goes straight to persistence
+    return PERSIST_NODES[0] if state.get("reused_analysis_id") else "research"
+
+
+def _add_persist_nodes(graph: StateGraph) -> None:
+    """The analysis insert, then the embedding call, then the embedding write."""
+    _add_node(graph, "store_results", store_results, astore_results)
+    _add_node(graph, "embed_report", embed_report, aembed_report)
+    _add_node(graph, "index_embedding", index_embedding, aindex_embedding)
+
+    for source, target in zip(PERSIST_NODES, PERSIST_NODES[1:]):
+        graph.add_edge(source, target)
+    graph.add_edge(PERSIST_NODES[-1], END)
 
 
 def build_graph():
     graph = StateGraph(AnalystState)
-    graph.add_node("ingest_or_fetch_data", ingest_or_fetch_data)
-    graph.add_node("data_analyst", run_data_analyst)
-    graph.add_node("research", run_research_agent)
-    graph.add_node("reporter", run_reporter_agent)
-    graph.add_node("store_results", store_results)
+    _add_prepare_nodes(graph)
+    _add_node(graph, "research", run_research_agent, arun_research_agent)
+    _add_persist_nodes(graph)
+
+    graph.add_conditional_edges(
+        "semantic_cache", route_after_semantic_cache, ["research", PERSIST_NODES[0]]
+    )
+    graph.add_edge("research", PERSIST_NODES[0])
+
+    return graph.compile(checkpointer=get_checkpointer())
+
+
+def _invoke(app, state: Dict, thread_id: str | None) -> Dict:
+    """Run ``app`` under ``thread_id``, resuming after the last completed node if one failed.
+
+    A run that already finished returns its stored result without re-running any node.
+    """
+    if thread_id is None or app.checkpointer is None:
+        return app.invoke(state)
+    config = run_config(thread_id)
+    snapshot = app.get_state(config)
+    if snapshot.next:
+        return app.invoke(None, config)
+    if snapshot.values:
+        return snapshot.values
+    return app.invoke(state, config)
+
 
-    graph.set_entry_point("ingest_or_fetch_data")
-    graph.add_edge("ingest_or_fetch_data", "data_analyst")
-    graph.add_edge("data_analyst", "research")
-    graph.add_edge("research", "reporter")
-    graph.add_edge("reporter", "store_results")
-    graph.add_edge("store_results", END)
+async def _ainvoke(app, state: Dict, thread_id: str | None) -> Dict:
+    if thread_id is None or app.checkpointer is None:
+        return await app.ainvoke(state)
+    config = run_config(thread_id)
+    snapshot = await app.aget_state(config)
+    if snapshot.next:
+        return await app.ainvoke(None, config)
+    if snapshot.values:
+        return snapshot.values
+    return await app.ainvoke(state, config)
 
-    return graph.compile()
+
+def run_graph(initial_state: Dict, thread_id: str | None = None) -> Dict:
+    app = build_graph()
+    return _invoke(app, initial_state, thread_id)
 
 
-def run_graph(initial_state: Dict) -> Dict:
+async def run_graph_async(initial_state: Dict, thread_id: str | None = None) -> Dict:
+    # Database and Gemini calls are awaited on the event loop; the CPU-bound data
+    # analyst and semantic cache nodes run in the default executor
     app = build_graph()
-    return app.invoke(initial_state)
+    return await _ainvoke(app, initial_state, thread_id)
+
+
+def build_prepare_graph():
+    graph = StateGraph(AnalystState)
+    _add_prepare_nodes(graph)
+    graph.add_edge("semantic_cache", END)
+    return graph.compile(checkpointer=get_checkpointer())
+
+
+def build_finalize_graph():
+    graph = StateGraph(AnalystState)
+    _add_persist_nodes(graph)
+    graph.set_entry_point(PERSIST_NODES[0])
+    return graph.compile(checkpointer=get_checkpointer())
+
+
+def _thread(thread_ids: List[str] | None, index: int, stage: str) -> str | None:
+    return None if thread_ids is None else f"{thread_ids[index]}:{stage}"
+
+
+def _needs_research(finalize, state: Dict, thread_id: str | None) -> bool:
+    if state.get("reused_analysis_id"):
+        return False
+    # A finalize checkpoint already holds the thesis from an earlier attempt
+    if thread_id is not None and finalize.checkpointer is not None:
+        return not finalize.get_state(run_config(thread_id)).values
+    return True
+
+
+def run_graph_batch(
+    initial_states: List[Dict], thread_ids: List[str] | None = None
+) -> List[Dict]:
+    """Run a basket of tickers, sharing Gemini requests across the research step."""
+    prepare = build_prepare_graph()
+    finalize = build_finalize_graph()
+
+    prepared = [
+        _invoke(prepare, state, _thread(thread_ids, i, "prepare"))
+        for i, state in enumerate(initial_states)
+    ]
+    with span("node.research_batch"):
+        run_batch_research_agent(
+            [
+                state
+                for i, state in enumerate(prepared)
+                if _needs_research(finalize, state, _thread(thread_ids, i, "finalize"))
+            ]
+        )
+    return [
+        _invoke(finalize, state, _thread(thread_ids, i, "finalize"))
+        for i, state in enumerate(prepared)
+    ]
+
+
+async def run_graph_batch_async(
+    initial_states: List[Dict], thread_ids: List[str] | None = None
+) -> List[Dict]:
+    prepare = build_prepare_graph()
+    finalize = build_finalize_graph()
+
+    prepared = await asyncio.gather(
+        *(
+            _ainvoke(prepare, state, _thread(thread_ids, i, "prepare"))
+            for i, state in enumerate(initial_states)
+        )
+    )
+    pending = [
+        state
+        for i, state in enumerate(prepared)
+        if await asyncio.to_thread(
+            _needs_research, finalize, state, _thread(thread_ids, i, "finalize")
+        )
+    ]
+    with span("node.research_batch"):
+        await arun_batch_research_agent(pending)
+    return list(
+        await asyncio.gather(
+            *(
+                _ainvoke(finalize, state, _thread(thread_ids, i, "finalize"))
+                for i, state in enumerate(prepared)
+            )
+        )
+    )
@@ -1,9 +0,0 @@
-from __future__ import annotations
-
-from typing import Dict
-
-
-def run_reporter_agent(state: Dict) -> Dict:
-    # Report already generated in researcher agent
-    # This is now a no-op but kept for graph compatibility
-    return state
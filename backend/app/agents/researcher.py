@@ -1,18 +1,43 @@
 from __future__ import annotations
 
-from typing import Dict
+import json
+import logging
+import time
+from typing import Dict, List
 
-from app.services.summarizer import generate_text
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.summarizer import estimate_tokens, generate_text, generate_text_async
 
+logger = logging.getLogger(__name__)
 
-def run_research_agent(state: Dict) -> Dict:
+BATCH_PROMPT_HEADER = (
+    "You are an equity research analyst. "
+    "For each ticker below, provide a comprehensive investment analysis "
+    "based on its technical indicators.\n\n"
+    "Respond with a JSON array only, one object per ticker, in this shape:\n"
+    '[{"ticker": "<ticker>", '
+    '"research_notes": "<3-5 bullet points on trend strength and risks>", '
+    '"investment_thesis": "<professional thesis statement, key risks, '
+    'and one-line conclusion>"}]\n\n'
+)
+
+
+def _indicator_block(state: Dict) -> str:
     indicators = state.get("indicators", {})
-    ticker = state["ticker"]
-    start_date = state["start_date"]
-    end_date = state["end_date"]
+    return (
+        f"Ticker: {state['ticker']}\n"
+        f"Date range: {state['start_date']} to {state['end_date']}\n"
+        f"RSI: {indicators.get('rsi', 0):.2f}\n"
+        f"MACD: {indicators.get('macd', 0):.2f}\n"
+        f"Histogram: {indicators.get('hist', 0):.2f}\n"
+        f"Signal: {indicators.get('signal', 'neutral')}\n"
+    )
+
 
+def _build_prompt(state: Dict) -> str:
     # Combined prompt for both research and final report
-    prompt = (
+    return (
         "You are an equity research analyst. "
         "Based on the technical indicators below, provide a comprehensive investment analysis.\n\n"
         "Format your response as:\n"
@@ -20,19 +45,138 @@ def run_research_agent(state: Dict) -> Dict:
         "[3-5 bullet points on trend strength and risks]\n\n"
         "INVESTMENT THESIS:\n"
         "[Professional thesis statement, key risks, and one-line conclusion]\n\n"
-        f"Ticker: {ticker}\n"
-        f"Date range: {start_date} to {end_date}\n"
-        f"RSI: {indicators.get('rsi', 0):.2f}\n"
-        f"MACD: {indicators.get('macd', 0):.2f}\n"
-        f"Histogram: {indicators.get('hist', 0):.2f}\n"
-        f"Signal: {indicators.get('signal', 'neutral')}\n"
+        f"{_indicator_block(state)}"
     )
 
-    response = generate_text(prompt)
 
+def _apply_response(state: Dict, response: str) -> Dict:
     # Parse response into research and final report
     parts = response.split("INVESTMENT THESIS:")
     state["research_summary"] = parts[0].replace("RESEARCH NOTES:", "").strip()
     state["final_report"] = parts[1].strip() if len(parts) > 1 else response.strip()
-
     return state
+
+
+def run_research_agent(state: Dict) -> Dict:
+    started = time.monotonic()
+    response = generate_text(_build_prompt(state))
+    metrics.observe("research_generation_seconds", time.monotonic() - started)
+    return _apply_response(state, response)
+
+
+async def arun_research_agent(state: Dict) -> Dict:
+    started = time.monotonic()
+    response = await generate_text_async(_build_prompt(state))
+    metrics.observe("research_generation_seconds", time.monotonic() - started)
+    return _apply_response(state, response)
+
+
+def build_batch_prompt(states: List[Dict]) -> str:
+    blocks = "\n".join(_indicator_block(state) for state in states)
+    return BATCH_PROMPT_HEADER + blocks
+
+
+def parse_batch_response(response: str) -> Dict[str, Dict[str, str]]:
+    """Parse a batched JSON response into research notes and thesis per ticker.
+
+    Raises ValueError when the response is not a JSON array of ticker objects.
+    """
+    text = response.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+
+    try:
+        items = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Batched research response is not valid JSON: {e}") from e
+    if not isinstance(items, list):
+        raise ValueError("Batched research response is not a JSON array")
+
+    parsed: Dict[str, Dict[str, str]] = {}
+    for item in items:
+        if not isinstance(item, dict) or not item.get("ticker"):
+            continue
+        thesis = str(item.get("investment_thesis") or "").strip()
+        if not thesis:
+            continue
+        parsed[str(item["ticker"])] = {
+            "research_summary": str(item.get("research_notes") or "").strip(),
+            "final_report": thesis,
+        }
+    return parsed
+
+
+def plan_batches(states: List[Dict]) -> List[List[Dict]]:
+    """Group states into batches that fit the configured prompt and output token budgets."""
+    input_budget = settings.research_batch_max_input_tokens - estimate_tokens(BATCH_PROMPT_HEADER)
+    per_ticker_output = settings.research_batch_output_tokens_per_ticker
+    max_size = max(
+        1,
+        min(
+            settings.research_batch_max_tickers,
+            settings.research_batch_max_output_tokens // per_ticker_output,
+        ),
+    )
+
+    batches: List[List[Dict]] = []
+    current: List[Dict] = []
+    used = 0
+    for state in states:
+        cost = estimate_tokens(_indicator_block(state))
+        if current and (len(current) >= max_size or used + cost > input_budget):
+            batches.append(current)
+            current, used = [], 0
+        current.append(state)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _parse_or_empty(batch: List[Dict], response: str) -> Dict[str, Dict[str, str]]:
+    try:
+        return parse_batch_response(response)
+    except ValueError as e:
+        logger.warning(f"Batched research failed for {len(batch)} tickers: {e}")
+        return {}
+
+
+def _apply_batch(batch: List[Dict], parsed: Dict[str, Dict[str, str]]) -> List[Dict]:
+    """Copy parsed results into states and return the states that still need a report."""
+    missing = []
+    for state in batch:
+        result = parsed.get(state["ticker"])
+        if result is None:
+            logger.info(f"Falling back to single research request for {state['ticker']}")
+            missing.append(state)
+        else:
+            state.update(result)
+    return missing
+
+
+def run_batch_research_agent(states: List[Dict]) -> List[Dict]:
+    """Research several tickers per Gemini request, falling back to single requests."""
+    for batch in plan_batches(states):
+        if len(batch) == 1:
+            run_research_agent(batch[0])
+            continue
+
+        parsed = _parse_or_empty(batch, generate_text(build_batch_prompt(batch)))
+        for state in _apply_batch(batch, parsed):
+            run_research_agent(state)
+
+    return states
+
+
+async def arun_batch_research_agent(states: List[Dict]) -> List[Dict]:
+    for batch in plan_batches(states):
+        if len(batch) == 1:
+            await arun_research_agent(batch[0])
+            continue
+
+        parsed = _parse_or_empty(batch, await generate_text_async(build_batch_prompt(batch)))
+        for state in _apply_batch(batch, parsed):
+            await arun_research_agent(state)
+
+    return states
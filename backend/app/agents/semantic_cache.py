@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import logging
+from datetime import date
+from typing import Dict
+
+from app.agents.tools import fetch_recent_analyses, fetch_recent_analyses_async
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.repository import get_repository
+
+logger = logging.getLogger(__name__)
+
+
+def _window_days(start_date: str, end_date: str) -> int:
+    return (date.fromisoformat(end_date) - date.fromisoformat(start_date)).days
+
+
+def _adapt_thesis(summary: str, prior: Dict, state: Dict) -> str:
+    # Theses quote their own window; point it at the window we were asked about
+    return summary.replace(prior["date_range_start"], state["start_date"]).replace(
+        prior["date_range_end"], state["end_date"]
+    )
+
+
+def fetch_prior_analyses(state: Dict) -> Dict:
+    """Load recent analyses of the stock so the cache check can run once indicators exist."""
+    if not settings.semantic_cache_enabled:
+        return {"prior_analyses": []}
+    priors = fetch_recent_analyses(
+        get_repository(),
+        state["stock_id"],
+        state["end_date"],
+        end_date_tolerance_days=settings.semantic_cache_end_date_tolerance_days,
+    )
+    return {"prior_analyses": priors}
+
+
+async def afetch_prior_analyses(state: Dict) -> Dict:
+    if not settings.semantic_cache_enabled:
+        return {"prior_analyses": []}
+    priors = await fetch_recent_analyses_async(
+        get_repository(),
+        state["stock_id"],
+        state["end_date"],
+        end_date_tolerance_days=settings.semantic_cache_end_date_tolerance_days,
+    )
+    return {"prior_analyses": priors}
+
+
+def _indicators_match(prior: Dict, indicators: Dict) -> bool:
+    tolerances = (
+        ("rsi", settings.semantic_cache_rsi_tolerance),
+        ("macd", settings.semantic_cache_macd_tolerance),
+        ("hist", settings.semantic_cache_hist_tolerance),
+    )
+    if prior.get("signal") != indicators["signal"]:
+        return False
+    for name, tolerance in tolerances:
+        value = prior.get(name)
+        if value is None or abs(float(value) - indicators[name]) > tolerance:
+            return False
+    return True
+
+
+def run_semantic_cache(state: Dict) -> Dict:
+    """Reuse a prior thesis when the indicators and window barely moved since it was written.
+
+    Returns only the keys it sets, so it can join parallel branches of the graph.
+    """
+    if not settings.semantic_cache_enabled:
+        return {"reused_analysis_id": None}
+
+    window = _window_days(state["start_date"], state["end_date"])
+    for prior in state.get("prior_analyses") or []:
+        if not _indicators_match(prior, state["indicators"]):
+            continue
+        prior_window = _window_days(prior["date_range_start"], prior["date_range_end"])
+        if abs(prior_window - window) > settings.semantic_cache_window_tolerance_days:
+            continue
+        if not prior.get("summary"):
+            continue
+
+        logger.info(f"Reusing analysis {prior['id']} for {state['ticker']}")
+        metrics.increment("semantic_cache_lookups_total", result="hit")
+        metrics.increment(
+            "semantic_cache_saved_seconds_total",
+            metrics.summary_mean("research_generation_seconds"),
+        )
+        return {
+            "final_report": _adapt_thesis(prior["summary"], prior, state),
+            "research_summary": "",
+            "reused_analysis_id": prior["id"],
+        }
+
+    metrics.increment("semantic_cache_lookups_total", result="miss")
+    return {"reused_analysis_id": None}
+
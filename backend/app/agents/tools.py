@@ -1,43 +1,170 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
 
+import numpy as np
 import pandas as pd
 
-from app.db.models import ANALYSES_TABLE, EMBEDDINGS_TABLE, OHLC_TABLE, STOCKS_TABLE
-from app.services.embeddings import embed_text
+from app.core.config import settings
+from app.core.timing import traced
+from app.db.models import EMBEDDINGS_TABLE
+from app.db.repository import Repository
+from app.services.data_versions import ANALYSES, data_versions
+from app.services.ohlc_store import ohlc_store
+from app.services.read_cache import read_cache
 
 
-def fetch_stock_id(supabase, ticker: str) -> str | None:
-    result = supabase.table(STOCKS_TABLE).select("id").eq("ticker", ticker).execute()
-    if not result.data:
-        return None
-    return result.data[0]["id"]
+@traced("db.fetch_stock_id")
+def _query_stock_id(repo: Repository, ticker: str) -> str | None:
+    return repo.find_stock_id(ticker)
+
+
+@traced("db.fetch_stock_id")
+async def _query_stock_id_async(repo: Repository, ticker: str) -> str | None:
+    return await repo.find_stock_id_async(ticker)
+
+
+def fetch_stock_id(repo: Repository, ticker: str) -> str | None:
+    return read_cache.get_or_load("stock_id", ticker, lambda: _query_stock_id(repo, ticker))
+
+
+async def fetch_stock_id_async(repo: Repository, ticker: str) -> str | None:
+    return await read_cache.get_or_load_async(
+        "stock_id", ticker, lambda: _query_stock_id_async(repo, ticker)
+    )
+
+
+def ohlc_columns(
+    repo: Repository,
+    ticker: str,
+    start_date: str | None = None,
+    end_date: str | None = None,
+) -> Dict[str, np.ndarray] | None:
+    """Date-ordered OHLC arrays for ``ticker``, or None if the ticker is unknown.
+
+    With the OHLC store or the read cache on this is the full history and the range is
+    only a hint; callers always narrow the result with ``date_window``.
+    """
+
+    def load(start: str | None = None, end: str | None = None) -> Dict[str, np.ndarray] | None:
+        stock_id = fetch_stock_id(repo, ticker)
+        if stock_id is None:
+            return None
+        return repo.ohlc_columns(stock_id, start, end)
+
+    if ohlc_store.enabled:
+        # Memory-mapped from disk, so there is nothing for the read cache to add
+        return ohlc_store.get_or_fill(ticker, load)
+    if not read_cache.enabled:
+        return load(start_date, end_date)
+    return read_cache.get_or_load("ohlc", ticker, load)
+
+
+async def ohlc_columns_async(
+    repo: Repository,
+    ticker: str,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    stamp: str | None = None,
+    after: str | None = None,
+    limit: int | None = None,
+) -> Dict[str, np.ndarray] | None:
+    """``ohlc_columns`` over the repository's async methods.
+
+    ``stamp`` is the persisted write state a request was validated against; a cached
+    history loaded under another stamp is refreshed first. ``after`` and ``limit``
+    page the query when nothing is cached, so only the requested bars are read.
+    """
+
+    async def load(
+        start: str | None = None,
+        end: str | None = None,
+        after: str | None = None,
+        limit: int | None = None,
+    ) -> Dict[str, np.ndarray] | None:
+        stock_id = await fetch_stock_id_async(repo, ticker)
+        if stock_id is None:
+            return None
+        return await repo.ohlc_columns_async(stock_id, start, end, after, limit)
+
+    if ohlc_store.enabled:
+        return await ohlc_store.get_or_fill_async(ticker, load, stamp)
+    if not read_cache.enabled:
+        return await load(start_date, end_date, after, limit)
+    return await read_cache.get_or_load_async("ohlc", ticker, load, stamp)
+
+
+def date_window(
+    dates: np.ndarray,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    after: str | None = None,
+) -> slice:
+    """Slice of ISO ``dates`` within [start_date, end_date] and strictly after ``after``."""
+    lo = int(np.searchsorted(dates, start_date, "left")) if start_date else 0
+    if after:
+        lo = max(lo, int(np.searchsorted(dates, after, "right")))
+    hi = int(np.searchsorted(dates, end_date, "right")) if end_date else len(dates)
+    return slice(lo, max(lo, hi))
+
+
+def _ohlc_frame(
+    columns: Dict[str, np.ndarray] | None, start_date: str, end_date: str
+) -> pd.DataFrame:
+    if columns is None:
+        return pd.DataFrame()
+    window = date_window(columns["date"], start_date, end_date)
+    df = pd.DataFrame({name: values[window] for name, values in columns.items()})
+    # numpy parses ISO dates in C and yields datetime.date objects without pandas' inference
+    df["date"] = columns["date"][window].astype("datetime64[D]").astype(object)
+    return df
 
 
 def fetch_ohlc(
-    supabase,
-    stock_id: str,
+    repo: Repository,
+    ticker: str,
     start_date: str,
     end_date: str,
 ) -> pd.DataFrame:
-    result = (
-        supabase.table(OHLC_TABLE)
-        .select("date,open,high,low,close,volume")
-        .eq("stock_id", stock_id)
-        .gte("date", start_date)
-        .lte("date", end_date)
-        .order("date")
-        .execute()
-    )
-    df = pd.DataFrame(result.data)
-    if not df.empty:
-        df["date"] = pd.to_datetime(df["date"]).dt.date
-    return df
+    columns = ohlc_columns(repo, ticker, start_date, end_date)
+    return _ohlc_frame(columns, start_date, end_date)
+
+
+async def fetch_ohlc_async(
+    repo: Repository,
+    ticker: str,
+    start_date: str,
+    end_date: str,
+) -> pd.DataFrame:
+    columns = await ohlc_columns_async(repo, ticker, start_date, end_date)
+    return _ohlc_frame(columns, start_date, end_date)
+
+
+def _analysis_row(
+    stock_id: str,
+    start_date: str,
+    end_date: str,
+    rsi: float,
+    macd: float,
+    signal: str,
+    summary: str,
+    hist: float | None,
+) -> Dict[str, Any]:
+    return {
+        "stock_id": stock_id,
+        "date_range_start": start_date,
+        "date_range_end": end_date,
+        "rsi": rsi,
+        "macd": macd,
+        "signal": signal,
+        "hist": hist,
+        "summary": summary,
+    }
 
 
+@traced("db.store_analysis")
 def store_analysis(
-    supabase,
+    repo: Repository,
     stock_id: str,
     start_date: str,
     end_date: str,
@@ -45,32 +172,92 @@ def store_analysis(
     macd: float,
     signal: str,
     summary: str,
+    hist: float | None = None,
+    ticker: str | None = None,
 ) -> Dict[str, Any]:
-    inserted = (
-        supabase.table(ANALYSES_TABLE)
-        .insert(
-            {
-                "stock_id": stock_id,
-                "date_range_start": start_date,
-                "date_range_end": end_date,
-                "rsi": rsi,
-                "macd": macd,
-                "signal": signal,
-                "summary": summary,
-            }
-        )
-        .execute()
-    )
-    analysis = inserted.data[0]
+    row = _analysis_row(stock_id, start_date, end_date, rsi, macd, signal, summary, hist)
+    analysis = repo.insert_analysis(row)
+    if ticker is not None:
+        data_versions.bump(ANALYSES, ticker)
+    return analysis
+
+
+@traced("db.store_analysis")
+async def store_analysis_async(
+    repo: Repository,
+    stock_id: str,
+    start_date: str,
+    end_date: str,
+    rsi: float,
+    macd: float,
+    signal: str,
+    summary: str,
+    hist: float | None = None,
+    ticker: str | None = None,
+) -> Dict[str, Any]:
+    row = _analysis_row(stock_id, start_date, end_date, rsi, macd, signal, summary, hist)
+    analysis = await repo.insert_analysis_async(row)
+    if ticker is not None:
+        data_versions.bump(ANALYSES, ticker)
     return analysis
 
 
-def store_embedding(pg_conn, analysis_id: str, summary: str) -> List[float]:
-    embedding = embed_text(summary)
+@traced("db.fetch_recent_analyses")
+def fetch_recent_analyses(
+    repo: Repository,
+    stock_id: str,
+    end_date: str,
+    end_date_tolerance_days: int,
+    limit: int = 20,
+) -> List[Dict[str, Any]]:
+    """Return the newest analyses of the stock whose window ends near ``end_date``.
+
+    Indicator matching happens in the caller, so this can run before indicators exist.
+    """
+    return repo.recent_analyses(stock_id, end_date, end_date_tolerance_days, limit)
+
+
+@traced("db.fetch_recent_analyses")
+async def fetch_recent_analyses_async(
+    repo: Repository,
+    stock_id: str,
+    end_date: str,
+    end_date_tolerance_days: int,
+    limit: int = 20,
+) -> List[Dict[str, Any]]:
+    return await repo.recent_analyses_async(stock_id, end_date, end_date_tolerance_days, limit)
+
+
+@traced("db.store_embeddings")
+def store_embeddings(
+    pg_conn, items: List[Tuple[str, List[float]]], commit: bool = True
+) -> None:
+    """Insert several analysis embeddings with a single multi-row INSERT.
+
+    Analyses that already have an embedding are skipped, so replays are harmless.
+    Rows record ``GEMINI_EMBEDDING_MODEL`` as the model that produced them.
+    """
+    if not items:
+        return
+    placeholders = ", ".join(["(%s, %s, %s)"] * len(items))
+    params: List[Any] = []
+    for analysis_id, embedding in items:
+        params.extend((analysis_id, embedding, settings.gemini_embedding_model))
     with pg_conn.cursor() as cursor:
         cursor.execute(
-            "INSERT INTO analysis_embeddings (analysis_id, embedding, model) VALUES (%s, %s, %s)",
-            (analysis_id, embedding, "gemini"),
+            f"INSERT INTO {EMBEDDINGS_TABLE} (analysis_id, embedding, model) "
+            f"VALUES {placeholders} ON CONFLICT (analysis_id) DO NOTHING",
+            params,
         )
-    pg_conn.commit()
-    return embedding
+    if commit:
+        pg_conn.commit()
+
+
+@traced("db.enqueue_embedding")
+def enqueue_embedding(repo: Repository, analysis_id: str) -> None:
+    repo.enqueue_embedding(analysis_id)
+
+
+@traced("db.enqueue_embedding")
+async def enqueue_embedding_async(repo: Repository, analysis_id: str) -> None:
+    await repo.enqueue_embedding_async(analysis_id)
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+import asyncio
+import uuid
 from pathlib import Path
 
 from fastapi import APIRouter
 
-from app.agents.graph import run_graph
+from app.agents.graph import run_graph_async, run_graph_batch_async
+from app.core.timing import current_timings
 from app.schemas.requests import AnalyzeRequest
 from app.schemas.responses import AnalyzeResponse, AnalysisResult
 
@@ -22,25 +25,45 @@ def extract_ticker(ticker_str: str) -> str:
 
 @router.post("/analyze", response_model=AnalyzeResponse)
 async def analyze(request: AnalyzeRequest):
-    results = []
-    for ticker in request.tickers:
-        clean_ticker = extract_ticker(ticker)
-        state = run_graph(
-            {
-                "ticker": clean_ticker,
-                "start_date": request.start_date,
-                "end_date": request.end_date,
-            }
-        )
+    tickers = [extract_ticker(ticker) for ticker in request.tickers]
+    # Retrying with the same run_id resumes each ticker from its last completed node; the
+    # inputs are part of the thread, so a reused run_id with other dates starts a new run
+    run_id = request.run_id or uuid.uuid4().hex
+    thread_ids = [
+        f"{run_id}:{ticker}:{request.start_date}:{request.end_date}" for ticker in tickers
+    ]
+    initial_states = [
+        {
+            "ticker": ticker,
+            "start_date": request.start_date,
+            "end_date": request.end_date,
+        }
+        for ticker in tickers
+    ]
 
-        results.append(
-            AnalysisResult(
-                ticker=clean_ticker,
-                date_range={"start": request.start_date, "end": request.end_date},
-                indicators=state.get("indicators", {}),
-                thesis=state.get("final_report", ""),
-                analysis_id=state.get("analysis_id", ""),
+    if request.batch_research and len(initial_states) > 1:
+        states = await run_graph_batch_async(initial_states, thread_ids)
+    else:
+        states = await asyncio.gather(
+            *(
+                run_graph_async(initial_state, thread_id)
+                for initial_state, thread_id in zip(initial_states, thread_ids)
             )
         )
 
-    return AnalyzeResponse(results=results)
+    results = [
+        AnalysisResult(
+            ticker=ticker,
+            date_range={"start": request.start_date, "end": request.end_date},
+            indicators=state.get("indicators", {}),
+            thesis=state.get("final_report", ""),
+            analysis_id=state.get("analysis_id", ""),
+            reused_analysis_id=state.get("reused_analysis_id"),
+        )
+        for ticker, state in zip(tickers, states)
+    ]
+
+    timings = current_timings()
+    if timings is not None and timings.debug:
+        return AnalyzeResponse(run_id=run_id, results=results, timings=timings.breakdown())
+    return AnalyzeResponse(run_id=run_id, results=results)
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.client import pool_stats
+from app.schemas.responses import ModelHealthInfo, ModelHealthResponse
+from app.services.model_health import model_health
+
+router = APIRouter()
+
+
+@router.get("/health/models", response_model=ModelHealthResponse, tags=["health"])
+async def get_model_health() -> ModelHealthResponse:
+    """Circuit-breaker state and recent outcomes for each Gemini model, in routing order."""
+    return ModelHealthResponse(
+        text_models=model_health.ordered(settings.gemini_text_models),
+        embedding_models=model_health.ordered(settings.gemini_embedding_models),
+        models=[ModelHealthInfo(**entry) for entry in model_health.snapshot()],
+    )
+
+
+@router.get("/health/pools", tags=["health"])
+async def get_pool_stats() -> dict:
+    """Connection pool sizes and waiters for the shared Postgres and Supabase clients."""
+    return pool_stats()
+
+
+def _record_pool_gauges() -> None:
+    stats = pool_stats()
+    # Background workers use the sync clients, request handlers the async ones
+    for suffix, client in (("", "sync"), ("_async", "async")):
+        for name, value in stats.get(f"postgres{suffix}", {}).items():
+            metrics.set_gauge("pg_pool_stat", value, stat=name, client=client)
+        http = stats.get(f"supabase_http{suffix}")
+        if http:
+            for state, value in (("open", http["connections"]), ("idle", http["idle"])):
+                metrics.set_gauge("supabase_http_connections", value, state=state, client=client)
+
+
+@router.get("/metrics", response_class=PlainTextResponse, tags=["health"])
+async def get_metrics() -> PlainTextResponse:
+    """Process metrics in the Prometheus text exposition format."""
+    _record_pool_gauges()
+    return PlainTextResponse(
+        metrics.render_prometheus(), media_type="text/plain; version=0.0.4"
+    )
@@ -5,9 +5,9 @@ from typing import List
 
 from fastapi import APIRouter, File, UploadFile
 
-from app.db.client import get_supabase_client
+from app.db.repository import get_repository
 from app.ingestion.csv_parser import parse_csv_bytes
-from app.ingestion.loader import load_ohlc_data
+from app.ingestion.loader import load_ohlc_data_async
 from app.schemas.responses import IngestResponse
 from app.utils.filehash import hash_bytes
 
@@ -24,7 +24,7 @@ def extract_ticker(filename: str) -> str:
 
 @router.post("/ingest", response_model=List[IngestResponse])
 async def ingest_csv(files: List[UploadFile] = File(...)):
-    supabase = get_supabase_client()
+    repo = get_repository()
     responses: List[IngestResponse] = []
 
     for file in files:
@@ -40,7 +40,7 @@ async def ingest_csv(files: List[UploadFile] = File(...)):
             ticker = filename_ticker
 
         source_hash = hash_bytes(content)
-        result = load_ohlc_data(supabase, ticker, df, source_hash)
+        result = await load_ohlc_data_async(repo, ticker, df, source_hash)
         responses.append(IngestResponse(ticker=ticker, rows=result["rows"]))
 
     return responses
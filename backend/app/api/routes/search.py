@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from datetime import date
+from uuid import UUID
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.schemas.responses import SearchResponse, SearchResult
+from app.services.embeddings import embed_text_async
+from app.services.semantic_search import (
+    fetch_analysis_embedding_async,
+    search_analyses_async,
+)
+
+router = APIRouter()
+
+
+@router.get("/search", response_model=SearchResponse)
+async def search(
+    query: str | None = Query(None, description="Free-text query"),
+    analysis_id: UUID | None = Query(None, description="Find theses similar to this analysis"),
+    ticker: str | None = Query(None, description="Only return analyses for this ticker"),
+    start_date: date | None = Query(None, description="Created on or after (YYYY-MM-DD)"),
+    end_date: date | None = Query(None, description="Created on or before (YYYY-MM-DD)"),
+    limit: int = Query(10, ge=1, le=100),
+) -> SearchResponse:
+    """Return the prior theses most similar to a free-text query or to an existing analysis."""
+    if (query is None) == (analysis_id is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of query or analysis_id")
+
+    exclude_id = None if analysis_id is None else str(analysis_id)
+    if query is not None:
+        vector = await embed_text_async(query)
+    else:
+        vector = await fetch_analysis_embedding_async(exclude_id)
+        if vector is None:
+            raise HTTPException(status_code=404, detail="No embedding stored for this analysis")
+
+    rows = await search_analyses_async(
+        vector, limit, ticker, start_date, end_date, exclude_id=exclude_id
+    )
+    return SearchResponse(
+        results=[
+            SearchResult(
+                analysis_id=str(row["analysis_id"]),
+                ticker=row["ticker"],
+                date_range_start=str(row["date_range_start"] or ""),
+                date_range_end=str(row["date_range_end"] or ""),
+                signal=row["signal"] or "",
+                summary=row["summary"] or "",
+                created_at=row["created_at"].isoformat(),
+                score=row["score"],
+            )
+            for row in rows
+        ]
+    )
@@ -1,143 +1,331 @@
 from __future__ import annotations
 
-from datetime import date
+import uuid
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Dict, List, Literal
 
-from fastapi import APIRouter, Query
+import numpy as np
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response
 
-from app.db.client import get_supabase_client
-from app.db.models import ANALYSES_TABLE, OHLC_TABLE, STOCKS_TABLE
+from app.agents.tools import date_window, fetch_stock_id_async, ohlc_columns_async
+from app.core.config import settings
+from app.core.responses import JSONResponse
+from app.db.repository import (
+    OHLC_COLUMNS,
+    OHLC_DTYPES,
+    analysis_cursor,
+    get_repository,
+    parse_analysis_cursor,
+)
 from app.schemas.responses import (
-    AnalysisHistory,
+    AnalysisDetail,
     AnalysisHistoryResponse,
-    OhlcData,
+    LatestAnalysesResponse,
+    OhlcColumnsResponse,
     OhlcDataResponse,
-    StockInfo,
     StocksResponse,
 )
+from app.services.data_versions import (
+    ALL_TICKERS,
+    ANALYSES,
+    INGEST,
+    Validators,
+    last_writes,
+    validators,
+)
+from app.services.downsampling import bucket_ohlc, lttb
+from app.services.read_cache import read_cache
 
 router = APIRouter()
 
 
+async def _validators(request: Request, kind: str, ticker: str = ALL_TICKERS) -> Validators:
+    """Validators from the newest persisted write behind a resource.
+
+    One indexed single-row lookup, reused for ``VALIDATOR_TTL_SECONDS``, so every
+    worker answers revalidations alike without loading the resource itself.
+    """
+    repo = get_repository()
+
+    async def load() -> Dict[str, Any] | None:
+        if kind == INGEST:
+            return await repo.last_ingest_async(None if ticker == ALL_TICKERS else ticker)
+        if ticker == ALL_TICKERS:
+            return await repo.last_analysis_async(None)
+        stock_id = await fetch_stock_id_async(repo, ticker)
+        return None if stock_id is None else await repo.last_analysis_async(stock_id)
+
+    last_write = await last_writes.get_or_load_async(kind, ticker, load)
+    return validators(kind, ticker, _variant(request), last_write)
+
+
+def _validator_headers(validators: Validators) -> Dict[str, str]:
+    headers = {
+        "ETag": validators.etag,
+        # Let clients keep the body but revalidate before reusing it
+        "Cache-Control": "no-cache",
+    }
+    if validators.last_modified is not None:
+        headers["Last-Modified"] = formatdate(validators.last_modified, usegmt=True)
+    return headers
+
+
+def _not_modified(request: Request, validators: Validators) -> Response | None:
+    """A 304 when the client's copy is current, checked before loading the resource."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison, as for GET in RFC 9110
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if "*" not in tags and validators.etag.removeprefix("W/") not in tags:
+            return None
+    else:
+        since = request.headers.get("if-modified-since")
+        if since is None or validators.last_modified is None:
+            return None
+        try:
+            since_ts = parsedate_to_datetime(since).timestamp()
+        except (TypeError, ValueError):
+            return None
+        # HTTP dates have one-second resolution
+        if int(validators.last_modified) > since_ts:
+            return None
+    return Response(status_code=304, headers=_validator_headers(validators))
+
+
+def _with_validators(result: Any, response: Response, validators: Validators) -> Any:
+    target = result if isinstance(result, Response) else response
+    target.headers.update(_validator_headers(validators))
+    return result
+
+
+def _variant(request: Request) -> str:
+    return "&".join(sorted(f"{key}={value}" for key, value in request.query_params.multi_items()))
+
+
+ANALYSIS_FIELDS = (
+    "id",
+    "date_range_start",
+    "date_range_end",
+    "rsi",
+    "macd",
+    "signal",
+    "created_at",
+)
+
+
 @router.get("/analyses", response_model=AnalysisHistoryResponse)
 async def get_analyses(
+    request: Request,
+    response: Response,
     ticker: str = Query(..., description="Stock ticker"),
-) -> AnalysisHistoryResponse:
-    supabase = get_supabase_client()
+    before: str | None = Query(None, description="Cursor: analyses after this one"),
+    limit: int = Query(settings.analyses_page_size, ge=1, le=settings.analyses_max_page_size),
+    include_summary: bool = Query(False, description="Also return each full thesis"),
+) -> AnalysisHistoryResponse | Response:
+    """A ticker's analyses, newest first, one page at a time.
+
+    Pass ``next_cursor`` back as ``before`` until it is null.
+    """
+    if before is not None:
+        try:
+            parse_analysis_cursor(before)
+        except ValueError:
+            raise HTTPException(status_code=422, detail="Invalid cursor")
+    current = await _validators(request, ANALYSES, ticker)
+    not_modified = _not_modified(request, current)
+    if not_modified is not None:
+        return not_modified
+    result = await _list_analyses(ticker, before, limit, include_summary, current.stamp)
+    return _with_validators(result, response, current)
+
+
+async def _list_analyses(
+    ticker: str, before: str | None, limit: int, include_summary: bool, stamp: str | None = None
+) -> Response:
+    repo = get_repository()
+    fields = ANALYSIS_FIELDS + ("summary",) if include_summary else ANALYSIS_FIELDS
 
-    stock_result = supabase.table(STOCKS_TABLE).select("id").eq("ticker", ticker).execute()
-    if not stock_result.data:
-        return AnalysisHistoryResponse(analyses=[])
+    # Keyset scan over idx_analyses_stock_created_id; one extra row tells whether more follow
+    async def load(cursor: str | None, size: int) -> List[Dict[str, Any]] | None:
+        stock_id = await fetch_stock_id_async(repo, ticker)
+        if stock_id is None:
+            return None
+        return await repo.list_analyses_async(stock_id, fields, cursor, size)
+
+    if before is None and not include_summary:
+        # The history tab opens on the first page, so keep the largest one cached
+        rows = await read_cache.get_or_load_async(
+            "analyses", ticker, lambda: load(None, settings.analyses_max_page_size + 1), stamp
+        )
+    else:
+        rows = await load(before, limit + 1)
+    rows = rows or []
+
+    page = rows[:limit]
+    next_cursor = analysis_cursor(page[-1]) if len(rows) > limit else None
+    if not include_summary:
+        # Copies, since the rows may be shared with the read cache
+        page = [{**row, "summary": None} for row in page]
+    # Rows come from our own tables with the selected columns, so they skip model validation
+    return JSONResponse({"analyses": page, "next_cursor": next_cursor})
 
-    stock_id = stock_result.data[0]["id"]
 
-    analyses_result = (
-        supabase.table(ANALYSES_TABLE)
-        .select("id, date_range_start, date_range_end, rsi, macd, signal, summary, created_at")
-        .eq("stock_id", stock_id)
-        .order("created_at", desc=True)
-        .execute()
+@router.get("/analyses/latest", response_model=LatestAnalysesResponse)
+async def get_latest_analyses(
+    request: Request,
+    response: Response,
+    tickers: str | None = Query(None, description="Comma-separated tickers; all if omitted"),
+) -> LatestAnalysesResponse | Response:
+    """The newest analysis of every ticker (or of ``tickers``) in one request."""
+    current = await _validators(request, ANALYSES)
+    not_modified = _not_modified(request, current)
+    if not_modified is not None:
+        return not_modified
+
+    # Cached for the whole universe, so a ticker subset is filtered here instead of in SQL
+    rows = await read_cache.get_or_load_async(
+        "latest_analyses", ALL_TICKERS, get_repository().latest_analyses_async, current.stamp
     )
+    if tickers:
+        wanted = {ticker.strip() for ticker in tickers.split(",")}
+        rows = [row for row in rows if row["ticker"] in wanted]
+    return _with_validators(JSONResponse({"analyses": rows}), response, current)
+
+
+@router.get("/analyses/{analysis_id}", response_model=AnalysisDetail)
+async def get_analysis(analysis_id: str, response: Response) -> AnalysisDetail:
+    """One analysis with its full thesis."""
+    try:
+        uuid.UUID(analysis_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+
+    analysis = await get_repository().get_analysis_async(
+        analysis_id, ANALYSIS_FIELDS + ("hist", "summary")
+    )
+    if analysis is None:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    # Analyses are never updated after insert
+    response.headers["Cache-Control"] = "private, max-age=86400, immutable"
+    return AnalysisDetail(**analysis)
+
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
 
-    analyses = [
-        AnalysisHistory(
-            id=row["id"],
-            date_range_start=row["date_range_start"],
-            date_range_end=row["date_range_end"],
-            rsi=row["rsi"],
-            macd=row["macd"],
-            signal=row["signal"],
-            summary=row["summary"],
-            created_at=row["created_at"],
+def _arrow_stream(columns: Dict[str, np.ndarray]) -> bytes:
+    try:
+        import pyarrow as pa
+    except ImportError:
+        # The request is fine; this server just lacks the optional library
+        raise HTTPException(
+            status_code=501, detail="Arrow output needs the pyarrow extra on the server"
         )
-        for row in (analyses_result.data or [])
-    ]
 
-    return AnalysisHistoryResponse(analyses=analyses)
+    # datetime64[D] converts to Arrow date32 without a per-value Python loop
+    table = pa.table(
+        {
+            "date": pa.array(columns["date"].astype("datetime64[D]")),
+            **{name: pa.array(columns[name]) for name in OHLC_COLUMNS if name != "date"},
+        }
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
 
 
-@router.get("/ohlc", response_model=OhlcDataResponse)
+@router.get(
+    "/ohlc",
+    response_model=OhlcDataResponse,
+    responses={200: {"content": {ARROW_MEDIA_TYPE: {}}, "model": OhlcColumnsResponse}},
+)
 async def get_ohlc(
+    request: Request,
+    response: Response,
     ticker: str = Query(..., description="Stock ticker"),
     start_date: str | None = Query(None, description="Start date (YYYY-MM-DD)"),
     end_date: str | None = Query(None, description="End date (YYYY-MM-DD)"),
-) -> OhlcDataResponse:
-    supabase = get_supabase_client()
+    after: str | None = Query(None, description="Cursor: return bars after this date"),
+    limit: int = Query(settings.ohlc_page_size, ge=1, le=settings.ohlc_page_size),
+    format: Literal["rows", "columns", "arrow"] = Query(
+        "rows", description="rows (one object per bar), columns (parallel arrays) or arrow"
+    ),
+    max_points: int | None = Query(
+        None, ge=3, le=settings.ohlc_page_size, description="Downsample the range to N bars"
+    ),
+    downsample: Literal["ohlc", "lttb"] = Query(
+        "ohlc", description="ohlc (time-bucketed candles) or lttb (representative bars)"
+    ),
+) -> OhlcDataResponse | Response:
+    """OHLC bars ordered by date, one page at a time.
 
-    stock_result = supabase.table(STOCKS_TABLE).select("id").eq("ticker", ticker).execute()
-    if not stock_result.data:
-        return OhlcDataResponse(ticker=ticker, data=[])
+    Pass ``next_cursor`` back as ``after`` until it is null. Arrow responses carry the
+    cursor in the ``X-Next-Cursor`` header. With ``max_points`` the whole range comes
+    back downsampled in a single page and ``limit`` is ignored.
+    """
+    current = await _validators(request, INGEST, ticker)
+    not_modified = _not_modified(request, current)
+    if not_modified is not None:
+        return not_modified
+    result = await _read_ohlc(
+        ticker, start_date, end_date, after, limit, format, max_points, downsample, current.stamp
+    )
+    return _with_validators(result, response, current)
 
-    stock_id = stock_result.data[0]["id"]
 
-    query = (
-        supabase.table(OHLC_TABLE)
-        .select("date,open,high,low,close,volume")
-        .eq("stock_id", stock_id)
+async def _read_ohlc(
+    ticker: str,
+    start_date: str | None,
+    end_date: str | None,
+    after: str | None,
+    limit: int,
+    format: str,
+    max_points: int | None = None,
+    downsample: str = "ohlc",
+    stamp: str | None = None,
+) -> Response:
+    # One bar past the page tells whether more follow; a downsample needs the whole range
+    page_size = None if max_points is not None else limit + 1
+    columns = await ohlc_columns_async(
+        get_repository(), ticker, start_date, end_date, stamp, after, page_size
     )
+    if columns is None:
+        columns = {name: np.array([], dtype=dtype) for name, dtype in OHLC_DTYPES.items()}
 
-    if start_date:
-        query = query.gte("date", start_date)
-    if end_date:
-        query = query.lte("date", end_date)
-
-    ohlc_result = query.order("date").execute()
-
-    data = [
-        OhlcData(
-            date=row["date"],
-            open=row["open"],
-            high=row["high"],
-            low=row["low"],
-            close=row["close"],
-            volume=row["volume"],
-        )
-        for row in (ohlc_result.data or [])
-    ]
+    window = date_window(columns["date"], start_date, end_date, after)
+    if max_points is not None:
+        page = {name: values[window] for name, values in columns.items()}
+        page = bucket_ohlc(page, max_points) if downsample == "ohlc" else lttb(page, max_points)
+        next_cursor = None
+    else:
+        stop = min(window.stop, window.start + limit)
+        next_cursor = str(columns["date"][stop - 1]) if stop < window.stop else None
+        page = {name: values[window.start : stop] for name, values in columns.items()}
+
+    if format == "arrow":
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+        return Response(_arrow_stream(page), media_type=ARROW_MEDIA_TYPE, headers=headers)
 
-    return OhlcDataResponse(ticker=ticker, data=data)
+    if format == "rows":
+        lists = [page[name].tolist() for name in OHLC_COLUMNS]
+        rows = [dict(zip(OHLC_COLUMNS, values)) for values in zip(*lists)]
+        return JSONResponse({"ticker": ticker, "data": rows, "next_cursor": next_cursor})
+    # Numeric columns are encoded straight from the arrays
+    return JSONResponse({"ticker": ticker, **page, "next_cursor": next_cursor})
 
 
 @router.get("/stocks", response_model=StocksResponse)
-async def list_stocks() -> StocksResponse:
+async def list_stocks(request: Request, response: Response) -> StocksResponse | Response:
     """Return all tickers that have ingested OHLC data, along with their min/max date range."""
-    supabase = get_supabase_client()
-
-    # Fetch all stocks
-    stocks_result = supabase.table(STOCKS_TABLE).select("id,ticker").execute()
-    if not stocks_result.data:
-        return StocksResponse(stocks=[])
-
-    stock_map = {row["id"]: row["ticker"] for row in stocks_result.data}
-
-    # For each stock, get min and max date from ohlc_daily
-    infos: list[StockInfo] = []
-    for stock_id, ticker in stock_map.items():
-        ohlc_result = (
-            supabase.table(OHLC_TABLE)
-            .select("date")
-            .eq("stock_id", stock_id)
-            .order("date", desc=False)
-            .limit(1)
-            .execute()
-        )
-        if not ohlc_result.data:
-            continue  # skip stocks with no OHLC rows
-
-        min_date = ohlc_result.data[0]["date"]
-
-        ohlc_max_result = (
-            supabase.table(OHLC_TABLE)
-            .select("date")
-            .eq("stock_id", stock_id)
-            .order("date", desc=True)
-            .limit(1)
-            .execute()
-        )
-        max_date = ohlc_max_result.data[0]["date"]
-
-        infos.append(StockInfo(ticker=ticker, min_date=min_date, max_date=max_date))
+    current = await _validators(request, INGEST)
+    not_modified = _not_modified(request, current)
+    if not_modified is not None:
+        return not_modified
 
-    # Sort alphabetically by ticker
-    infos.sort(key=lambda s: s.ticker)
-
-    return StocksResponse(stocks=infos)
+    # A single query: maintained at ingest on Supabase, aggregated in-process on DuckDB
+    rows = await read_cache.get_or_load_async(
+        "stocks", ALL_TICKERS, get_repository().stock_coverage_async, current.stamp
+    )
+    return _with_validators(JSONResponse({"stocks": rows}), response, current)
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import zlib
+from typing import Dict
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import metrics
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Preferred first when the client weighs several equally
+SUPPORTED = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# Bodies already in a compressed format gain nothing from a second pass
+_INCOMPRESSIBLE = ("image/", "video/", "audio/", "application/zip", "application/gzip")
+
+
+def negotiate(accept_encoding: str, supported: tuple = SUPPORTED) -> str | None:
+    """The supported coding with the highest q-value in ``Accept-Encoding``, if any."""
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for coding in supported:
+        q = weights.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class _Encoder:
+    def __init__(self, coding: str, gzip_level: int, brotli_quality: int) -> None:
+        if coding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._brotli = None
+            self._gzip = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        """Compressed ``data``, flushed so a streaming client can decode it right away."""
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._gzip.compress(data) + self._gzip.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._gzip.compress(data) + self._gzip.flush()
+
+
+class CompressionMiddleware:
+    """gzip or brotli response bodies of at least ``minimum_size`` bytes.
+
+    The coding is negotiated from ``Accept-Encoding`` q-values. A single-message body is
+    compressed whole with its ``Content-Length`` corrected; a streamed one is compressed
+    chunk by chunk. Smaller bodies, bodies that already carry a ``Content-Encoding``, and
+    media types that are compressed already pass through unchanged.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 5,
+        brotli_quality: int = 4,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        coding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        await _Responder(self, coding, send).run(scope, receive)
+
+
+class _Responder:
+    def __init__(self, middleware: CompressionMiddleware, coding: str | None, send: Send):
+        self.middleware = middleware
+        self.coding = coding
+        self.send = send
+        self.start: Message | None = None
+        self.encoder: _Encoder | None = None
+        self.passthrough = False
+
+    async def run(self, scope: Scope, receive: Receive) -> None:
+        await self.middleware.app(scope, receive, self.on_send)
+
+    def _skip(self, headers: MutableHeaders) -> bool:
+        content_type = headers.get("content-type", "")
+        return (
+            "content-encoding" in headers
+            or self.start["status"] in (204, 304)
+            or content_type.startswith(_INCOMPRESSIBLE)
+        )
+
+    async def on_send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Held until the first body chunk shows whether compression pays off
+            self.start = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+        if self.passthrough:
+            await self.send(message)
+            return
+        if self.encoder is not None:
+            await self._send_chunk(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        headers = MutableHeaders(scope=self.start)
+        if self._skip(headers) or (len(body) < self.middleware.minimum_size and not more_body):
+            self.passthrough = True
+            await self.send(self.start)
+            await self.send(message)
+            return
+
+        # Caches must key on Accept-Encoding even when this client got the identity body
+        headers.add_vary_header("Accept-Encoding")
+        if self.coding is None:
+            self.passthrough = True
+            await self.send(self.start)
+            await self.send(message)
+            return
+
+        middleware = self.middleware
+        self.encoder = _Encoder(self.coding, middleware.gzip_level, middleware.brotli_quality)
+        # ETags are weak, so they stay valid for every coding of the same body
+        headers["Content-Encoding"] = self.coding
+        if more_body:
+            del headers["Content-Length"]
+            await self.send(self.start)
+            await self._send_chunk(message)
+            return
+        compressed = self.encoder.finish(body)
+        self._record(len(body), len(compressed))
+        headers["Content-Length"] = str(len(compressed))
+        await self.send(self.start)
+        await self.send({"type": "http.response.body", "body": compressed})
+
+    async def _send_chunk(self, message: Message) -> None:
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        compressed = self.encoder.chunk(body) if more_body else self.encoder.finish(body)
+        self._record(len(body), len(compressed))
+        await self.send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+    def _record(self, raw: int, sent: int) -> None:
+        metrics.increment("http_response_uncompressed_bytes_total", raw, encoding=self.coding)
+        metrics.increment("http_response_compressed_bytes_total", sent, encoding=self.coding)
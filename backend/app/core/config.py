@@ -12,6 +12,23 @@ class Settings(BaseSettings):
     gemini_model: str = "gemini-2.5-flash"
     gemini_embedding_model: str = "models/gemini-embedding-001"
     backend_url: str = "http://localhost:8000"
+    # "supabase", "memory" or "duckdb"; memory keeps tables in-process for local runs and
+    # load tests, duckdb keeps them in an embedded file (needs the duckdb extra)
+    database_backend: str = "supabase"
+    duckdb_path: str = ".data/market.duckdb"
+    memory_db_latency_ms: float = 0.0
+    # Shared across the process; sized for the API workers plus the embedding worker
+    supabase_max_connections: int = 20
+    supabase_max_keepalive_connections: int = 10
+    supabase_keepalive_expiry_seconds: float = 30.0
+    supabase_timeout_seconds: float = 30.0
+    pg_pool_min_size: int = 1
+    pg_pool_max_size: int = 10
+    pg_pool_timeout_seconds: float = 30.0
+    # Keep at or below PostgREST's max-rows (1000 on Supabase) so a full page means "more"
+    ohlc_page_size: int = 1000
+    analyses_page_size: int = 20
+    analyses_max_page_size: int = 100
 
     gemini_text_models: list[str] = [
         "gemini-2.5-flash",
@@ -23,8 +40,99 @@ class Settings(BaseSettings):
         "models/gemini-embedding-001",
         "models/text-embedding-004",
     ]
+    # "google" or "fake"; the fake answers locally with simulated latency and 429s
+    gemini_backend: str = "google"
+    fake_gemini_latency_ms: float = 800.0
+    fake_gemini_jitter_ms: float = 200.0
+    fake_gemini_rate_limit_rate: float = 0.0
+    fake_gemini_seed: int = 0
     gemini_max_retries: int = 3
     gemini_retry_base_delay: float = 1.0
+    gemini_circuit_failure_threshold: int = 2
+    gemini_circuit_cooldown_seconds: float = 60.0
+
+    gemini_rate_limit_enabled: bool = True
+    gemini_default_rpm: int = 10
+    gemini_default_tpm: int = 250000
+    gemini_model_rpm: dict[str, int] = {
+        "gemini-2.5-flash": 10,
+        "gemini-2.5-flash-lite": 15,
+        "gemini-1.5-flash": 15,
+        "gemini-2.5-pro": 5,
+        "models/gemini-embedding-001": 100,
+        "models/text-embedding-004": 1500,
+    }
+    gemini_model_tpm: dict[str, int] = {
+        "gemini-2.5-pro": 125000,
+        "models/gemini-embedding-001": 30000,
+        "models/text-embedding-004": 1000000,
+    }
+
+    embedding_cache_enabled: bool = True
+    embedding_cache_max_entries: int = 2048
+    embedding_cache_persistent: bool = True
+
+    # Ticker ids, OHLC columns and analysis lists; writes in this process invalidate entries
+    read_cache_enabled: bool = True
+    read_cache_max_entries: int = 1024
+    read_cache_max_mb: float = 256.0
+    read_cache_ttl_seconds: float = 300.0
+    # Reuse of the newest-write lookup behind ETag/Last-Modified; bounds how long another
+    # process's write can go unseen by revalidations here
+    validator_ttl_seconds: float = 2.0
+
+    # Per-ticker OHLC columns memory-mapped from local disk, so workers on one host share
+    # them through the page cache (POSIX only). Reads without a validated stamp (the
+    # agents) fetch newer bars once per refresh interval and miss dates rewritten by
+    # another host until an /ohlc request refills the ticker
+    ohlc_store_enabled: bool = False
+    ohlc_store_path: str = ".data/ohlc"
+    ohlc_store_refresh_seconds: float = 300.0
+
+    embedding_deferred: bool = True
+    embedding_worker_enabled: bool = True
+    embedding_worker_batch_size: int = 32
+    embedding_worker_poll_seconds: float = 5.0
+    embedding_worker_max_attempts: int = 8
+    embedding_worker_retry_base_delay: float = 30.0
+
+    embedding_batch_size: int = 32
+    embedding_batch_window_ms: float = 50.0
+    embedding_batch_max_in_flight: int = 2
+
+    search_backend: str = "pgvector"
+    search_dimensions: int = 3072
+    search_rerank_factor: int = 4
+    search_local_refresh_seconds: float = 30.0
+    # Embeddings are stamped when their transaction starts, so one that commits late can
+    # land behind rows already loaded; each refresh re-reads this window behind them
+    search_local_refresh_lookback_seconds: float = 300.0
+    search_local_refresh_page_size: int = 1000
+
+    semantic_cache_enabled: bool = False
+    semantic_cache_rsi_tolerance: float = 2.0
+    semantic_cache_macd_tolerance: float = 0.1
+    semantic_cache_hist_tolerance: float = 0.05
+    semantic_cache_end_date_tolerance_days: int = 3
+    semantic_cache_window_tolerance_days: int = 3
+
+    debug_timings: bool = False
+
+    # Negotiated gzip/brotli for bodies of at least the minimum size; brotli needs the
+    # brotli extra, otherwise clients get gzip
+    response_compression_enabled: bool = True
+    response_compression_min_bytes: int = 1024
+    response_gzip_level: int = 5
+    response_brotli_quality: int = 4
+
+    graph_checkpoint_enabled: bool = True
+    graph_checkpoint_path: str = ".checkpoints/graph.sqlite"
+    graph_checkpoint_retention_hours: float = 24.0
+
+    research_batch_max_tickers: int = 8
+    research_batch_max_input_tokens: int = 30000
+    research_batch_max_output_tokens: int = 8192
+    research_batch_output_tokens_per_ticker: int = 700
 
     model_config = SettingsConfigDict(populate_by_name=True, env_file="../.env")
 
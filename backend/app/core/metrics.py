@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _Histogram:
+    __slots__ = ("buckets", "count", "total")
+
+    def __init__(self, size: int) -> None:
+        self.buckets: List[int] = [0] * size
+        self.count = 0
+        self.total = 0.0
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in key) + "}"
+
+
+class MetricsRegistry:
+    """Minimal in-process counters, gauges and histograms with Prometheus text output."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1.0, **labels: object) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: object) -> None:
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels: object) -> None:
+        key = _label_key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(len(self.buckets))
+            if index < len(self.buckets):
+                histogram.buckets[index] += 1
+            histogram.count += 1
+            histogram.total += value
+
+    def counter_value(self, name: str, **labels: object) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0.0)
+
+    def summary_mean(self, name: str, **labels: object) -> float:
+        with self._lock:
+            histogram = self._histograms.get(name, {}).get(_label_key(labels))
+            if histogram is None or not histogram.count:
+                return 0.0
+            return histogram.total / histogram.count
+
+    def quantile(self, name: str, q: float, **labels: object) -> float:
+        """Estimate a quantile from bucket counts, interpolating within the bucket."""
+        with self._lock:
+            histogram = self._histograms.get(name, {}).get(_label_key(labels))
+            if histogram is None or not histogram.count:
+                return 0.0
+            counts = list(histogram.buckets)
+            count = histogram.count
+        rank = q * count
+        seen = 0
+        lower = 0.0
+        for bound, bucket_count in zip(self.buckets, counts):
+            if bucket_count and seen + bucket_count >= rank:
+                return lower + (bound - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+            lower = bound
+        return self.buckets[-1]
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+            for name, series in sorted(self._gauges.items()):
+                lines.append(f"# TYPE {name} gauge")
+                for key, value in series.items():
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in series.items():
+                    cumulative = 0
+                    for bound, bucket_count in zip(self.buckets, histogram.buckets):
+                        cumulative += bucket_count
+                        bucket_key = key + (("le", repr(bound)),)
+                        lines.append(f"{name}_bucket{_format_labels(bucket_key)} {cumulative}")
+                    inf_key = key + (("le", "+Inf"),)
+                    lines.append(f"{name}_bucket{_format_labels(inf_key)} {histogram.count}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {histogram.total}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+import orjson
+from fastapi.responses import ORJSONResponse
+
+_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, np.memmap):
+        # A plain view of the same pages, which orjson serializes without copying
+        return np.asarray(value)
+    if isinstance(value, np.ndarray):
+        # String dates and strided slices have no native encoding
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class JSONResponse(ORJSONResponse):
+    """orjson-encoded JSON that also takes numpy columns, memory-mapped or not.
+
+    Routes return it directly with rows as the database gave them, which skips the
+    ``response_model`` validation and ``jsonable_encoder`` pass FastAPI applies to
+    returned models; the models then only document the shape.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=_OPTIONS)
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, TypeVar
+
+from app.core.metrics import metrics
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+@dataclass
+class Span:
+    name: str
+    seconds: float = 0.0
+    attrs: Dict[str, Any] = field(default_factory=dict)
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+
+class RequestTimings:
+    """Spans recorded while serving one request, possibly from several threads."""
+
+    def __init__(self, debug: bool = False) -> None:
+        self.debug = debug
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def breakdown(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {"name": span.name, "ms": round(span.seconds * 1000, 2), **span.attrs}
+                for span in self.spans
+            ]
+
+    def server_timing(self) -> str:
+        """Render spans as a Server-Timing header, summing repeated span names."""
+        totals: Dict[str, List[float]] = {}
+        with self._lock:
+            for span in self.spans:
+                entry = totals.setdefault(span.name, [0.0, 0])
+                entry[0] += span.seconds
+                entry[1] += 1
+        entries = []
+        for name, (seconds, count) in totals.items():
+            entry = f"{name.replace('.', '-')};dur={seconds * 1000:.1f}"
+            if count > 1:
+                entry += f';desc="{count} calls"'
+            entries.append(entry)
+        return ", ".join(entries)
+
+
+_current: ContextVar[RequestTimings | None] = ContextVar("request_timings", default=None)
+
+
+def start_request(debug: bool = False) -> RequestTimings:
+    timings = RequestTimings(debug)
+    _current.set(timings)
+    return timings
+
+
+def current_timings() -> RequestTimings | None:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Span]:
+    """Time a block, export it as ``span_seconds{span=...}`` and attach it to the request."""
+    current = Span(name=name, attrs=dict(attrs))
+    started = time.perf_counter()
+    try:
+        yield current
+    except Exception:
+        current.set(error=True)
+        raise
+    finally:
+        current.seconds = time.perf_counter() - started
+        metrics.observe("span_seconds", current.seconds, span=name)
+        timings = _current.get()
+        if timings is not None:
+            timings.add(current)
+
+
+def _row_count(result: Any) -> int | None:
+    if result is None:
+        return 0
+    if isinstance(result, dict):
+        return 1
+    if isinstance(result, (str, bytes)):
+        return None
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """Decorate a database helper so each call is a span carrying the rows it returned."""
+
+    def record(current: Span, result: Any) -> None:
+        rows = _row_count(result)
+        if rows is not None:
+            current.set(rows=rows)
+            metrics.increment("db_rows_total", rows, call=name)
+
+    def decorator(func: F) -> F:
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def awrapper(*args: Any, **kwargs: Any) -> Any:
+                with span(name) as current:
+                    result = await func(*args, **kwargs)
+                    record(current, result)
+                    return result
+
+            return awrapper  # type: ignore[return-value]
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(name) as current:
+                result = func(*args, **kwargs)
+                record(current, result)
+                return result
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
@@ -1,15 +1,213 @@
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, ContextManager, Dict
+
+import httpx
 import psycopg
-from pgvector.psycopg import register_vector
-from supabase import Client, create_client
+from pgvector.psycopg import register_vector, register_vector_async
+from psycopg_pool import AsyncConnectionPool, ConnectionPool
+from supabase import (
+    AsyncClient,
+    AsyncClientOptions,
+    Client,
+    ClientOptions,
+    acreate_client,
+    create_client,
+)
 
 from app.core.config import settings
+from app.db.memory import AsyncMemorySupabase, MemorySupabase
+
+# Shared by every caller when DATABASE_BACKEND=memory
+memory_db = MemorySupabase(latency=settings.memory_db_latency_ms / 1000)
+async_memory_db = AsyncMemorySupabase(memory_db)
+
+_supabase: Client | None = None
+_http_client: httpx.Client | None = None
+_pg_pool: ConnectionPool | None = None
+_lock = threading.Lock()
+
+# The async clients belong to the event loop that first used them (the server's loop)
+_async_supabase: AsyncClient | None = None
+_async_http_client: httpx.AsyncClient | None = None
+_async_pg_pool: AsyncConnectionPool | None = None
+
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.supabase_max_connections,
+        max_keepalive_connections=settings.supabase_max_keepalive_connections,
+        keepalive_expiry=settings.supabase_keepalive_expiry_seconds,
+    )
 
 
 def get_supabase_client() -> Client:
-    return create_client(settings.supabase_url, settings.supabase_service_key)
+    """Process-wide Supabase client; its httpx pool keeps connections to PostgREST alive."""
+    global _supabase, _http_client
+    if settings.database_backend == "memory":
+        return memory_db  # type: ignore[return-value]
+    with _lock:
+        if _supabase is None:
+            _http_client = httpx.Client(
+                limits=_http_limits(),
+                timeout=settings.supabase_timeout_seconds,
+                follow_redirects=True,
+            )
+            _supabase = create_client(
+                settings.supabase_url,
+                settings.supabase_service_key,
+                options=ClientOptions(httpx_client=_http_client),
+            )
+        return _supabase
+
+
+async def get_async_supabase_client() -> AsyncClient:
+    """Process-wide async Supabase client for coroutines; queries are awaited, not blocking."""
+    global _async_supabase, _async_http_client
+    if settings.database_backend == "memory":
+        return async_memory_db  # type: ignore[return-value]
+    if _async_supabase is None:
+        if _async_http_client is None:
+            _async_http_client = httpx.AsyncClient(
+                limits=_http_limits(),
+                timeout=settings.supabase_timeout_seconds,
+                follow_redirects=True,
+            )
+        client = await acreate_client(
+            settings.supabase_url,
+            settings.supabase_service_key,
+            options=AsyncClientOptions(httpx_client=_async_http_client),
+        )
+        # Another coroutine may have finished first; both share the same httpx pool
+        _async_supabase = _async_supabase or client
+    return _async_supabase
 
 
-def get_pg_connection() -> psycopg.Connection:
-    conn = psycopg.connect(settings.supabase_db_url)
+def _configure(conn: psycopg.Connection) -> None:
     register_vector(conn)
-    return conn
+    # register_vector queries pg_type; the pool rejects connections left mid-transaction
+    conn.commit()
+
+
+def get_pg_pool() -> ConnectionPool:
+    global _pg_pool
+    with _lock:
+        if _pg_pool is None:
+            _pg_pool = ConnectionPool(
+                settings.supabase_db_url,
+                min_size=settings.pg_pool_min_size,
+                max_size=settings.pg_pool_max_size,
+                timeout=settings.pg_pool_timeout_seconds,
+                configure=_configure,
+                name="pg",
+                open=False,
+            )
+            # Don't block on the first connection; callers wait on checkout instead
+            _pg_pool.open(wait=False)
+        return _pg_pool
+
+
+def get_pg_connection() -> ContextManager[psycopg.Connection]:
+    """Borrow a pooled connection with pgvector registered; use as a context manager.
+
+    The connection goes back to the pool on exit, committed or rolled back.
+    """
+    return get_pg_pool().connection()
+
+
+async def _configure_async(conn: psycopg.AsyncConnection) -> None:
+    await register_vector_async(conn)
+    await conn.commit()
+
+
+async def get_async_pg_pool() -> AsyncConnectionPool:
+    global _async_pg_pool
+    if _async_pg_pool is None:
+        pool = AsyncConnectionPool(
+            settings.supabase_db_url,
+            min_size=settings.pg_pool_min_size,
+            max_size=settings.pg_pool_max_size,
+            timeout=settings.pg_pool_timeout_seconds,
+            configure=_configure_async,
+            name="pg-async",
+            open=False,
+        )
+        await pool.open(wait=False)
+        if _async_pg_pool is None:
+            _async_pg_pool = pool
+        else:
+            await pool.close()
+    return _async_pg_pool
+
+
+@asynccontextmanager
+async def get_async_pg_connection() -> AsyncIterator[psycopg.AsyncConnection]:
+    """Async twin of ``get_pg_connection``; use as an async context manager."""
+    pool = await get_async_pg_pool()
+    async with pool.connection() as conn:
+        yield conn
+
+
+def open_clients() -> None:
+    if settings.database_backend == "memory":
+        return
+    get_supabase_client()
+    get_pg_pool()
+
+
+async def open_clients_async() -> None:
+    """Open the sync clients (background threads) and the async ones (request handlers)."""
+    if settings.database_backend == "memory":
+        return
+    open_clients()
+    await get_async_supabase_client()
+    await get_async_pg_pool()
+
+
+def close_clients() -> None:
+    global _supabase, _http_client, _pg_pool
+    with _lock:
+        if _pg_pool is not None:
+            _pg_pool.close()
+        if _http_client is not None:
+            _http_client.close()
+        _supabase = _http_client = _pg_pool = None
+
+
+async def close_clients_async() -> None:
+    global _async_supabase, _async_http_client, _async_pg_pool
+    close_clients()
+    if _async_pg_pool is not None:
+        await _async_pg_pool.close()
+    if _async_http_client is not None:
+        await _async_http_client.aclose()
+    _async_supabase = _async_http_client = _async_pg_pool = None
+
+
+def _http_pool_stats(client: httpx.Client | httpx.AsyncClient) -> Dict[str, Any]:
+    stats: Dict[str, Any] = {
+        "max_connections": settings.supabase_max_connections,
+        "max_keepalive_connections": settings.supabase_max_keepalive_connections,
+    }
+    # httpx has no public pool introspection, so this reads its private transport pool;
+    # an httpx release that moves it shows up as "unknown" rather than an error
+    try:
+        connections = list(client._transport._pool.connections)
+        stats["connections"] = len(connections)
+        stats["idle"] = sum(1 for conn in connections if conn.is_idle())
+    except Exception:
+        stats["connections"] = stats["idle"] = "unknown"
+    return stats
+
+
+def pool_stats() -> Dict[str, Any]:
+    stats: Dict[str, Any] = {"database_backend": settings.database_backend}
+    if _pg_pool is not None:
+        stats["postgres"] = _pg_pool.get_stats()
+    if _async_pg_pool is not None:
+        stats["postgres_async"] = _async_pg_pool.get_stats()
+    if _http_client is not None:
+        stats["supabase_http"] = _http_pool_stats(_http_client)
+    if _async_http_client is not None:
+        stats["supabase_http_async"] = _http_pool_stats(_async_http_client)
+    return stats
@@ -0,0 +1,273 @@
+"""Embedded DuckDB store for single-node deployments, benchmarks and tests.
+
+Range scans come back as numpy columns straight from DuckDB's vectorized engine and
+coverage is aggregated at query time, so there is no network round trip and no
+per-row dict on the read path. Requires the optional ``duckdb`` package.
+
+Analyses stored here have no embeddings: the worker queue, ``analysis_embeddings``
+and ``/search`` are Postgres tables, so the graph skips embedding on this backend.
+"""
+
+from __future__ import annotations
+
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from app.core.timing import span
+from app.db.models import ANALYSES_TABLE, OHLC_TABLE, STOCKS_TABLE
+from app.db.repository import (
+    OHLC_COLUMNS,
+    OHLC_DTYPES,
+    RECENT_ANALYSIS_COLUMNS,
+    Columns,
+    Repository,
+    end_date_window,
+    parse_analysis_cursor,
+)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS {STOCKS_TABLE} (
+    id VARCHAR PRIMARY KEY,
+    ticker VARCHAR NOT NULL UNIQUE,
+    last_ingested_at TIMESTAMPTZ,
+    last_source_file_hash VARCHAR,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT current_timestamp
+);
+CREATE TABLE IF NOT EXISTS {OHLC_TABLE} (
+    stock_id VARCHAR NOT NULL,
+    date DATE NOT NULL,
+    open DOUBLE NOT NULL,
+    high DOUBLE NOT NULL,
+    low DOUBLE NOT NULL,
+    close DOUBLE NOT NULL,
+    volume BIGINT NOT NULL,
+    PRIMARY KEY (stock_id, date)
+);
+CREATE TABLE IF NOT EXISTS {ANALYSES_TABLE} (
+    id VARCHAR PRIMARY KEY,
+    stock_id VARCHAR NOT NULL,
+    date_range_start DATE NOT NULL,
+    date_range_end DATE NOT NULL,
+    rsi DOUBLE,
+    macd DOUBLE,
+    hist DOUBLE,
+    signal VARCHAR,
+    summary VARCHAR,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT current_timestamp
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_stock_created ON {ANALYSES_TABLE} (stock_id, created_at);
+"""
+
+# Columns that need formatting to match what PostgREST returns
+_ANALYSIS_EXPRESSIONS = {
+    "date_range_start": "strftime({table}date_range_start, '%Y-%m-%d')",
+    "date_range_end": "strftime({table}date_range_end, '%Y-%m-%d')",
+    "created_at": "CAST({table}created_at AS VARCHAR)",
+}
+_ANALYSIS_COLUMNS = {
+    "id",
+    "stock_id",
+    "date_range_start",
+    "date_range_end",
+    "rsi",
+    "macd",
+    "hist",
+    "signal",
+    "summary",
+    "created_at",
+}
+
+
+def _select_list(columns: Sequence[str], prefix: str = "") -> str:
+    unknown = set(columns) - _ANALYSIS_COLUMNS
+    if unknown:
+        raise ValueError(f"Unknown analysis columns: {sorted(unknown)}")
+    return ", ".join(
+        _ANALYSIS_EXPRESSIONS.get(name, "{table}" + name).format(table=prefix) + f" AS {name}"
+        for name in columns
+    )
+
+
+class DuckDBRepository(Repository):
+    """One DuckDB database per process; each thread queries through its own cursor.
+
+    DuckDB runs reads in parallel but rejects conflicting concurrent writes, so
+    writes are serialized here.
+    """
+
+    stores_embeddings = False
+
+    def __init__(self, path: str = ":memory:") -> None:
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = duckdb.connect(path)
+        self._conn.execute("SET TimeZone = 'UTC'")
+        self._conn.execute(SCHEMA)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+    def _cursor(self) -> duckdb.DuckDBPyConnection:
+        cursor = getattr(self._local, "cursor", None)
+        if cursor is None:
+            cursor = self._local.cursor = self._conn.cursor()
+        return cursor
+
+    def _rows(self, sql: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        cursor = self._cursor().execute(sql, list(params))
+        names = [column[0] for column in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def find_stock_id(self, ticker: str) -> str | None:
+        rows = self._rows(f"SELECT id FROM {STOCKS_TABLE} WHERE ticker = ?", [ticker])
+        return rows[0]["id"] if rows else None
+
+    def get_or_create_stock(self, ticker: str) -> Dict[str, Any]:
+        with self._write_lock:
+            self._cursor().execute(
+                f"INSERT INTO {STOCKS_TABLE} (id, ticker) VALUES (?, ?) ON CONFLICT DO NOTHING",
+                [str(uuid.uuid4()), ticker],
+            )
+        return self._rows(f"SELECT id, ticker FROM {STOCKS_TABLE} WHERE ticker = ?", [ticker])[0]
+
+    def upsert_ohlc(self, stock_id: str, df: pd.DataFrame, source_hash: str) -> int:
+        if df.empty:
+            return 0
+        incoming = df[list(OHLC_COLUMNS)].assign(stock_id=stock_id)
+        with span("db.upsert_ohlc", rows=len(incoming)), self._write_lock:
+            cursor = self._cursor()
+            cursor.register("incoming", incoming)
+            try:
+                cursor.execute(
+                    f"INSERT OR REPLACE INTO {OHLC_TABLE} "
+                    "SELECT stock_id, CAST(date AS DATE), open, high, low, close, "
+                    "CAST(volume AS BIGINT) FROM incoming"
+                )
+            finally:
+                cursor.unregister("incoming")
+            cursor.execute(
+                f"UPDATE {STOCKS_TABLE} SET last_ingested_at = now(), last_source_file_hash = ? "
+                "WHERE id = ?",
+                [source_hash, stock_id],
+            )
+        return len(incoming)
+
+    def ohlc_columns(
+        self,
+        stock_id: str,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        after: str | None = None,
+        limit: int | None = None,
+    ) -> Columns:
+        # One scan over the (stock_id, date) key; no page size since nothing crosses a network
+        fetched = (
+            self._cursor()
+            .execute(
+                f"SELECT {', '.join(OHLC_COLUMNS)} FROM {OHLC_TABLE} WHERE stock_id = ? "
+                "AND (?::DATE IS NULL OR date >= ?::DATE) AND (?::DATE IS NULL OR date <= ?::DATE) "
+                "AND (?::DATE IS NULL OR date > ?::DATE) ORDER BY date LIMIT ?",
+                [stock_id, start_date, start_date, end_date, end_date, after, after, limit],
+            )
+            .fetchnumpy()
+        )
+        columns = {
+            name: np.asarray(fetched[name]).astype(dtype)
+            for name, dtype in OHLC_DTYPES.items()
+            if name != "date"
+        }
+        dates = np.asarray(fetched["date"]).astype("datetime64[D]")
+        return {"date": dates.astype(OHLC_DTYPES["date"]), **columns}
+
+    def stock_coverage(self) -> List[Dict[str, Any]]:
+        # Aggregated on read: a vectorized GROUP BY replaces the stock_coverage table
+        return self._rows(
+            f"SELECT s.ticker, strftime(min(p.date), '%Y-%m-%d') AS min_date, "
+            "strftime(max(p.date), '%Y-%m-%d') AS max_date, count(*) AS row_count, "
+            "CAST(s.last_ingested_at AS VARCHAR) AS last_ingested_at "
+            f"FROM {OHLC_TABLE} p JOIN {STOCKS_TABLE} s ON s.id = p.stock_id "
+            "GROUP BY s.ticker, s.last_ingested_at ORDER BY s.ticker"
+        )
+
+    def insert_analysis(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        values = {**row, "id": str(uuid.uuid4())}
+        names = list(values)
+        columns = ", ".join(names)
+        placeholders = ", ".join("?" for _ in names)
+        with self._write_lock:
+            self._cursor().execute(
+                f"INSERT INTO {ANALYSES_TABLE} ({columns}) VALUES ({placeholders})",
+                [values[name] for name in names],
+            )
+        inserted = self.get_analysis(values["id"], sorted(_ANALYSIS_COLUMNS))
+        if inserted is None:
+            raise RuntimeError(f"Analysis {values['id']} was not found after insert")
+        return inserted
+
+    def list_analyses(
+        self, stock_id: str, columns: Sequence[str], before: str | None, limit: int
+    ) -> List[Dict[str, Any]]:
+        created_at, analysis_id = parse_analysis_cursor(before) if before else (None, None)
+        return self._rows(
+            f"SELECT {_select_list(columns)} FROM {ANALYSES_TABLE} WHERE stock_id = ? "
+            "AND (?::TIMESTAMPTZ IS NULL OR created_at < ?::TIMESTAMPTZ "
+            "OR (created_at = ?::TIMESTAMPTZ AND id < ?)) "
+            "ORDER BY created_at DESC, id DESC LIMIT ?",
+            [stock_id, created_at, created_at, created_at, analysis_id, limit],
+        )
+
+    def get_analysis(self, analysis_id: str, columns: Sequence[str]) -> Dict[str, Any] | None:
+        rows = self._rows(
+            f"SELECT {_select_list(columns)} FROM {ANALYSES_TABLE} WHERE id = ?", [analysis_id]
+        )
+        return rows[0] if rows else None
+
+    def latest_analyses(self) -> List[Dict[str, Any]]:
+        columns = ("id", "date_range_start", "date_range_end", "rsi", "macd", "signal")
+        return self._rows(
+            f"SELECT s.ticker, {_select_list(columns + ('created_at',), 'a.')} "
+            f"FROM {ANALYSES_TABLE} a JOIN {STOCKS_TABLE} s ON s.id = a.stock_id "
+            "QUALIFY row_number() OVER "
+            "(PARTITION BY a.stock_id ORDER BY a.created_at DESC, a.id DESC) = 1 "
+            "ORDER BY s.ticker"
+        )
+
+    def recent_analyses(
+        self, stock_id: str, end_date: str, tolerance_days: int, limit: int
+    ) -> List[Dict[str, Any]]:
+        low, high = end_date_window(end_date, tolerance_days)
+        return self._rows(
+            f"SELECT {_select_list(RECENT_ANALYSIS_COLUMNS)} FROM {ANALYSES_TABLE} "
+            "WHERE stock_id = ? AND date_range_end BETWEEN ?::DATE AND ?::DATE "
+            "ORDER BY created_at DESC LIMIT ?",
+            [stock_id, low, high, limit],
+        )
+
+    def last_ingest(self, ticker: str | None) -> Dict[str, Any] | None:
+        rows = self._rows(
+            "SELECT ticker, CAST(last_ingested_at AS VARCHAR) AS last_ingested_at "
+            f"FROM {STOCKS_TABLE} WHERE last_ingested_at IS NOT NULL "
+            "AND (?::VARCHAR IS NULL OR ticker = ?) ORDER BY last_ingested_at DESC LIMIT 1",
+            [ticker, ticker],
+        )
+        return rows[0] if rows else None
+
+    def last_analysis(self, stock_id: str | None) -> Dict[str, Any] | None:
+        rows = self._rows(
+            f"SELECT {_select_list(('id', 'created_at'))} FROM {ANALYSES_TABLE} "
+            "WHERE ?::VARCHAR IS NULL OR stock_id = ? ORDER BY created_at DESC, id DESC LIMIT 1",
+            [stock_id, stock_id],
+        )
+        return rows[0] if rows else None
+
+    def enqueue_embedding(self, analysis_id: str) -> None:
+        # Nothing here would ever drain the queue (see stores_embeddings)
+        pass
+
+    def close(self) -> None:
+        self._conn.close()
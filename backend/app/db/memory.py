@@ -0,0 +1,421 @@
+"""In-memory stand-in for the subset of the Supabase/PostgREST client the app uses.
+
+Rows are plain dicts. Filters, ordering, limits, inserts, upserts, updates and
+deletes follow PostgREST semantics closely enough for local runs and load tests;
+``NULL`` never satisfies a comparison, as in SQL. ``AsyncMemorySupabase`` exposes
+the same tables through awaitable ``execute()`` calls, like the async client.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from postgrest.exceptions import APIError
+
+from app.db.models import (
+    ANALYSES_TABLE,
+    OHLC_TABLE,
+    PENDING_EMBEDDINGS_TABLE,
+    STOCK_COVERAGE_TABLE,
+    STOCKS_TABLE,
+)
+
+UNIQUE_KEYS: Dict[str, Tuple[str, ...]] = {
+    STOCKS_TABLE: ("ticker",),
+    OHLC_TABLE: ("stock_id", "date"),
+    PENDING_EMBEDDINGS_TABLE: ("analysis_id",),
+    STOCK_COVERAGE_TABLE: ("stock_id",),
+}
+
+# Tables whose primary key is a generated uuid ``id``
+GENERATED_IDS = {STOCKS_TABLE, ANALYSES_TABLE}
+# Tables without a ``created_at`` column
+UNTIMESTAMPED = {OHLC_TABLE}
+
+Filter = Callable[[Dict[str, Any]], bool]
+
+
+@dataclass
+class MemoryResponse:
+    data: Any
+    count: int | None = None
+
+
+def _compare(op: Callable[[Any, Any], bool]) -> Callable[[str, Any], Filter]:
+    def build(column: str, value: Any) -> Filter:
+        def check(row: Dict[str, Any]) -> bool:
+            current = row.get(column)
+            return current is not None and value is not None and op(current, value)
+
+        return check
+
+    return build
+
+
+_eq = _compare(lambda a, b: a == b or str(a) == str(b))
+_neq = _compare(lambda a, b: a != b)
+_gt = _compare(lambda a, b: a > b)
+_gte = _compare(lambda a, b: a >= b)
+_lt = _compare(lambda a, b: a < b)
+_lte = _compare(lambda a, b: a <= b)
+
+_OPERATORS: Dict[str, Callable[[str, Any], Filter]] = {
+    "eq": _eq,
+    "neq": _neq,
+    "gt": _gt,
+    "gte": _gte,
+    "lt": _lt,
+    "lte": _lte,
+}
+
+
+def _split_conditions(text: str) -> List[str]:
+    """Split on the commas that are outside parentheses and double quotes."""
+    parts, depth, quoted, start = [], 0, False, 0
+    for i, char in enumerate(text):
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char in "()":
+            depth += 1 if char == "(" else -1
+        elif not quoted and char == "," and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+
+def _condition(text: str) -> Filter:
+    for logic in ("and", "or"):
+        if text.startswith(f"{logic}(") and text.endswith(")"):
+            return _logic(logic, text[len(logic) + 1 : -1])
+    column, op, value = text.split(".", 2)
+    if len(value) > 1 and value[0] == value[-1] == '"':
+        value = value[1:-1]
+    return _OPERATORS[op](column, value)
+
+
+def _logic(kind: str, conditions: str) -> Filter:
+    """A PostgREST ``and``/``or`` tree such as ``a.lt.1,and(a.eq.1,b.lt.2)``."""
+    checks = [_condition(part) for part in _split_conditions(conditions)]
+    combine = all if kind == "and" else any
+    return lambda row: combine(check(row) for check in checks)
+
+
+class MemoryQuery:
+    def __init__(self, db: "MemorySupabase", table: str) -> None:
+        self._db = db
+        self._table = table
+        self._action = "select"
+        self._columns: List[str] | None = None
+        self._count: str | None = None
+        self._payload: List[Dict[str, Any]] = []
+        self._on_conflict: Tuple[str, ...] | None = None
+        self._ignore_duplicates = False
+        self._filters: List[Filter] = []
+        self._order: List[Tuple[str, bool]] = []
+        self._limit: int | None = None
+        self._offset = 0
+
+    # Actions
+
+    def select(self, columns: str = "*", count: str | None = None) -> "MemoryQuery":
+        self._action = "select"
+        names = [name.strip() for name in columns.split(",") if name.strip()]
+        self._columns = None if names == ["*"] else names
+        self._count = count
+        return self
+
+    def insert(self, rows: Dict[str, Any] | Sequence[Dict[str, Any]]) -> "MemoryQuery":
+        self._action = "insert"
+        self._payload = [rows] if isinstance(rows, dict) else list(rows)
+        return self
+
+    def upsert(
+        self,
+        rows: Dict[str, Any] | Sequence[Dict[str, Any]],
+        on_conflict: str = "",
+        ignore_duplicates: bool = False,
+    ) -> "MemoryQuery":
+        self._action = "upsert"
+        self._payload = [rows] if isinstance(rows, dict) else list(rows)
+        if on_conflict:
+            self._on_conflict = tuple(name.strip() for name in on_conflict.split(","))
+        self._ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, values: Dict[str, Any]) -> "MemoryQuery":
+        self._action = "update"
+        self._payload = [values]
+        return self
+
+    def delete(self) -> "MemoryQuery":
+        self._action = "delete"
+        return self
+
+    # Filters and modifiers
+
+    def eq(self, column: str, value: Any) -> "MemoryQuery":
+        self._filters.append(_eq(column, value))
+        return self
+
+    def neq(self, column: str, value: Any) -> "MemoryQuery":
+        self._filters.append(_neq(column, value))
+        return self
+
+    def gt(self, column: str, value: Any) -> "MemoryQuery":
+        self._filters.append(_gt(column, value))
+        return self
+
+    def gte(self, column: str, value: Any) -> "MemoryQuery":
+        self._filters.append(_gte(column, value))
+        return self
+
+    def lt(self, column: str, value: Any) -> "MemoryQuery":
+        self._filters.append(_lt(column, value))
+        return self
+
+    def lte(self, column: str, value: Any) -> "MemoryQuery":
+        self._filters.append(_lte(column, value))
+        return self
+
+    def or_(self, filters: str) -> "MemoryQuery":
+        self._filters.append(_logic("or", filters))
+        return self
+
+    def in_(self, column: str, values: Sequence[Any]) -> "MemoryQuery":
+        allowed = {str(value) for value in values}
+        self._filters.append(lambda row: str(row.get(column)) in allowed)
+        return self
+
+    def is_(self, column: str, value: Any) -> "MemoryQuery":
+        expected = None if value in (None, "null") else value
+        self._filters.append(lambda row: row.get(column) is expected)
+        return self
+
+    def order(self, column: str, desc: bool = False) -> "MemoryQuery":
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, size: int) -> "MemoryQuery":
+        self._limit = size
+        return self
+
+    def range(self, start: int, end: int) -> "MemoryQuery":
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    def execute(self) -> MemoryResponse:
+        if self._db.latency:
+            time.sleep(self._db.latency)
+        return self._run()
+
+    # Internals
+
+    def _run(self) -> MemoryResponse:
+        with self._db.lock:
+            rows = self._db.tables.setdefault(self._table, [])
+            if self._action == "select":
+                return self._select(rows)
+            if self._action in ("insert", "upsert"):
+                return MemoryResponse(self._write(rows))
+            matched = [row for row in rows if self._matches(row)]
+            if self._action == "update":
+                for row in matched:
+                    row.update(self._payload[0])
+            else:
+                ids = {id(row) for row in matched}
+                rows[:] = [row for row in rows if id(row) not in ids]
+            return MemoryResponse([dict(row) for row in matched])
+
+    def _matches(self, row: Dict[str, Any]) -> bool:
+        return all(check(row) for check in self._filters)
+
+    def _select(self, rows: List[Dict[str, Any]]) -> MemoryResponse:
+        matched = [row for row in rows if self._matches(row)]
+        count = len(matched) if self._count else None
+        # Stable sorts applied last-key-first give multi-column ordering; NULLs sort last
+        for column, desc in reversed(self._order):
+            present = [row for row in matched if row.get(column) is not None]
+            missing = [row for row in matched if row.get(column) is None]
+            present.sort(key=lambda row: row[column], reverse=desc)
+            matched = present + missing
+        end = None if self._limit is None else self._offset + self._limit
+        matched = matched[self._offset : end]
+        if self._columns is not None:
+            return MemoryResponse(
+                [{name: row.get(name) for name in self._columns} for row in matched], count
+            )
+        return MemoryResponse([dict(row) for row in matched], count)
+
+    def _write(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        key_columns = self._on_conflict or UNIQUE_KEYS.get(self._table)
+        index: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+        if key_columns:
+            index = {tuple(str(row.get(name)) for name in key_columns): row for row in rows}
+
+        written = []
+        for values in self._payload:
+            key = tuple(str(values.get(name)) for name in key_columns) if key_columns else None
+            existing = index.get(key) if key is not None else None
+            if existing is not None:
+                if self._action == "insert":
+                    raise APIError(
+                        {
+                            "message": f"duplicate key value violates unique constraint "
+                            f"on {self._table} ({', '.join(key_columns)})",
+                            "code": "23505",
+                        }
+                    )
+                if not self._ignore_duplicates:
+                    existing.update(values)
+                    written.append(existing)
+                continue
+
+            row = dict(values)
+            if self._table in GENERATED_IDS:
+                row.setdefault("id", str(uuid.uuid4()))
+            if self._table not in UNTIMESTAMPED:
+                row.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+            rows.append(row)
+            if key is not None:
+                index[key] = row
+            written.append(row)
+        return [dict(row) for row in written]
+
+
+@dataclass
+class MemoryRpc:
+    response: MemoryResponse
+
+    def execute(self) -> MemoryResponse:
+        return self.response
+
+
+@dataclass
+class MemorySupabase:
+    """Thread-safe in-process database exposing ``table()`` and ``rpc()`` like the client."""
+
+    tables: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    # Simulated round-trip per query, in seconds
+    latency: float = 0.0
+    functions: Dict[str, Callable[..., Any]] = field(
+        default_factory=lambda: dict(BUILTIN_FUNCTIONS)
+    )
+    lock: threading.RLock = field(default_factory=threading.RLock)
+
+    def table(self, name: str) -> MemoryQuery:
+        return MemoryQuery(self, name)
+
+    def register_rpc(self, name: str, func: Callable[..., Any]) -> None:
+        """Register a Python stand-in for a SQL function; it receives this db and the params."""
+        self.functions[name] = func
+
+    def rpc(self, name: str, params: Dict[str, Any] | None = None) -> MemoryRpc:
+        if name not in self.functions:
+            raise APIError({"message": f"function {name} does not exist", "code": "42883"})
+        if self.latency:
+            time.sleep(self.latency)
+        return MemoryRpc(self._call(name, params))
+
+    def _call(self, name: str, params: Dict[str, Any] | None) -> MemoryResponse:
+        with self.lock:
+            data = self.functions[name](self, **(params or {}))
+        return MemoryResponse(copy.deepcopy(data))
+
+    def reset(self) -> None:
+        with self.lock:
+            self.tables.clear()
+
+
+class AsyncMemoryQuery(MemoryQuery):
+    async def execute(self) -> MemoryResponse:  # type: ignore[override]
+        # The lock is only held for in-memory work, so blocking on it is brief
+        if self._db.latency:
+            await asyncio.sleep(self._db.latency)
+        return self._run()
+
+
+@dataclass
+class AsyncMemoryRpc:
+    db: MemorySupabase
+    name: str
+    params: Dict[str, Any] | None
+
+    async def execute(self) -> MemoryResponse:
+        if self.db.latency:
+            await asyncio.sleep(self.db.latency)
+        return self.db._call(self.name, self.params)
+
+
+@dataclass
+class AsyncMemorySupabase:
+    """Awaitable view of a ``MemorySupabase``; both see the same tables."""
+
+    db: MemorySupabase
+
+    def table(self, name: str) -> AsyncMemoryQuery:
+        return AsyncMemoryQuery(self.db, name)
+
+    def rpc(self, name: str, params: Dict[str, Any] | None = None) -> AsyncMemoryRpc:
+        if name not in self.db.functions:
+            raise APIError({"message": f"function {name} does not exist", "code": "42883"})
+        return AsyncMemoryRpc(self.db, name, params)
+
+
+def refresh_stock_coverage(
+    db: MemorySupabase, p_stock_id: str, p_source_file_hash: str | None = None
+) -> None:
+    """Mirror of the ``refresh_stock_coverage`` SQL function in infra/supabase.sql."""
+    # Runs under the db lock as one round trip, so read the tables directly
+    tickers = [row["ticker"] for row in db.tables.get(STOCKS_TABLE, []) if row["id"] == p_stock_id]
+    dates = [row["date"] for row in db.tables.get(OHLC_TABLE, []) if row["stock_id"] == p_stock_id]
+    if not tickers or not dates:
+        return None
+    coverage = db.tables.setdefault(STOCK_COVERAGE_TABLE, [])
+    coverage[:] = [row for row in coverage if row["stock_id"] != p_stock_id]
+    coverage.append(
+        {
+            "stock_id": p_stock_id,
+            "ticker": tickers[0],
+            "min_date": min(dates),
+            "max_date": max(dates),
+            "row_count": len(dates),
+            "last_ingested_at": datetime.now(timezone.utc).isoformat(),
+            "last_source_file_hash": p_source_file_hash,
+        }
+    )
+    return None
+
+
+def latest_analyses(db: MemorySupabase, p_tickers: List[str] | None = None) -> List[Dict[str, Any]]:
+    """Mirror of the ``latest_analyses`` SQL function in infra/supabase.sql."""
+    latest: Dict[str, Dict[str, Any]] = {}
+    for row in db.tables.get(ANALYSES_TABLE, []):
+        current = latest.get(row["stock_id"])
+        # Ties on created_at go to the larger id, as in the SQL
+        if current is None or (row["created_at"], row["id"]) > (
+            current["created_at"],
+            current["id"],
+        ):
+            latest[row["stock_id"]] = row
+    columns = ("id", "date_range_start", "date_range_end", "rsi", "macd", "signal", "created_at")
+    rows = [
+        {"ticker": stock["ticker"], **{name: latest[stock["id"]].get(name) for name in columns}}
+        for stock in db.tables.get(STOCKS_TABLE, [])
+        if stock["id"] in latest and (p_tickers is None or stock["ticker"] in p_tickers)
+    ]
+    return sorted(rows, key=lambda row: row["ticker"])
+
+
+BUILTIN_FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    "refresh_stock_coverage": refresh_stock_coverage,
+    "latest_analyses": latest_analyses,
+}
@@ -1,4 +1,7 @@
 STOCKS_TABLE = "stocks"
 OHLC_TABLE = "ohlc_daily"
+STOCK_COVERAGE_TABLE = "stock_coverage"
 ANALYSES_TABLE = "analyses"
 EMBEDDINGS_TABLE = "analysis_embeddings"
+EMBEDDING_CACHE_TABLE = "embedding_cache"
+PENDING_EMBEDDINGS_TABLE = "pending_embeddings"
@@ -0,0 +1,564 @@
+"""Storage operations behind the API and the agent tools, independent of the engine.
+
+``SupabaseRepository`` talks to PostgREST (or to the in-memory stand-in, which has
+the same client surface); ``DuckDBRepository`` in ``duckdb_repository`` keeps every
+table in an embedded DuckDB file. ``DATABASE_BACKEND`` picks one per process.
+Embeddings and semantic search stay on Postgres whichever backend serves the rest.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from datetime import date, timedelta
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+from app.core.timing import span, traced
+from app.db.client import (
+    async_memory_db,
+    get_async_supabase_client,
+    get_supabase_client,
+    memory_db,
+)
+from app.db.models import (
+    ANALYSES_TABLE,
+    OHLC_TABLE,
+    PENDING_EMBEDDINGS_TABLE,
+    STOCK_COVERAGE_TABLE,
+    STOCKS_TABLE,
+)
+
+OHLC_COLUMNS = ("date", "open", "high", "low", "close", "volume")
+OHLC_DTYPES = {
+    "date": "U10",
+    "open": np.float64,
+    "high": np.float64,
+    "low": np.float64,
+    "close": np.float64,
+    "volume": np.int64,
+}
+COVERAGE_COLUMNS = ("ticker", "min_date", "max_date", "row_count", "last_ingested_at")
+RECENT_ANALYSIS_COLUMNS = (
+    "id",
+    "date_range_start",
+    "date_range_end",
+    "rsi",
+    "macd",
+    "hist",
+    "signal",
+    "summary",
+)
+
+Columns = Dict[str, np.ndarray]
+
+# Timestamps as the backends render them, which is also all a cursor may contain
+_CURSOR_TIME = re.compile(r"[0-9][0-9T:.+ -]*")
+
+
+def analysis_cursor(row: Dict[str, Any]) -> str:
+    """Keyset cursor past ``row`` in newest-first order; the id orders equal timestamps."""
+    return f"{row['created_at']}|{row['id']}"
+
+
+def parse_analysis_cursor(cursor: str) -> tuple[str, str | None]:
+    """``(created_at, id)`` of a cursor; ``id`` is None for a bare ``created_at`` cursor.
+
+    Raises ValueError for anything else, since the parts end up inside filter strings.
+    """
+    created_at, _, analysis_id = cursor.partition("|")
+    if not _CURSOR_TIME.fullmatch(created_at):
+        raise ValueError(f"Invalid analyses cursor: {cursor!r}")
+    if not analysis_id:
+        return created_at, None
+    return created_at, str(uuid.UUID(analysis_id))
+
+
+def end_date_window(end_date: str, tolerance_days: int) -> tuple[str, str]:
+    end = date.fromisoformat(end_date)
+    return (
+        (end - timedelta(days=tolerance_days)).isoformat(),
+        (end + timedelta(days=tolerance_days)).isoformat(),
+    )
+
+
+class Repository(ABC):
+    """Reads return JSON-ready values: ISO date strings, string ids, numpy OHLC columns.
+
+    Implementations provide the sync methods. The ``_async`` variants run them in a
+    worker thread unless the store has a native async client.
+    """
+
+    # Embeddings live in Postgres (worker queue, analysis_embeddings, /search), next to
+    # the analyses they reference; stores without them skip embedding altogether
+    stores_embeddings = True
+
+    @abstractmethod
+    def find_stock_id(self, ticker: str) -> str | None: ...
+
+    @abstractmethod
+    def get_or_create_stock(self, ticker: str) -> Dict[str, Any]: ...
+
+    @abstractmethod
+    def upsert_ohlc(self, stock_id: str, df: pd.DataFrame, source_hash: str) -> int:
+        """Write date-keyed bars, replacing existing dates, and refresh the stock's coverage."""
+
+    @abstractmethod
+    def ohlc_columns(
+        self,
+        stock_id: str,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        after: str | None = None,
+        limit: int | None = None,
+    ) -> Columns:
+        """Date-ordered bars in [start_date, end_date] as one array per column.
+
+        ``after`` and ``limit`` keyset-page the range: at most ``limit`` bars dated
+        after ``after``.
+        """
+
+    @abstractmethod
+    def stock_coverage(self) -> List[Dict[str, Any]]:
+        """Date range, bar count and last ingest time of every stock, by ticker."""
+
+    @abstractmethod
+    def insert_analysis(self, row: Dict[str, Any]) -> Dict[str, Any]: ...
+
+    @abstractmethod
+    def list_analyses(
+        self, stock_id: str, columns: Sequence[str], before: str | None, limit: int
+    ) -> List[Dict[str, Any]]:
+        """Newest-first analyses past the ``before`` cursor (see ``analysis_cursor``).
+
+        Ordered by ``(created_at, id)``, so analyses created at the same instant are
+        neither repeated nor skipped across pages.
+        """
+
+    @abstractmethod
+    def get_analysis(self, analysis_id: str, columns: Sequence[str]) -> Dict[str, Any] | None: ...
+
+    @abstractmethod
+    def latest_analyses(self) -> List[Dict[str, Any]]:
+        """The newest analysis of every stock with its ticker, by ticker."""
+
+    @abstractmethod
+    def recent_analyses(
+        self, stock_id: str, end_date: str, tolerance_days: int, limit: int
+    ) -> List[Dict[str, Any]]:
+        """Newest-first analyses whose window ends within ``tolerance_days`` of ``end_date``."""
+
+    @abstractmethod
+    def last_ingest(self, ticker: str | None) -> Dict[str, Any] | None:
+        """Coverage of the most recently ingested stock (``ticker`` only, if given)."""
+
+    @abstractmethod
+    def last_analysis(self, stock_id: str | None) -> Dict[str, Any] | None:
+        """Id and ``created_at`` of the newest analysis (of ``stock_id`` only, if given)."""
+
+    @abstractmethod
+    def enqueue_embedding(self, analysis_id: str) -> None:
+        """Queue an analysis for the embedding worker; a no-op if already queued."""
+
+    async def find_stock_id_async(self, ticker: str) -> str | None:
+        return await asyncio.to_thread(self.find_stock_id, ticker)
+
+    async def get_or_create_stock_async(self, ticker: str) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.get_or_create_stock, ticker)
+
+    async def upsert_ohlc_async(self, stock_id: str, df: pd.DataFrame, source_hash: str) -> int:
+        return await asyncio.to_thread(self.upsert_ohlc, stock_id, df, source_hash)
+
+    async def ohlc_columns_async(
+        self,
+        stock_id: str,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        after: str | None = None,
+        limit: int | None = None,
+    ) -> Columns:
+        return await asyncio.to_thread(
+            self.ohlc_columns, stock_id, start_date, end_date, after, limit
+        )
+
+    async def stock_coverage_async(self) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.stock_coverage)
+
+    async def insert_analysis_async(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.insert_analysis, row)
+
+    async def list_analyses_async(
+        self, stock_id: str, columns: Sequence[str], before: str | None, limit: int
+    ) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.list_analyses, stock_id, columns, before, limit)
+
+    async def get_analysis_async(
+        self, analysis_id: str, columns: Sequence[str]
+    ) -> Dict[str, Any] | None:
+        return await asyncio.to_thread(self.get_analysis, analysis_id, columns)
+
+    async def latest_analyses_async(self) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.latest_analyses)
+
+    async def recent_analyses_async(
+        self, stock_id: str, end_date: str, tolerance_days: int, limit: int
+    ) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(
+            self.recent_analyses, stock_id, end_date, tolerance_days, limit
+        )
+
+    async def last_ingest_async(self, ticker: str | None) -> Dict[str, Any] | None:
+        return await asyncio.to_thread(self.last_ingest, ticker)
+
+    async def last_analysis_async(self, stock_id: str | None) -> Dict[str, Any] | None:
+        return await asyncio.to_thread(self.last_analysis, stock_id)
+
+    async def enqueue_embedding_async(self, analysis_id: str) -> None:
+        await asyncio.to_thread(self.enqueue_embedding, analysis_id)
+
+    def close(self) -> None:
+        return None
+
+
+def _first(result) -> Dict[str, Any] | None:
+    return result.data[0] if result.data else None
+
+
+def _ohlc_rows(stock_id: str, df: pd.DataFrame) -> List[Dict[str, Any]]:
+    rows = []
+    for _, row in df.iterrows():
+        rows.append(
+            {
+                "stock_id": stock_id,
+                "date": row["date"].isoformat(),
+                "open": float(row["open"]),
+                "high": float(row["high"]),
+                "low": float(row["low"]),
+                "close": float(row["close"]),
+                "volume": int(row["volume"]),
+            }
+        )
+    return rows
+
+
+def _coverage_params(stock_id: str, source_hash: str) -> Dict[str, Any]:
+    # The file hash is recorded once per ingest on stock_coverage, not on every bar
+    return {"p_stock_id": stock_id, "p_source_file_hash": source_hash}
+
+
+def _to_columns(rows: List[Dict[str, Any]]) -> Columns:
+    return {
+        name: np.array([row[name] for row in rows], dtype=dtype)
+        for name, dtype in OHLC_DTYPES.items()
+    }
+
+
+@traced("db.fetch_ohlc")
+def _fetch_ohlc_page(query) -> List[Dict[str, Any]]:
+    return query.execute().data or []
+
+
+@traced("db.fetch_ohlc")
+async def _fetch_ohlc_page_async(query) -> List[Dict[str, Any]]:
+    return (await query.execute()).data or []
+
+
+class SupabaseRepository(Repository):
+    """PostgREST queries over the sync and async Supabase clients.
+
+    Without explicit clients it uses the process-wide ones, so it is cheap to create.
+    """
+
+    def __init__(self, client=None, async_client=None) -> None:
+        self._client = client
+        self._async_client = async_client
+
+    def _sync(self):
+        return self._client if self._client is not None else get_supabase_client()
+
+    async def _async(self):
+        if self._async_client is not None:
+            return self._async_client
+        return await get_async_supabase_client()
+
+    # Query builders shared by the sync and async methods
+
+    @staticmethod
+    def _stock_query(client, ticker: str):
+        return client.table(STOCKS_TABLE).select("id,ticker").eq("ticker", ticker)
+
+    @staticmethod
+    def _ohlc_page_query(
+        client,
+        stock_id: str,
+        start_date: str | None,
+        end_date: str | None,
+        after: str | None,
+        size: int,
+    ):
+        query = client.table(OHLC_TABLE).select(",".join(OHLC_COLUMNS)).eq("stock_id", stock_id)
+        if start_date:
+            query = query.gte("date", start_date)
+        if end_date:
+            query = query.lte("date", end_date)
+        if after:
+            query = query.gt("date", after)
+        return query.order("date").limit(size)
+
+    @staticmethod
+    def _ohlc_page_size(fetched: int, limit: int | None) -> int:
+        # Keyset pages no larger than PostgREST's max-rows, so a short page is the last one
+        if limit is None:
+            return settings.ohlc_page_size
+        return min(settings.ohlc_page_size, limit - fetched)
+
+    @staticmethod
+    def _coverage_query(client):
+        return client.table(STOCK_COVERAGE_TABLE).select(",".join(COVERAGE_COLUMNS)).order("ticker")
+
+    @staticmethod
+    def _analyses_query(
+        client, stock_id: str, columns: Sequence[str], before: str | None, limit: int
+    ):
+        query = client.table(ANALYSES_TABLE).select(",".join(columns)).eq("stock_id", stock_id)
+        if before:
+            created_at, analysis_id = parse_analysis_cursor(before)
+            if analysis_id is None:
+                query = query.lt("created_at", created_at)
+            else:
+                # Quoted because timestamps hold the "." and ":" that PostgREST's syntax uses
+                query = query.or_(
+                    f'created_at.lt."{created_at}",'
+                    f'and(created_at.eq."{created_at}",id.lt.{analysis_id})'
+                )
+        return query.order("created_at", desc=True).order("id", desc=True).limit(limit)
+
+    @staticmethod
+    def _analysis_query(client, analysis_id: str, columns: Sequence[str]):
+        return client.table(ANALYSES_TABLE).select(",".join(columns)).eq("id", analysis_id)
+
+    @staticmethod
+    def _recent_query(client, stock_id: str, end_date: str, tolerance_days: int, limit: int):
+        low, high = end_date_window(end_date, tolerance_days)
+        return (
+            client.table(ANALYSES_TABLE)
+            .select(",".join(RECENT_ANALYSIS_COLUMNS))
+            .eq("stock_id", stock_id)
+            .gte("date_range_end", low)
+            .lte("date_range_end", high)
+            .order("created_at", desc=True)
+            .limit(limit)
+        )
+
+    @staticmethod
+    def _last_ingest_query(client, ticker: str | None):
+        query = client.table(STOCK_COVERAGE_TABLE).select("ticker,row_count,last_ingested_at")
+        if ticker is not None:
+            query = query.eq("ticker", ticker)
+        return query.order("last_ingested_at", desc=True).limit(1)
+
+    @staticmethod
+    def _last_analysis_query(client, stock_id: str | None):
+        query = client.table(ANALYSES_TABLE).select("id,created_at")
+        if stock_id is not None:
+            query = query.eq("stock_id", stock_id)
+        return query.order("created_at", desc=True).order("id", desc=True).limit(1)
+
+    @staticmethod
+    def _enqueue_query(client, analysis_id: str):
+        return client.table(PENDING_EMBEDDINGS_TABLE).upsert(
+            {"analysis_id": analysis_id}, on_conflict="analysis_id", ignore_duplicates=True
+        )
+
+    # Sync
+
+    def find_stock_id(self, ticker: str) -> str | None:
+        stock = _first(self._stock_query(self._sync(), ticker).execute())
+        return None if stock is None else stock["id"]
+
+    def get_or_create_stock(self, ticker: str) -> Dict[str, Any]:
+        client = self._sync()
+        existing = _first(self._stock_query(client, ticker).execute())
+        if existing is not None:
+            return existing
+        return client.table(STOCKS_TABLE).insert({"ticker": ticker}).execute().data[0]
+
+    def upsert_ohlc(self, stock_id: str, df: pd.DataFrame, source_hash: str) -> int:
+        rows = _ohlc_rows(stock_id, df)
+        if rows:
+            client = self._sync()
+            params = _coverage_params(stock_id, source_hash)
+            with span("db.upsert_ohlc", rows=len(rows)):
+                client.table(OHLC_TABLE).upsert(rows, on_conflict="stock_id,date").execute()
+            with span("db.refresh_stock_coverage"):
+                client.rpc("refresh_stock_coverage", params).execute()
+        return len(rows)
+
+    def ohlc_columns(
+        self,
+        stock_id: str,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        after: str | None = None,
+        limit: int | None = None,
+    ) -> Columns:
+        client = self._sync()
+        rows: List[Dict[str, Any]] = []
+        while True:
+            size = self._ohlc_page_size(len(rows), limit)
+            query = self._ohlc_page_query(client, stock_id, start_date, end_date, after, size)
+            page = _fetch_ohlc_page(query)
+            rows.extend(page)
+            if len(page) < size or len(rows) == limit:
+                return _to_columns(rows)
+            after = page[-1]["date"]
+
+    def stock_coverage(self) -> List[Dict[str, Any]]:
+        return self._coverage_query(self._sync()).execute().data or []
+
+    def insert_analysis(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        return self._sync().table(ANALYSES_TABLE).insert(row).execute().data[0]
+
+    def list_analyses(
+        self, stock_id: str, columns: Sequence[str], before: str | None, limit: int
+    ) -> List[Dict[str, Any]]:
+        query = self._analyses_query(self._sync(), stock_id, columns, before, limit)
+        return query.execute().data or []
+
+    def get_analysis(self, analysis_id: str, columns: Sequence[str]) -> Dict[str, Any] | None:
+        return _first(self._analysis_query(self._sync(), analysis_id, columns).execute())
+
+    def latest_analyses(self) -> List[Dict[str, Any]]:
+        return self._sync().rpc("latest_analyses", {"p_tickers": None}).execute().data or []
+
+    def recent_analyses(
+        self, stock_id: str, end_date: str, tolerance_days: int, limit: int
+    ) -> List[Dict[str, Any]]:
+        query = self._recent_query(self._sync(), stock_id, end_date, tolerance_days, limit)
+        return query.execute().data or []
+
+    def last_ingest(self, ticker: str | None) -> Dict[str, Any] | None:
+        return _first(self._last_ingest_query(self._sync(), ticker).execute())
+
+    def last_analysis(self, stock_id: str | None) -> Dict[str, Any] | None:
+        return _first(self._last_analysis_query(self._sync(), stock_id).execute())
+
+    def enqueue_embedding(self, analysis_id: str) -> None:
+        self._enqueue_query(self._sync(), analysis_id).execute()
+
+    # Async
+
+    async def find_stock_id_async(self, ticker: str) -> str | None:
+        stock = _first(await self._stock_query(await self._async(), ticker).execute())
+        return None if stock is None else stock["id"]
+
+    async def get_or_create_stock_async(self, ticker: str) -> Dict[str, Any]:
+        client = await self._async()
+        existing = _first(await self._stock_query(client, ticker).execute())
+        if existing is not None:
+            return existing
+        return (await client.table(STOCKS_TABLE).insert({"ticker": ticker}).execute()).data[0]
+
+    async def upsert_ohlc_async(self, stock_id: str, df: pd.DataFrame, source_hash: str) -> int:
+        rows = _ohlc_rows(stock_id, df)
+        if rows:
+            client = await self._async()
+            params = _coverage_params(stock_id, source_hash)
+            with span("db.upsert_ohlc", rows=len(rows)):
+                await client.table(OHLC_TABLE).upsert(rows, on_conflict="stock_id,date").execute()
+            with span("db.refresh_stock_coverage"):
+                await client.rpc("refresh_stock_coverage", params).execute()
+        return len(rows)
+
+    async def ohlc_columns_async(
+        self,
+        stock_id: str,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        after: str | None = None,
+        limit: int | None = None,
+    ) -> Columns:
+        client = await self._async()
+        rows: List[Dict[str, Any]] = []
+        while True:
+            size = self._ohlc_page_size(len(rows), limit)
+            query = self._ohlc_page_query(client, stock_id, start_date, end_date, after, size)
+            page = await _fetch_ohlc_page_async(query)
+            rows.extend(page)
+            if len(page) < size or len(rows) == limit:
+                return _to_columns(rows)
+            after = page[-1]["date"]
+
+    async def stock_coverage_async(self) -> List[Dict[str, Any]]:
+        return (await self._coverage_query(await self._async()).execute()).data or []
+
+    async def insert_analysis_async(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        client = await self._async()
+        return (await client.table(ANALYSES_TABLE).insert(row).execute()).data[0]
+
+    async def list_analyses_async(
+        self, stock_id: str, columns: Sequence[str], before: str | None, limit: int
+    ) -> List[Dict[str, Any]]:
+        query = self._analyses_query(await self._async(), stock_id, columns, before, limit)
+        return (await query.execute()).data or []
+
+    async def get_analysis_async(
+        self, analysis_id: str, columns: Sequence[str]
+    ) -> Dict[str, Any] | None:
+        query = self._analysis_query(await self._async(), analysis_id, columns)
+        return _first(await query.execute())
+
+    async def latest_analyses_async(self) -> List[Dict[str, Any]]:
+        client = await self._async()
+        return (await client.rpc("latest_analyses", {"p_tickers": None}).execute()).data or []
+
+    async def recent_analyses_async(
+        self, stock_id: str, end_date: str, tolerance_days: int, limit: int
+    ) -> List[Dict[str, Any]]:
+        query = self._recent_query(await self._async(), stock_id, end_date, tolerance_days, limit)
+        return (await query.execute()).data or []
+
+    async def last_ingest_async(self, ticker: str | None) -> Dict[str, Any] | None:
+        return _first(await self._last_ingest_query(await self._async(), ticker).execute())
+
+    async def last_analysis_async(self, stock_id: str | None) -> Dict[str, Any] | None:
+        query = self._last_analysis_query(await self._async(), stock_id)
+        return _first(await query.execute())
+
+    async def enqueue_embedding_async(self, analysis_id: str) -> None:
+        await self._enqueue_query(await self._async(), analysis_id).execute()
+
+
+_repository: Repository | None = None
+_lock = threading.Lock()
+
+
+def get_repository() -> Repository:
+    """Process-wide repository for ``DATABASE_BACKEND`` (supabase, memory or duckdb)."""
+    global _repository
+    with _lock:
+        if _repository is None:
+            if settings.database_backend == "duckdb":
+                # Optional dependency, only needed when this backend is selected
+                from app.db.duckdb_repository import DuckDBRepository
+
+                _repository = DuckDBRepository(settings.duckdb_path)
+            elif settings.database_backend == "memory":
+                _repository = SupabaseRepository(memory_db, async_memory_db)
+            else:
+                _repository = SupabaseRepository()
+        return _repository
+
+
+def close_repository() -> None:
+    global _repository
+    with _lock:
+        if _repository is not None:
+            _repository.close()
+        _repository = None
@@ -1,46 +1,51 @@
 from __future__ import annotations
 
+import asyncio
 from typing import Any, Dict
 
 import pandas as pd
 
-from app.db.models import OHLC_TABLE, STOCKS_TABLE
+from app.core.timing import traced
+from app.db.repository import Repository
+from app.services.data_versions import INGEST, data_versions
+from app.services.ohlc_store import ohlc_store
 
 
-def get_or_create_stock(supabase, ticker: str) -> Dict[str, Any]:
-    existing = supabase.table(STOCKS_TABLE).select("id,ticker").eq("ticker", ticker).execute()
-    if existing.data:
-        return existing.data[0]
+@traced("db.get_or_create_stock")
+def get_or_create_stock(repo: Repository, ticker: str) -> Dict[str, Any]:
+    return repo.get_or_create_stock(ticker)
 
-    inserted = supabase.table(STOCKS_TABLE).insert({"ticker": ticker}).execute()
-    return inserted.data[0]
+
+@traced("db.get_or_create_stock")
+async def get_or_create_stock_async(repo: Repository, ticker: str) -> Dict[str, Any]:
+    return await repo.get_or_create_stock_async(ticker)
 
 
 def load_ohlc_data(
-    supabase,
+    repo: Repository,
     ticker: str,
     df: pd.DataFrame,
     source_hash: str,
 ) -> Dict[str, Any]:
-    stock = get_or_create_stock(supabase, ticker)
-    stock_id = stock["id"]
-
-    rows = []
-    for _, row in df.iterrows():
-        rows.append(
-            {
-                "stock_id": stock_id,
-                "date": row["date"].isoformat(),
-                "open": float(row["open"]),
-                "high": float(row["high"]),
-                "low": float(row["low"]),
-                "close": float(row["close"]),
-                "volume": int(row["volume"]),
-                "source_file_hash": source_hash,
-            }
-        )
-
+    stock_id = get_or_create_stock(repo, ticker)["id"]
+    rows = repo.upsert_ohlc(stock_id, df, source_hash)
     if rows:
-        supabase.table(OHLC_TABLE).upsert(rows, on_conflict="stock_id,date").execute()
+        if ohlc_store.enabled:
+            ohlc_store.record_ingest(ticker, df)
+        data_versions.bump(INGEST, ticker)
+    return {"stock_id": stock_id, "rows": rows}
 
-    return {"stock_id": stock_id, "rows": len(rows)}
+
+async def load_ohlc_data_async(
+    repo: Repository,
+    ticker: str,
+    df: pd.DataFrame,
+    source_hash: str,
+) -> Dict[str, Any]:
+    stock_id = (await get_or_create_stock_async(repo, ticker))["id"]
+    rows = await repo.upsert_ohlc_async(stock_id, df, source_hash)
+    if rows:
+        if ohlc_store.enabled:
+            await asyncio.to_thread(ohlc_store.record_ingest, ticker, df)
+        data_versions.bump(INGEST, ticker)
+    return {"stock_id": stock_id, "rows": rows}
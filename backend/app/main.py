@@ -1,14 +1,84 @@
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
 
+from fastapi import FastAPI, Request
+from starlette.routing import Match
+
+from app.agents.checkpoint import prune_checkpoints
 from app.api.routes.analyze import router as analyze_router
+from app.api.routes.health import router as health_router
 from app.api.routes.ingest import router as ingest_router
+from app.api.routes.search import router as search_router
 from app.api.routes.stocks import router as stocks_router
+from app.core.compression import CompressionMiddleware
+from app.core.config import settings
 from app.core.logging import setup_logging
+from app.core.metrics import metrics
+from app.core.responses import JSONResponse
+from app.core.timing import start_request
+from app.db.client import close_clients_async, open_clients_async
+from app.db.repository import close_repository, get_repository
+from app.services.embedding_worker import embedding_worker
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    prune_checkpoints()
+    await open_clients_async()
+    # The worker embeds analyses out of Postgres; other stores have none for it
+    run_worker = settings.embedding_worker_enabled and get_repository().stores_embeddings
+    if run_worker:
+        embedding_worker.start()
+    yield
+    if run_worker:
+        embedding_worker.stop()
+    await close_clients_async()
+    close_repository()
+
+
+def _route_template(request: Request) -> str:
+    # Label by route template rather than raw path to keep metric cardinality bounded
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(route, "path", request.url.path)
+    return "unmatched"
+
+
+async def record_timings(request: Request, call_next):
+    debug = settings.debug_timings or request.headers.get("x-debug-timings") == "1"
+    timings = start_request(debug)
+    started = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
+    metrics.observe(
+        "http_request_duration_seconds",
+        elapsed,
+        method=request.method,
+        route=_route_template(request),
+        status=response.status_code,
+    )
+    if debug:
+        header = timings.server_timing()
+        total = f"total;dur={elapsed * 1000:.1f}"
+        response.headers["Server-Timing"] = f"{header}, {total}" if header else total
+    return response
 
 
 def create_app() -> FastAPI:
     setup_logging()
-    app = FastAPI(title="AI Equity Research Agent")
+    app = FastAPI(
+        title="AI Equity Research Agent", lifespan=lifespan, default_response_class=JSONResponse
+    )
+    if settings.response_compression_enabled:
+        # Inside the timing middleware, so request latency includes compression
+        app.add_middleware(
+            CompressionMiddleware,
+            minimum_size=settings.response_compression_min_bytes,
+            gzip_level=settings.response_gzip_level,
+            brotli_quality=settings.response_brotli_quality,
+        )
+    app.middleware("http")(record_timings)
 
     @app.get("/ping", tags=["health"])
     async def ping() -> dict:
@@ -18,6 +88,8 @@ def create_app() -> FastAPI:
     app.include_router(ingest_router)
     app.include_router(analyze_router)
     app.include_router(stocks_router)
+    app.include_router(search_router)
+    app.include_router(health_router)
     return app
 
 
@@ -9,3 +9,5 @@ class AnalyzeRequest(BaseModel):
     tickers: List[str] = Field(..., min_length=1)
     start_date: str
     end_date: str
+    batch_research: bool = False
+    run_id: str | None = None
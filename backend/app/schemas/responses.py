@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Dict, List
+from typing import Any, Dict, List
 
 from pydantic import BaseModel
 
@@ -11,10 +11,13 @@ class AnalysisResult(BaseModel):
     indicators: Dict[str, float | str]
     thesis: str
     analysis_id: str
+    reused_analysis_id: str | None = None
 
 
 class AnalyzeResponse(BaseModel):
+    run_id: str
     results: List[AnalysisResult]
+    timings: List[Dict[str, Any]] | None = None
 
 
 class IngestResponse(BaseModel):
@@ -26,6 +29,8 @@ class StockInfo(BaseModel):
     ticker: str
     min_date: str
     max_date: str
+    row_count: int | None = None
+    last_ingested_at: str | None = None
 
 
 class StocksResponse(BaseModel):
@@ -39,12 +44,27 @@ class AnalysisHistory(BaseModel):
     rsi: float
     macd: float
     signal: str
-    summary: str
+    # Left out of history pages unless requested; fetch it from /analyses/{id}
+    summary: str | None = None
     created_at: str
 
 
 class AnalysisHistoryResponse(BaseModel):
     analyses: List[AnalysisHistory]
+    next_cursor: str | None = None
+
+
+class LatestAnalysis(AnalysisHistory):
+    ticker: str
+
+
+class LatestAnalysesResponse(BaseModel):
+    analyses: List[LatestAnalysis]
+
+
+class AnalysisDetail(AnalysisHistory):
+    hist: float | None = None
+    summary: str
 
 
 class OhlcData(BaseModel):
@@ -59,3 +79,47 @@ class OhlcData(BaseModel):
 class OhlcDataResponse(BaseModel):
     ticker: str
     data: List[OhlcData]
+    next_cursor: str | None = None
+
+
+class OhlcColumnsResponse(BaseModel):
+    ticker: str
+    date: List[str]
+    open: List[float]
+    high: List[float]
+    low: List[float]
+    close: List[float]
+    volume: List[int]
+    next_cursor: str | None = None
+
+
+class ModelHealthInfo(BaseModel):
+    model: str
+    circuit_open: bool
+    cooldown_remaining: float
+    successes: int
+    failures: int
+    rate_limits: int
+    latency_ewma: float | None = None
+    last_error: str | None = None
+
+
+class ModelHealthResponse(BaseModel):
+    text_models: List[str]
+    embedding_models: List[str]
+    models: List[ModelHealthInfo]
+
+
+class SearchResult(BaseModel):
+    analysis_id: str
+    ticker: str
+    date_range_start: str
+    date_range_end: str
+    signal: str
+    summary: str
+    created_at: str
+    score: float
+
+
+class SearchResponse(BaseModel):
+    results: List[SearchResult]
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+import pandas as pd
+
+from app.core.config import settings
+
+# Resources whose responses change on ingest ("ohlc", "stocks") or on a new analysis
+INGEST = "ingest"
+ANALYSES = "analyses"
+ALL_TICKERS = "*"
+
+# The persisted column that dates the newest write of each kind
+MODIFIED_COLUMNS = {INGEST: "last_ingested_at", ANALYSES: "created_at"}
+
+
+@dataclass(frozen=True)
+class Validators:
+    etag: str
+    last_modified: float | None
+    # The persisted write state the validators were built from
+    stamp: str
+
+
+def validators(
+    kind: str, ticker: str, variant: str, last_write: Dict[str, Any] | None
+) -> Validators:
+    """Weak ETag and Last-Modified time for one resource; ``variant`` covers query params.
+
+    ``last_write`` is the newest persisted write behind the resource, as returned by
+    ``Repository.last_ingest`` or ``last_analysis``. Every worker and process reads
+    the same row, so they all hand out the same validators for the same data.
+    """
+    stamp = "" if last_write is None else "|".join(str(value) for value in last_write.values())
+    key = f"{kind}|{ticker}|{variant}|{stamp}"
+    digest = hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+    modified = None if last_write is None else last_write.get(MODIFIED_COLUMNS[kind])
+    return Validators(f'W/"{kind}-{digest}"', _timestamp(modified), stamp)
+
+
+def _timestamp(value: str | None) -> float | None:
+    if not value:
+        return None
+    parsed = pd.Timestamp(value)
+    # Postgres ``timestamp`` columns come back without an offset and hold UTC
+    return (parsed if parsed.tzinfo else parsed.tz_localize("UTC")).timestamp()
+
+
+class DataVersions:
+    """Per-ticker write counters that tell this process's caches about its own writes.
+
+    Bumped by the write paths so the read cache drops affected entries at once.
+    Writes from other processes never reach them; HTTP validators come from the
+    persisted state instead (``validators``).
+    """
+
+    def __init__(self) -> None:
+        self._versions: Dict[Tuple[str, str], int] = {}
+        self._listeners: List[Callable[[str, str], None]] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, listener: Callable[[str, str], None]) -> None:
+        """Call ``listener(kind, ticker)`` after every bump."""
+        self._listeners.append(listener)
+
+    def bump(self, kind: str, ticker: str) -> None:
+        with self._lock:
+            for key in ((kind, ticker), (kind, ALL_TICKERS)):
+                self._versions[key] = self._versions.get(key, 0) + 1
+        for listener in self._listeners:
+            listener(kind, ticker)
+
+    def get(self, kind: str, ticker: str = ALL_TICKERS) -> int:
+        with self._lock:
+            return self._versions.get((kind, ticker), 0)
+
+
+data_versions = DataVersions()
+
+
+_LastWrite = Tuple[Dict[str, Any] | None, int, float]
+
+
+class LastWrites:
+    """Newest persisted write per (kind, ticker), reused for ``ttl_seconds``.
+
+    Saves revalidations the lookup behind ``validators``: within the TTL a 304 needs
+    no database round trip. Writes in this process bump ``data_versions`` and
+    reload at once; writes from other processes show up once the entry expires.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # (kind, ticker) -> (last write, data_versions counter, expiry)
+        self._entries: OrderedDict[Tuple[str, str], _LastWrite] = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get_or_load_async(
+        self,
+        kind: str,
+        ticker: str,
+        load: Callable[[], Awaitable[Dict[str, Any] | None]],
+    ) -> Dict[str, Any] | None:
+        key = (kind, ticker)
+        # Read the version first so a write racing the load leaves a stale-marked entry
+        version = data_versions.get(kind, ticker)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == version and entry[2] > time.monotonic():
+                self._entries.move_to_end(key)
+                return entry[0]
+        last_write = await load()
+        if self.ttl_seconds > 0:
+            with self._lock:
+                self._entries[key] = (last_write, version, time.monotonic() + self.ttl_seconds)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return last_write
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+last_writes = LastWrites(
+    ttl_seconds=settings.validator_ttl_seconds,
+    max_entries=settings.read_cache_max_entries,
+)
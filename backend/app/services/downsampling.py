@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from typing import Dict
+
+import numpy as np
+
+Columns = Dict[str, np.ndarray]
+
+
+def _days(dates: np.ndarray) -> np.ndarray:
+    return dates.astype("datetime64[D]").astype(np.int64)
+
+
+def bucket_ohlc(columns: Columns, max_points: int) -> Columns:
+    """Aggregate date-ordered bars into at most ``max_points`` equal-length time buckets.
+
+    Each bucket keeps its first date and open, the max high, the min low, the last
+    close and the summed volume, so candles still bracket every traded price.
+    """
+    size = len(columns["date"])
+    if size <= max_points:
+        return columns
+    days = _days(columns["date"])
+    span = days[-1] - days[0] + 1
+    bucket = (days - days[0]) * max_points // span
+    starts = np.flatnonzero(np.diff(bucket, prepend=-1))
+    ends = np.append(starts[1:], size) - 1
+    return {
+        "date": columns["date"][starts],
+        "open": columns["open"][starts],
+        "high": np.maximum.reduceat(columns["high"], starts),
+        "low": np.minimum.reduceat(columns["low"], starts),
+        "close": columns["close"][ends],
+        "volume": np.add.reduceat(columns["volume"], starts),
+    }
+
+
+def lttb(columns: Columns, max_points: int, value: str = "close") -> Columns:
+    """Largest-Triangle-Three-Buckets selection of whole bars for line charts.
+
+    Keeps the first and last bar and, from each of the ``max_points - 2`` buckets in
+    between, the bar forming the largest triangle with the previous pick and the next
+    bucket's mean. Picks depend on the previous one, so only the per-bucket area is
+    vectorized.
+    """
+    size = len(columns["date"])
+    if size <= max_points or max_points < 3:
+        return columns
+    x = _days(columns["date"]).astype(np.float64)
+    y = columns[value].astype(np.float64)
+    edges = np.linspace(1, size - 1, max_points - 1).astype(np.int64)
+
+    picks = np.empty(max_points, dtype=np.int64)
+    picks[0], picks[-1] = 0, size - 1
+    previous = 0
+    for i in range(max_points - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        next_lo, next_hi = hi, edges[i + 2] if i + 2 < len(edges) else size
+        next_x = x[next_lo:next_hi].mean() if next_hi > next_lo else x[-1]
+        next_y = y[next_lo:next_hi].mean() if next_hi > next_lo else y[-1]
+        area = np.abs(
+            (x[previous] - next_x) * (y[lo:hi] - y[previous])
+            - (x[previous] - x[lo:hi]) * (next_y - y[previous])
+        )
+        previous = lo + int(np.argmax(area))
+        picks[i + 1] = previous
+    return {name: values[picks] for name, values in columns.items()}
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Tuple
+
+from app.agents.tools import store_embeddings
+from app.core.config import settings
+from app.db.client import get_pg_connection
+from app.services.embeddings import embed_texts
+
+logger = logging.getLogger(__name__)
+
+EmbedFn = Callable[[List[str]], List[List[float]]]
+WriteFn = Callable[[List[Tuple[str, List[float]]]], None]
+
+
+class EmbeddingBatcher:
+    """Coalesce embedding requests from concurrent analyses into batched calls.
+
+    Submissions are collected until ``max_batch_size`` items are pending or
+    ``max_wait`` seconds have passed since the first one, then embedded with one
+    request and written back with one insert. Up to ``max_in_flight`` batches are
+    processed at once so a slow round-trip does not stall collection.
+    """
+
+    def __init__(
+        self,
+        embed_fn: EmbedFn,
+        write_fn: WriteFn,
+        max_batch_size: int,
+        max_wait: float,
+        max_in_flight: int = 1,
+    ) -> None:
+        self.embed_fn = embed_fn
+        self.write_fn = write_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_in_flight, thread_name_prefix="embedding-batch"
+        )
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._queue: queue.Queue[Tuple[str, str, Future]] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def submit(self, analysis_id: str, text: str) -> Future:
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((analysis_id, text, future))
+        return future
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="embedding-batcher", daemon=True
+                )
+                self._thread.start()
+
+    def _collect(self) -> List[Tuple[str, str, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            # Hold collection while every slot is busy so the backlog forms one larger batch
+            self._slots.acquire()
+            self._executor.submit(self._process, self._collect())
+
+    def _process(self, batch: List[Tuple[str, str, Future]]) -> None:
+        try:
+            embeddings = self.embed_fn([text for _, text, _ in batch])
+            ids = [analysis_id for analysis_id, _, _ in batch]
+            self.write_fn(list(zip(ids, embeddings)))
+        except Exception as e:
+            logger.warning(f"Embedding batch of {len(batch)} failed: {e}")
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+        for (_, _, future), embedding in zip(batch, embeddings):
+            future.set_result(embedding)
+
+
+def _write_embeddings(items: List[Tuple[str, List[float]]]) -> None:
+    with get_pg_connection() as pg_conn:
+        store_embeddings(pg_conn, items)
+
+
+_batcher: EmbeddingBatcher | None = None
+_batcher_lock = threading.Lock()
+
+
+def get_embedding_batcher() -> EmbeddingBatcher:
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = EmbeddingBatcher(
+                embed_fn=embed_texts,
+                write_fn=_write_embeddings,
+                max_batch_size=settings.embedding_batch_size,
+                max_wait=settings.embedding_batch_window_ms / 1000,
+                max_in_flight=settings.embedding_batch_max_in_flight,
+            )
+        return _batcher
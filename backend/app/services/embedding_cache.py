@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.client import get_pg_connection
+from app.db.models import EMBEDDING_CACHE_TABLE
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, str]
+
+
+def content_hash(text: str) -> str:
+    """Hash of the text with whitespace runs collapsed, so reformatted reports still hit."""
+    normalized = " ".join(text.split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Two-tier embedding cache keyed by (content hash, embedding model).
+
+    The memory tier is a bounded LRU of float32 arrays; the persistent tier is a
+    Postgres table shared by every worker. Persistent-tier errors are logged and
+    treated as misses so the cache never blocks an embedding.
+    """
+
+    def __init__(self, max_entries: int, persistent: bool) -> None:
+        self.max_entries = max_entries
+        self.persistent = persistent
+        self._entries: OrderedDict[CacheKey, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_memory(self, key: CacheKey) -> np.ndarray | None:
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+            return vector
+
+    def _put_memory(self, key: CacheKey, vector: np.ndarray) -> None:
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _get_persistent(self, hashes: List[str], models: Sequence[str]) -> Dict[CacheKey, list]:
+        if not self.persistent or not hashes:
+            return {}
+        try:
+            with get_pg_connection() as pg_conn:
+                with pg_conn.cursor() as cursor:
+                    cursor.execute(
+                        f"SELECT content_hash, model, embedding FROM {EMBEDDING_CACHE_TABLE} "
+                        "WHERE content_hash = ANY(%s) AND model = ANY(%s)",
+                        (hashes, list(models)),
+                    )
+                    rows = cursor.fetchall()
+        except Exception as e:
+            logger.warning(f"Embedding cache lookup failed: {e}")
+            return {}
+        return {(row[0], row[1]): row[2] for row in rows}
+
+    def _put_persistent(self, model: str, items: List[Tuple[str, List[float]]]) -> None:
+        if not self.persistent or not items:
+            return
+        placeholders = ", ".join(["(%s, %s, %s)"] * len(items))
+        params: list = []
+        for digest, embedding in items:
+            params.extend((digest, model, embedding))
+        try:
+            with get_pg_connection() as pg_conn:
+                with pg_conn.cursor() as cursor:
+                    cursor.execute(
+                        f"INSERT INTO {EMBEDDING_CACHE_TABLE} (content_hash, model, embedding) "
+                        f"VALUES {placeholders} ON CONFLICT DO NOTHING",
+                        params,
+                    )
+                pg_conn.commit()
+        except Exception as e:
+            logger.warning(f"Embedding cache write failed: {e}")
+
+    def get_many(self, texts: List[str], models: Sequence[str]) -> Dict[int, List[float]]:
+        """Return cached embeddings by position in ``texts``, preferring earlier models."""
+        hashes = [content_hash(text) for text in texts]
+        found: Dict[int, List[float]] = {}
+        for idx, digest in enumerate(hashes):
+            for model in models:
+                vector = self._get_memory((digest, model))
+                if vector is not None:
+                    found[idx] = vector.tolist()
+                    break
+        metrics.increment("embedding_cache_requests_total", len(found), tier="memory", result="hit")
+
+        pending = [idx for idx in range(len(texts)) if idx not in found]
+        rows = self._get_persistent([hashes[idx] for idx in pending], models)
+        for idx in pending:
+            for model in models:
+                embedding = rows.get((hashes[idx], model))
+                if embedding is not None:
+                    vector = np.asarray(embedding, dtype=np.float32)
+                    self._put_memory((hashes[idx], model), vector)
+                    found[idx] = vector.tolist()
+                    break
+        hits = len(found) - (len(texts) - len(pending))
+        metrics.increment("embedding_cache_requests_total", hits, tier="postgres", result="hit")
+        metrics.increment(
+            "embedding_cache_requests_total", len(texts) - len(found), tier="all", result="miss"
+        )
+        self._report_hit_ratio()
+        return found
+
+    def put_many(self, model: str, texts: List[str], embeddings: List[List[float]]) -> None:
+        items = []
+        for text, embedding in zip(texts, embeddings):
+            digest = content_hash(text)
+            self._put_memory((digest, model), np.asarray(embedding, dtype=np.float32))
+            items.append((digest, embedding))
+        self._put_persistent(model, items)
+
+    def _report_hit_ratio(self) -> None:
+        hits = sum(
+            metrics.counter_value("embedding_cache_requests_total", tier=tier, result="hit")
+            for tier in ("memory", "postgres")
+        )
+        misses = metrics.counter_value("embedding_cache_requests_total", tier="all", result="miss")
+        if hits + misses:
+            metrics.set_gauge("embedding_cache_hit_ratio", hits / (hits + misses))
+        metrics.set_gauge("embedding_cache_memory_entries", len(self._entries))
+
+
+embedding_cache = EmbeddingCache(
+    max_entries=settings.embedding_cache_max_entries,
+    persistent=settings.embedding_cache_persistent,
+)
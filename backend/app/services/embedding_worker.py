@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import List, Tuple
+
+from app.agents.tools import store_embeddings
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.client import get_pg_connection
+from app.db.models import ANALYSES_TABLE, PENDING_EMBEDDINGS_TABLE
+from app.services.embeddings import embed_texts
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingWorker:
+    """Drain the pending-embeddings queue in batches.
+
+    Rows are claimed with ``FOR UPDATE SKIP LOCKED`` so several workers can run
+    against the same table. The embedding insert and the queue delete commit
+    together; on failure the rows are released with an exponential backoff until
+    ``max_attempts`` is reached.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        poll_seconds: float,
+        max_attempts: int,
+        retry_base_delay: float,
+    ) -> None:
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _claim(self, cursor) -> List[Tuple[str, str]]:
+        cursor.execute(
+            f"SELECT p.analysis_id, a.summary FROM {PENDING_EMBEDDINGS_TABLE} p "
+            f"JOIN {ANALYSES_TABLE} a ON a.id = p.analysis_id "
+            "WHERE p.next_attempt_at <= now() AND p.attempts < %s "
+            "ORDER BY p.created_at LIMIT %s FOR UPDATE OF p SKIP LOCKED",
+            (self.max_attempts, self.batch_size),
+        )
+        return [(str(row[0]), row[1] or "") for row in cursor.fetchall()]
+
+    def _release(self, pg_conn, ids: List[str], error: Exception) -> None:
+        with pg_conn.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {PENDING_EMBEDDINGS_TABLE} SET attempts = attempts + 1, "
+                "last_error = %s, "
+                "next_attempt_at = now() + make_interval(secs => %s * power(2, attempts)) "
+                "WHERE analysis_id = ANY(%s::uuid[])",
+                (str(error)[:500], self.retry_base_delay, ids),
+            )
+        pg_conn.commit()
+
+    def drain_once(self) -> int:
+        """Embed one batch of pending analyses and return how many were processed."""
+        with get_pg_connection() as pg_conn:
+            with pg_conn.cursor() as cursor:
+                claimed = self._claim(cursor)
+            if not claimed:
+                pg_conn.commit()
+                return 0
+
+            ids = [analysis_id for analysis_id, _ in claimed]
+            try:
+                embeddings = embed_texts([summary for _, summary in claimed])
+                store_embeddings(pg_conn, list(zip(ids, embeddings)), commit=False)
+                with pg_conn.cursor() as cursor:
+                    cursor.execute(
+                        f"DELETE FROM {PENDING_EMBEDDINGS_TABLE} "
+                        "WHERE analysis_id = ANY(%s::uuid[])",
+                        (ids,),
+                    )
+                pg_conn.commit()
+            except Exception as e:
+                logger.warning(f"Embedding {len(ids)} pending analyses failed: {e}")
+                pg_conn.rollback()
+                self._release(pg_conn, ids, e)
+                metrics.increment("embedding_worker_items_total", len(ids), result="error")
+                return 0
+
+            metrics.increment("embedding_worker_items_total", len(ids), result="ok")
+            return len(ids)
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                processed = self.drain_once()
+            except Exception as e:
+                logger.warning(f"Embedding worker poll failed: {e}")
+                processed = 0
+            if processed == 0:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name="embedding-worker", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+embedding_worker = EmbeddingWorker(
+    batch_size=settings.embedding_worker_batch_size,
+    poll_seconds=settings.embedding_worker_poll_seconds,
+    max_attempts=settings.embedding_worker_max_attempts,
+    retry_base_delay=settings.embedding_worker_retry_base_delay,
+)
+
+
+if __name__ == "__main__":
+    from app.core.logging import setup_logging
+
+    setup_logging()
+    embedding_worker.run()
@@ -1,9 +1,44 @@
 from __future__ import annotations
 
+import asyncio
 from typing import List
 
-from app.services.gemini_client import embed_text as _embed_text
+from app.core.config import settings
+from app.services.embedding_cache import embedding_cache
+from app.services.gemini_client import embed_texts_with_model as _embed_texts_with_model
+from app.services.gemini_client import (
+    embed_texts_with_model_async as _embed_texts_with_model_async,
+)
 
 
 def embed_text(text: str) -> List[float]:
-    return _embed_text(text)
+    return embed_texts([text])[0]
+
+
+def embed_texts(texts: List[str]) -> List[List[float]]:
+    if not settings.embedding_cache_enabled:
+        return _embed_texts_with_model(texts)[1]
+
+    found = embedding_cache.get_many(texts, settings.gemini_embedding_models)
+    missing = [idx for idx in range(len(texts)) if idx not in found]
+    if missing:
+        missing_texts = [texts[idx] for idx in missing]
+        model, embeddings = _embed_texts_with_model(missing_texts)
+        embedding_cache.put_many(model, missing_texts, embeddings)
+        found.update(zip(missing, embeddings))
+    return [found[idx] for idx in range(len(texts))]
+
+
+async def embed_text_async(text: str) -> List[float]:
+    if not settings.embedding_cache_enabled:
+        return (await _embed_texts_with_model_async([text]))[1][0]
+
+    # Cache tiers may hit Postgres, so keep them off the event loop
+    found = await asyncio.to_thread(
+        embedding_cache.get_many, [text], settings.gemini_embedding_models
+    )
+    if 0 in found:
+        return found[0]
+    model, embeddings = await _embed_texts_with_model_async([text])
+    await asyncio.to_thread(embedding_cache.put_many, model, [text], embeddings)
+    return embeddings[0]
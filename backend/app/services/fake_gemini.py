@@ -0,0 +1,115 @@
+"""Local stand-in for the ``google.generativeai`` surface used by ``gemini_client``.
+
+Responses are deterministic functions of the input, latency is simulated, and a
+configurable fraction of calls fail with ``ResourceExhausted`` so retry, fallback
+and circuit-breaker paths run exactly as they do against the real API.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List
+
+import google.api_core.exceptions
+import numpy as np
+
+from app.core.config import settings
+
+_rng = random.Random(settings.fake_gemini_seed)
+_rng_lock = threading.Lock()
+
+_SENTENCES = (
+    "Momentum has shifted over the window, with the close finishing above its midpoint.",
+    "RSI sits in neutral territory, leaving room for continuation in either direction.",
+    "The MACD histogram points to a change in short-term trend strength.",
+    "Volume has not confirmed the latest move, so conviction remains moderate.",
+    "A break of the recent range would be the next signal worth acting on.",
+    "Risk is skewed by the distance between price and its longer-term average.",
+)
+
+
+def _digest(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+def _latency() -> float:
+    with _rng_lock:
+        jitter = _rng.uniform(-1.0, 1.0) * settings.fake_gemini_jitter_ms
+    return max(0.0, settings.fake_gemini_latency_ms + jitter) / 1000
+
+
+def _maybe_rate_limit(model_name: str) -> None:
+    with _rng_lock:
+        limited = _rng.random() < settings.fake_gemini_rate_limit_rate
+    if limited:
+        raise google.api_core.exceptions.ResourceExhausted(
+            f"429 Quota exceeded for {model_name} (simulated)"
+        )
+
+
+def _thesis(text: str) -> str:
+    digest = _digest(text)
+    sentences = [_SENTENCES[byte % len(_SENTENCES)] for byte in digest[:4]]
+    return f"Thesis {digest.hex()[:8]}: " + " ".join(sentences)
+
+
+def fake_text(prompt: str) -> str:
+    # Batched research prompts expect one JSON object per ticker
+    if "JSON array" in prompt:
+        blocks = re.split(r"(?=^Ticker: )", prompt, flags=re.MULTILINE)[1:]
+        return json.dumps(
+            [
+                {
+                    "ticker": block.split("\n", 1)[0].removeprefix("Ticker: ").strip(),
+                    "research_notes": "- " + _SENTENCES[len(block) % len(_SENTENCES)],
+                    "investment_thesis": _thesis(block),
+                }
+                for block in blocks
+            ]
+        )
+    return _thesis(prompt)
+
+
+def fake_embedding(text: str) -> List[float]:
+    rng = np.random.default_rng(int.from_bytes(_digest(text)[:8], "big"))
+    vector = rng.standard_normal(settings.search_dimensions).astype(np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+@dataclass
+class FakeResponse:
+    text: str
+
+
+class GenerativeModel:
+    def __init__(self, model_name: str) -> None:
+        self.model_name = model_name
+
+    def generate_content(self, prompt: str) -> FakeResponse:
+        time.sleep(_latency())
+        _maybe_rate_limit(self.model_name)
+        return FakeResponse(fake_text(prompt))
+
+    async def generate_content_async(self, prompt: str) -> FakeResponse:
+        await asyncio.sleep(_latency())
+        _maybe_rate_limit(self.model_name)
+        return FakeResponse(fake_text(prompt))
+
+
+def configure(api_key: str | None = None) -> None:
+    return None
+
+
+def embed_content(model: str, content) -> Dict[str, object]:
+    time.sleep(_latency())
+    _maybe_rate_limit(model)
+    if isinstance(content, str):
+        return {"embedding": fake_embedding(content)}
+    return {"embedding": [fake_embedding(text) for text in content]}
@@ -1,23 +1,34 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import time
-from typing import List
+from typing import List, Tuple
 
 import google.api_core.exceptions
 import google.generativeai as genai
 
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.timing import Span, span
+from app.services import fake_gemini
+from app.services.model_health import model_health
+from app.services.rate_limiter import get_rate_limiter
 
 logger = logging.getLogger(__name__)
 
 _configured = False
 
 
+def _sdk():
+    # GEMINI_BACKEND=fake swaps in a local stand-in with the same surface
+    return fake_gemini if settings.gemini_backend == "fake" else genai
+
+
 def _configure():
     global _configured
     if not _configured:
-        genai.configure(api_key=settings.gemini_api_key)
+        _sdk().configure(api_key=settings.gemini_api_key)
         _configured = True
 
 
@@ -31,82 +42,239 @@ def _is_rate_limit_error(e: Exception) -> bool:
     return False
 
 
+def estimate_tokens(text: str) -> int:
+    # Gemini averages roughly four characters per token for English text
+    return len(text) // 4 + 1
+
+
 def _exponential_backoff(attempt: int) -> float:
     return settings.gemini_retry_base_delay * (2**attempt)
 
 
+def _wait_for_capacity(model_name: str, text: str) -> None:
+    if settings.gemini_rate_limit_enabled:
+        get_rate_limiter(model_name).acquire(estimate_tokens(text))
+
+
+async def _wait_for_capacity_async(model_name: str, text: str) -> None:
+    if settings.gemini_rate_limit_enabled:
+        await get_rate_limiter(model_name).acquire_async(estimate_tokens(text))
+
+
+def _rate_limit_delay(model_name: str, attempt: int, e: Exception) -> float | None:
+    """Return the backoff before retrying ``model_name``, or None to move to the next model."""
+    if model_health.record_rate_limit(model_name, e):
+        logger.warning(f"Rate limited on {model_name}, opening circuit and trying next model")
+        return None
+    if attempt >= settings.gemini_max_retries - 1:
+        logger.warning(f"Rate limited on {model_name}, exhausted retries, trying next model")
+        return None
+    delay = _exponential_backoff(attempt)
+    logger.warning(
+        f"Rate limited on {model_name}, attempt {attempt + 1}, retrying in {delay}s: {e}"
+    )
+    return delay
+
+
+def _extract_embedding(response) -> List:
+    embedding = getattr(response, "embedding", None)
+    if embedding is None:
+        embedding = response["embedding"]
+    return embedding
+
+
+def _record_call(
+    current: Span, kind: str, model_name: str, calls: int, prompt: str, response, output: str
+) -> None:
+    """Attach model, retry and token counts to the call span and export them."""
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage, "prompt_token_count", None) or estimate_tokens(prompt)
+    response_tokens = getattr(usage, "candidates_token_count", None)
+    if response_tokens is None:
+        response_tokens = estimate_tokens(output) if output else 0
+    current.set(
+        model=model_name,
+        retries=calls - 1,
+        prompt_tokens=prompt_tokens,
+        response_tokens=response_tokens,
+    )
+    metrics.increment("gemini_requests_total", kind=kind, model=model_name, result="ok")
+    metrics.increment("gemini_tokens_total", prompt_tokens, model=model_name, direction="prompt")
+    metrics.increment(
+        "gemini_tokens_total", response_tokens, model=model_name, direction="response"
+    )
+    if calls > 1:
+        metrics.increment("gemini_retries_total", calls - 1, kind=kind)
+
+
+def _record_failure(kind: str, model_name: str, rate_limited: bool) -> None:
+    result = "rate_limited" if rate_limited else "error"
+    metrics.increment("gemini_requests_total", kind=kind, model=model_name, result=result)
+
+
 def generate_text(prompt: str) -> str:
     _configure()
 
-    last_exception = None
-    models = settings.gemini_text_models
-
-    for model_idx, model_name in enumerate(models):
-        if model_idx > 0:
-            logger.info(f"Falling back to model: {model_name}")
-
-        for attempt in range(settings.gemini_max_retries):
-            try:
-                model = genai.GenerativeModel(model_name)
-                response = model.generate_content(prompt)
-                return response.text or ""
-            except Exception as e:
-                last_exception = e
-                if _is_rate_limit_error(e):
-                    if attempt < settings.gemini_max_retries - 1:
-                        delay = _exponential_backoff(attempt)
-                        logger.warning(
-                            f"Rate limited on {model_name}, attempt {attempt + 1}, "
-                            f"retrying in {delay}s: {e}"
-                        )
-                        time.sleep(delay)
-                    else:
-                        logger.warning(
-                            f"Rate limited on {model_name}, exhausted retries, trying next model"
-                        )
+    with span("gemini.generate") as current:
+        last_exception = None
+        calls = 0
+        models = model_health.ordered(settings.gemini_text_models)
+
+        for model_idx, model_name in enumerate(models):
+            if model_idx > 0:
+                logger.info(f"Falling back to model: {model_name}")
+
+            for attempt in range(settings.gemini_max_retries):
+                try:
+                    _wait_for_capacity(model_name, prompt)
+                    calls += 1
+                    started = time.monotonic()
+                    model = _sdk().GenerativeModel(model_name)
+                    response = model.generate_content(prompt)
+                    model_health.record_success(model_name, time.monotonic() - started)
+                    text = response.text or ""
+                    _record_call(current, "generate", model_name, calls, prompt, response, text)
+                    return text
+                except Exception as e:
+                    last_exception = e
+                    _record_failure("generate", model_name, _is_rate_limit_error(e))
+                    if not _is_rate_limit_error(e):
+                        model_health.record_failure(model_name, e)
+                        raise
+                    delay = _rate_limit_delay(model_name, attempt, e)
+                    if delay is None:
                         break
-                else:
-                    raise
+                    time.sleep(delay)
+
+        raise last_exception or RuntimeError("All models exhausted")
+
 
-    raise last_exception or RuntimeError("All models exhausted")
+def embed_texts_with_model(texts: List[str]) -> Tuple[str, List[List[float]]]:
+    """Embed several texts with one batched request per attempt.
+
+    Returns the model that produced the vectors alongside them.
+    """
+    _configure()
+
+    with span("gemini.embed") as current:
+        last_exception = None
+        calls = 0
+        models = model_health.ordered(settings.gemini_embedding_models)
+
+        for model_idx, model_name in enumerate(models):
+            if model_idx > 0:
+                logger.info(f"Falling back to embedding model: {model_name}")
+
+            for attempt in range(settings.gemini_max_retries):
+                try:
+                    _wait_for_capacity(model_name, "".join(texts))
+                    calls += 1
+                    started = time.monotonic()
+                    response = _sdk().embed_content(
+                        model=model_name,
+                        content=texts,
+                    )
+                    model_health.record_success(model_name, time.monotonic() - started)
+                    _record_call(current, "embed", model_name, calls, "".join(texts), None, "")
+                    return model_name, _extract_embedding(response)
+                except Exception as e:
+                    last_exception = e
+                    _record_failure("embed", model_name, _is_rate_limit_error(e))
+                    if not _is_rate_limit_error(e):
+                        model_health.record_failure(model_name, e)
+                        raise
+                    delay = _rate_limit_delay(model_name, attempt, e)
+                    if delay is None:
+                        break
+                    time.sleep(delay)
+
+        raise last_exception or RuntimeError("All embedding models exhausted")
+
+
+def embed_texts(texts: List[str]) -> List[List[float]]:
+    return embed_texts_with_model(texts)[1]
 
 
 def embed_text(text: str) -> List[float]:
+    return embed_texts([text])[0]
+
+
+async def generate_text_async(prompt: str) -> str:
     _configure()
 
-    last_exception = None
-    models = settings.gemini_embedding_models
-
-    for model_idx, model_name in enumerate(models):
-        if model_idx > 0:
-            logger.info(f"Falling back to embedding model: {model_name}")
-
-        for attempt in range(settings.gemini_max_retries):
-            try:
-                response = genai.embed_content(
-                    model=model_name,
-                    content=text,
-                )
-                embedding = getattr(response, "embedding", None)
-                if embedding is None:
-                    embedding = response["embedding"]
-                return embedding
-            except Exception as e:
-                last_exception = e
-                if _is_rate_limit_error(e):
-                    if attempt < settings.gemini_max_retries - 1:
-                        delay = _exponential_backoff(attempt)
-                        logger.warning(
-                            f"Rate limited on {model_name}, attempt {attempt + 1}, "
-                            f"retrying in {delay}s: {e}"
-                        )
-                        time.sleep(delay)
-                    else:
-                        logger.warning(
-                            f"Rate limited on {model_name}, exhausted retries, trying next model"
-                        )
+    with span("gemini.generate") as current:
+        last_exception = None
+        calls = 0
+        models = model_health.ordered(settings.gemini_text_models)
+
+        for model_idx, model_name in enumerate(models):
+            if model_idx > 0:
+                logger.info(f"Falling back to model: {model_name}")
+
+            for attempt in range(settings.gemini_max_retries):
+                try:
+                    await _wait_for_capacity_async(model_name, prompt)
+                    calls += 1
+                    started = time.monotonic()
+                    model = _sdk().GenerativeModel(model_name)
+                    response = await model.generate_content_async(prompt)
+                    model_health.record_success(model_name, time.monotonic() - started)
+                    text = response.text or ""
+                    _record_call(current, "generate", model_name, calls, prompt, response, text)
+                    return text
+                except Exception as e:
+                    last_exception = e
+                    _record_failure("generate", model_name, _is_rate_limit_error(e))
+                    if not _is_rate_limit_error(e):
+                        model_health.record_failure(model_name, e)
+                        raise
+                    delay = _rate_limit_delay(model_name, attempt, e)
+                    if delay is None:
                         break
-                else:
-                    raise
+                    await asyncio.sleep(delay)
+
+        raise last_exception or RuntimeError("All models exhausted")
+
+
+async def embed_texts_with_model_async(texts: List[str]) -> Tuple[str, List[List[float]]]:
+    _configure()
+
+    with span("gemini.embed") as current:
+        last_exception = None
+        calls = 0
+        models = model_health.ordered(settings.gemini_embedding_models)
+
+        for model_idx, model_name in enumerate(models):
+            if model_idx > 0:
+                logger.info(f"Falling back to embedding model: {model_name}")
+
+            for attempt in range(settings.gemini_max_retries):
+                try:
+                    await _wait_for_capacity_async(model_name, "".join(texts))
+                    calls += 1
+                    started = time.monotonic()
+                    # The SDK has no async embedding call; keep it off the event loop
+                    response = await asyncio.to_thread(
+                        _sdk().embed_content,
+                        model=model_name,
+                        content=texts,
+                    )
+                    model_health.record_success(model_name, time.monotonic() - started)
+                    _record_call(current, "embed", model_name, calls, "".join(texts), None, "")
+                    return model_name, _extract_embedding(response)
+                except Exception as e:
+                    last_exception = e
+                    _record_failure("embed", model_name, _is_rate_limit_error(e))
+                    if not _is_rate_limit_error(e):
+                        model_health.record_failure(model_name, e)
+                        raise
+                    delay = _rate_limit_delay(model_name, attempt, e)
+                    if delay is None:
+                        break
+                    await asyncio.sleep(delay)
+
+        raise last_exception or RuntimeError("All embedding models exhausted")
+
 
-    raise last_exception or RuntimeError("All embedding models exhausted")
+async def embed_text_async(text: str) -> List[float]:
+    return (await embed_texts_with_model_async([text]))[1][0]
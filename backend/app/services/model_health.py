@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List
+
+from app.core.config import settings
+
+
+@dataclass
+class ModelHealth:
+    model: str
+    successes: int = 0
+    failures: int = 0
+    rate_limits: int = 0
+    consecutive_rate_limits: int = 0
+    latency_ewma: float | None = None
+    circuit_open_until: float = 0.0
+    last_error: str | None = None
+
+    def is_open(self, now: float) -> bool:
+        return self.circuit_open_until > now
+
+
+class ModelHealthRegistry:
+    """Process-wide view of recent Gemini model health.
+
+    A model whose rate limits keep recurring gets its circuit opened for a cooldown,
+    and callers walk the fallback chain starting from the first model that is closed.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown_seconds: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._models: Dict[str, ModelHealth] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, model: str) -> ModelHealth:
+        health = self._models.get(model)
+        if health is None:
+            health = ModelHealth(model=model)
+            self._models[model] = health
+        return health
+
+    def record_success(self, model: str, latency: float) -> None:
+        with self._lock:
+            health = self._get(model)
+            health.successes += 1
+            health.consecutive_rate_limits = 0
+            health.circuit_open_until = 0.0
+            if health.latency_ewma is None:
+                health.latency_ewma = latency
+            else:
+                health.latency_ewma = 0.8 * health.latency_ewma + 0.2 * latency
+
+    def record_failure(self, model: str, error: Exception) -> None:
+        with self._lock:
+            health = self._get(model)
+            health.failures += 1
+            health.last_error = str(error)[:200]
+
+    def record_rate_limit(self, model: str, error: Exception) -> bool:
+        """Record a 429 and return True when it opened the model's circuit."""
+        with self._lock:
+            health = self._get(model)
+            health.rate_limits += 1
+            health.consecutive_rate_limits += 1
+            health.last_error = str(error)[:200]
+            if health.consecutive_rate_limits >= self.failure_threshold:
+                health.circuit_open_until = time.monotonic() + self.cooldown_seconds
+                health.consecutive_rate_limits = 0
+                return True
+            return False
+
+    def is_open(self, model: str) -> bool:
+        with self._lock:
+            return self._get(model).is_open(time.monotonic())
+
+    def ordered(self, models: List[str]) -> List[str]:
+        """Return closed models in configured order, then open ones by soonest reopening."""
+        now = time.monotonic()
+        with self._lock:
+            healths = [self._get(model) for model in models]
+        closed = [h.model for h in healths if not h.is_open(now)]
+        opened = sorted((h for h in healths if h.is_open(now)), key=lambda h: h.circuit_open_until)
+        return closed + [h.model for h in opened]
+
+    def snapshot(self) -> List[Dict]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "model": h.model,
+                    "circuit_open": h.is_open(now),
+                    "cooldown_remaining": max(0.0, h.circuit_open_until - now),
+                    "successes": h.successes,
+                    "failures": h.failures,
+                    "rate_limits": h.rate_limits,
+                    "latency_ewma": h.latency_ewma,
+                    "last_error": h.last_error,
+                }
+                for h in self._models.values()
+            ]
+
+
+model_health = ModelHealthRegistry(
+    failure_threshold=settings.gemini_circuit_failure_threshold,
+    cooldown_seconds=settings.gemini_circuit_cooldown_seconds,
+)
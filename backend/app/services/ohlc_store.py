@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.repository import OHLC_DTYPES, Columns
+
+# Tickers become directory names, so anything that could escape the root bypasses the store
+_SAFE_TICKER = re.compile(r"[A-Za-z0-9][A-Za-z0-9._^=-]*")
+
+# Loads bars on or after ``start_date`` (all of them when None); None if the ticker is unknown
+Loader = Callable[[str | None], Columns | None]
+AsyncLoader = Callable[[str | None], Awaitable[Columns | None]]
+
+
+@dataclass
+class _Mapped:
+    stamp: tuple
+    meta: Dict[str, Any]
+    columns: Columns
+
+
+def _next_day(iso_date: str) -> str:
+    return (date.fromisoformat(iso_date) + timedelta(days=1)).isoformat()
+
+
+def frame_columns(df: pd.DataFrame) -> Columns:
+    """Date-ordered columns of a parsed CSV frame, last row winning on repeated dates."""
+    df = df.assign(date=df["date"].astype(str)).drop_duplicates("date", keep="last")
+    df = df.sort_values("date")
+    return {name: df[name].to_numpy(dtype=dtype) for name, dtype in OHLC_DTYPES.items()}
+
+
+class OhlcStore:
+    """Append-only per-ticker OHLC columns on local disk, memory-mapped on read.
+
+    Each ticker has a ``meta.json`` naming the current generation directory, the
+    committed row count and the high-water mark (last date), plus one raw array file
+    per column in that directory. Appends write past the committed rows and then
+    replace ``meta.json`` atomically, so readers never see a partial append; a rewrite
+    goes to a new generation. Writers in every worker on the host serialize on a
+    per-ticker file lock, and readers reuse their mappings until ``meta.json`` changes.
+
+    A read whose ``stamp`` (the persisted write state the request was validated
+    against) differs from the one recorded in ``meta.json`` refills the ticker, since
+    a writer that bypassed this host's ingest may have rewritten dates already on disk.
+    Reads without a stamp only fetch bars past the high-water mark, once per
+    ``refresh_seconds``, so they miss such rewrites until a stamped read refills. An
+    ingest on this host that rewrites existing dates drops the ticker.
+    """
+
+    def __init__(self, enabled: bool, root: str, refresh_seconds: float) -> None:
+        self.enabled = enabled
+        self.root = Path(root)
+        self.refresh_seconds = refresh_seconds
+        self._mapped: Dict[str, _Mapped] = {}
+        self._lock = threading.Lock()
+
+    def _dir(self, ticker: str) -> Path | None:
+        return self.root / ticker if _SAFE_TICKER.fullmatch(ticker) else None
+
+    @contextmanager
+    def _locked(self, directory: Path) -> Iterator[None]:
+        # POSIX only; imported here so the app still imports where the store stays off
+        import fcntl
+
+        directory.mkdir(parents=True, exist_ok=True)
+        with open(directory / ".lock", "a") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _read(self, ticker: str, directory: Path) -> _Mapped | None:
+        try:
+            stat = (directory / "meta.json").stat()
+        except FileNotFoundError:
+            with self._lock:
+                self._mapped.pop(ticker, None)
+            return None
+        stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            mapped = self._mapped.get(ticker)
+        if mapped is not None and mapped.stamp == stamp:
+            return mapped
+        try:
+            meta = json.loads((directory / "meta.json").read_text())
+            generation = directory / meta["generation"]
+            rows = meta["rows"]
+            columns = {
+                name: np.memmap(generation / name, dtype=dtype, mode="r", shape=(rows,))
+                if rows
+                else np.array([], dtype=dtype)
+                for name, dtype in OHLC_DTYPES.items()
+            }
+        except (FileNotFoundError, json.JSONDecodeError):
+            # Dropped or rewritten by another worker between the stat and the open
+            return None
+        mapped = _Mapped(stamp, meta, columns)
+        with self._lock:
+            self._mapped[ticker] = mapped
+        return mapped
+
+    def _write_meta(self, directory: Path, meta: Dict[str, Any]) -> None:
+        staging = directory / f"meta.json.{os.getpid()}.{threading.get_ident()}"
+        staging.write_text(json.dumps(meta))
+        os.replace(staging, directory / "meta.json")
+
+    def _rewrite(self, directory: Path, columns: Columns, stamp: str | None) -> None:
+        generation = uuid.uuid4().hex
+        (directory / generation).mkdir()
+        for name, dtype in OHLC_DTYPES.items():
+            np.ascontiguousarray(columns[name], dtype=dtype).tofile(directory / generation / name)
+        rows = len(columns["date"])
+        self._write_meta(
+            directory,
+            {
+                "generation": generation,
+                "rows": rows,
+                "last_date": str(columns["date"][-1]) if rows else None,
+                "checked_at": time.time(),
+                "stamp": stamp,
+            },
+        )
+        # Other workers' open mappings of older generations stay valid after the unlink
+        for child in directory.iterdir():
+            if child.is_dir() and child.name != generation:
+                shutil.rmtree(child, ignore_errors=True)
+
+    def _append(
+        self, directory: Path, meta: Dict[str, Any], columns: Columns, stamp: str | None = None
+    ) -> None:
+        last = meta["last_date"]
+        keep = slice(int(np.searchsorted(columns["date"], last, "right")) if last else 0, None)
+        added = len(columns["date"][keep])
+        if added:
+            generation = directory / meta["generation"]
+            for name, dtype in OHLC_DTYPES.items():
+                with open(generation / name, "ab") as handle:
+                    # Bytes past the committed rows are from an append that never committed
+                    handle.truncate(meta["rows"] * np.dtype(dtype).itemsize)
+                    handle.write(np.ascontiguousarray(columns[name][keep], dtype=dtype).tobytes())
+            last = str(columns["date"][-1])
+        meta = {**meta, "rows": meta["rows"] + added, "last_date": last, "checked_at": time.time()}
+        if stamp is not None:
+            meta["stamp"] = stamp
+        self._write_meta(directory, meta)
+
+    def _save(
+        self, ticker: str, directory: Path, columns: Columns, full: bool, stamp: str | None
+    ) -> None:
+        with self._locked(directory):
+            if full:
+                self._rewrite(directory, columns, stamp)
+                return
+            current = self._read(ticker, directory)
+            if current is not None:
+                # Another worker may have extended it since this load started
+                self._append(directory, current.meta, columns, stamp)
+
+    def _outdated(self, mapped: _Mapped, stamp: str | None) -> bool:
+        return stamp is not None and mapped.meta.get("stamp") != stamp
+
+    def _fresh(self, mapped: _Mapped, stamp: str | None) -> bool:
+        if self._outdated(mapped, stamp):
+            return False
+        return time.time() - mapped.meta["checked_at"] < self.refresh_seconds
+
+    def _after(self, mapped: _Mapped | None, stamp: str | None) -> str | None:
+        """Where a load resumes: past the high-water mark, or from the start to refill."""
+        if mapped is None or mapped.meta["last_date"] is None or self._outdated(mapped, stamp):
+            return None
+        return _next_day(mapped.meta["last_date"])
+
+    def _result(self, ticker: str, directory: Path, mapped: _Mapped | None, loaded) -> Columns:
+        refreshed = self._read(ticker, directory)
+        if refreshed is not None:
+            return refreshed.columns
+        # Dropped by a concurrent ingest; serve what was loaded and refill next time
+        return loaded if mapped is None else mapped.columns
+
+    def _lookup(self, ticker: str, directory: Path, stamp: str | None) -> _Mapped | None:
+        mapped = self._read(ticker, directory)
+        if mapped is None:
+            result = "fill"
+        elif self._outdated(mapped, stamp):
+            result = "refill"
+        else:
+            result = "hit" if self._fresh(mapped, stamp) else "refresh"
+        metrics.increment("ohlc_store_requests_total", result=result)
+        return mapped
+
+    def get_or_fill(self, ticker: str, load: Loader, stamp: str | None = None) -> Columns | None:
+        """The ticker's full history, from disk when fresh, else topped up through ``load``."""
+        directory = self._dir(ticker)
+        if directory is None:
+            return load(None)
+        mapped = self._lookup(ticker, directory, stamp)
+        if mapped is not None and self._fresh(mapped, stamp):
+            return mapped.columns
+        after = self._after(mapped, stamp)
+        loaded = load(after)
+        if loaded is None:
+            return None
+        self._save(ticker, directory, loaded, after is None, stamp)
+        return self._result(ticker, directory, mapped, loaded)
+
+    async def get_or_fill_async(
+        self, ticker: str, load: AsyncLoader, stamp: str | None = None
+    ) -> Columns | None:
+        """``get_or_fill`` with a coroutine loader; disk writes run in a worker thread."""
+        directory = self._dir(ticker)
+        if directory is None:
+            return await load(None)
+        mapped = self._lookup(ticker, directory, stamp)
+        if mapped is not None and self._fresh(mapped, stamp):
+            return mapped.columns
+        after = self._after(mapped, stamp)
+        loaded = await load(after)
+        if loaded is None:
+            return None
+        await asyncio.to_thread(self._save, ticker, directory, loaded, after is None, stamp)
+        return self._result(ticker, directory, mapped, loaded)
+
+    def record_ingest(self, ticker: str, df: pd.DataFrame) -> None:
+        """Append freshly ingested bars past the high-water mark; drop the ticker otherwise."""
+        directory = self._dir(ticker)
+        if directory is None or df.empty or not (directory / "meta.json").exists():
+            return
+        columns = frame_columns(df)
+        with self._locked(directory):
+            current = self._read(ticker, directory)
+            if current is None:
+                return
+            last = current.meta["last_date"]
+            if last is None or columns["date"][0] > last:
+                self._append(directory, current.meta, columns)
+            else:
+                (directory / "meta.json").unlink(missing_ok=True)
+                self._read(ticker, directory)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mapped.clear()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+ohlc_store = OhlcStore(
+    enabled=settings.ohlc_store_enabled,
+    root=settings.ohlc_store_path,
+    refresh_seconds=settings.ohlc_store_refresh_seconds,
+)
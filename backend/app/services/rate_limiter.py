@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Dict
+
+from app.core.config import settings
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations instead of rejecting callers.
+
+    A reservation may drive the balance negative; the caller then waits until the
+    bucket has refilled past its place in line, so concurrent callers queue up in
+    arrival order rather than racing and retrying.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float) -> None:
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.refill_per_second)
+        self._updated = now
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """Reserve ``amount`` tokens and return the seconds to wait before using them."""
+        amount = min(float(amount), self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.refill_per_second
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+
+class ModelRateLimiter:
+    """Requests-per-minute and tokens-per-minute limits for a single model."""
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int) -> None:
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+
+    def reserve(self, tokens: int) -> float:
+        return max(self.requests.reserve(1), self.tokens.reserve(tokens))
+
+    def acquire(self, tokens: int) -> float:
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self, tokens: int) -> float:
+        delay = self.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+
+_limiters: Dict[str, ModelRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(model_name: str) -> ModelRateLimiter:
+    with _limiters_lock:
+        limiter = _limiters.get(model_name)
+        if limiter is None:
+            limiter = ModelRateLimiter(
+                settings.gemini_model_rpm.get(model_name, settings.gemini_default_rpm),
+                settings.gemini_model_tpm.get(model_name, settings.gemini_default_tpm),
+            )
+            _limiters[model_name] = limiter
+        return limiter
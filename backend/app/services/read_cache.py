@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.data_versions import ALL_TICKERS, ANALYSES, INGEST, data_versions
+
+# Each cached resource and the write counter that invalidates it
+RESOURCES: Dict[str, str] = {
+    "stock_id": INGEST,
+    "stocks": INGEST,
+    "ohlc": INGEST,
+    "analyses": ANALYSES,
+    "latest_analyses": ANALYSES,
+}
+
+CacheKey = Tuple[str, str]
+
+
+def approx_size(value: Any) -> int:
+    """Rough retained size in bytes; exact for numpy arrays, shallow-sum for containers."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            approx_size(key) + approx_size(item) for key, item in value.items()
+        )
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(approx_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+@dataclass
+class _Entry:
+    value: Any
+    version: int
+    stamp: str | None
+    expires_at: float
+    size: int
+
+
+class ReadCache:
+    """Bounded LRU of read results with a TTL and an approximate memory cap.
+
+    Entries are keyed by (resource, ticker). Writes bump ``data_versions``, which drops
+    the affected entries at once; an entry loaded while a write was in flight is
+    discarded on its next read because its version no longer matches.
+
+    Writers in other processes never bump this process's counters. Callers that
+    validated a request against the persisted write state (``Validators.stamp``)
+    pass it as ``stamp``, and an entry loaded under another stamp is reloaded, so a
+    body is never older than the validators sent with it. The TTL bounds staleness
+    for callers without a stamp.
+    """
+
+    def __init__(
+        self, enabled: bool, max_entries: int, max_bytes: int, ttl_seconds: float
+    ) -> None:
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[CacheKey, _Entry] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _version(self, resource: str, ticker: str) -> int:
+        return data_versions.get(RESOURCES[resource], ticker)
+
+    def _evict(self, key: CacheKey, reason: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        metrics.increment("read_cache_evictions_total", resource=key[0], reason=reason)
+
+    def get(
+        self, resource: str, ticker: str = ALL_TICKERS, stamp: str | None = None
+    ) -> Any | None:
+        key = (resource, ticker)
+        version = self._version(resource, ticker)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.version != version or stamp not in (None, entry.stamp):
+                    self._evict(key, "invalidated")
+                elif entry.expires_at <= time.monotonic():
+                    self._evict(key, "ttl")
+                else:
+                    self._entries.move_to_end(key)
+                    metrics.increment("read_cache_requests_total", resource=resource, result="hit")
+                    return entry.value
+        metrics.increment("read_cache_requests_total", resource=resource, result="miss")
+        return None
+
+    def put(
+        self, resource: str, ticker: str, value: Any, version: int, stamp: str | None = None
+    ) -> None:
+        size = approx_size(value)
+        if size > self.max_bytes:
+            return
+        key = (resource, ticker)
+        with self._lock:
+            if key in self._entries:
+                self._evict(key, "replaced")
+            expires_at = time.monotonic() + self.ttl_seconds
+            self._entries[key] = _Entry(value, version, stamp, expires_at, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries:
+                self._evict(next(iter(self._entries)), "lru")
+            while self._bytes > self.max_bytes:
+                self._evict(next(iter(self._entries)), "size")
+            self._report_size()
+
+    def get_or_load(
+        self, resource: str, ticker: str, load: Callable[[], Any], stamp: str | None = None
+    ) -> Any:
+        """Cached value, or ``load()``; ``None`` results are returned but never cached."""
+        if not self.enabled:
+            return load()
+        value = self.get(resource, ticker, stamp)
+        if value is not None:
+            return value
+        # Read the version first so a write racing the load leaves a stale-marked entry
+        version = self._version(resource, ticker)
+        value = load()
+        if value is not None:
+            self.put(resource, ticker, value, version, stamp)
+        return value
+
+    async def get_or_load_async(
+        self,
+        resource: str,
+        ticker: str,
+        load: Callable[[], Awaitable[Any]],
+        stamp: str | None = None,
+    ) -> Any:
+        """``get_or_load`` for coroutine loaders."""
+        if not self.enabled:
+            return await load()
+        value = self.get(resource, ticker, stamp)
+        if value is not None:
+            return value
+        version = self._version(resource, ticker)
+        value = await load()
+        if value is not None:
+            self.put(resource, ticker, value, version, stamp)
+        return value
+
+    def invalidate(self, kind: str, ticker: str) -> None:
+        """Drop every entry that depends on ``kind`` for ``ticker``, plus the all-ticker ones."""
+        resources = {resource for resource, source in RESOURCES.items() if source == kind}
+        with self._lock:
+            for key in [key for key in self._entries if key[0] in resources]:
+                if key[1] in (ticker, ALL_TICKERS):
+                    self._evict(key, "invalidated")
+            self._report_size()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._report_size()
+
+    def _report_size(self) -> None:
+        metrics.set_gauge("read_cache_entries", len(self._entries))
+        metrics.set_gauge("read_cache_bytes", self._bytes)
+
+
+read_cache = ReadCache(
+    enabled=settings.read_cache_enabled,
+    max_entries=settings.read_cache_max_entries,
+    max_bytes=int(settings.read_cache_max_mb * 1024 * 1024),
+    ttl_seconds=settings.read_cache_ttl_seconds,
+)
+data_versions.subscribe(read_cache.invalidate)
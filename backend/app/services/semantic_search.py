@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from app.core.config import settings
+from app.db.client import get_async_pg_connection, get_pg_connection
+from app.db.models import ANALYSES_TABLE, EMBEDDINGS_TABLE, STOCKS_TABLE
+from app.services.vector_index import IndexedAnalysis, VectorIndex
+
+logger = logging.getLogger(__name__)
+
+RESULT_COLUMNS = (
+    "analysis_id",
+    "ticker",
+    "date_range_start",
+    "date_range_end",
+    "signal",
+    "summary",
+    "created_at",
+)
+
+# The HNSW index covers a half-precision copy of the vector (plain vector indexes stop at
+# 2000 dimensions). Candidates come from the index, then get re-ranked at full precision.
+_PGVECTOR_SEARCH_SQL = f"""
+SELECT c.analysis_id, s.ticker, a.date_range_start, a.date_range_end, a.signal, a.summary,
+       a.created_at, 1 - (c.embedding <=> %(query)s) AS score
+FROM (
+    SELECT e.analysis_id, e.embedding
+    FROM {EMBEDDINGS_TABLE} e
+    JOIN {ANALYSES_TABLE} a ON a.id = e.analysis_id
+    JOIN {STOCKS_TABLE} s ON s.id = a.stock_id
+    WHERE (%(ticker)s::text IS NULL OR s.ticker = %(ticker)s)
+      AND (%(start_date)s::date IS NULL OR a.created_at >= %(start_date)s::date)
+      AND (%(end_date)s::date IS NULL OR a.created_at < %(end_date)s::date + 1)
+      AND (%(exclude_id)s::uuid IS NULL OR e.analysis_id <> %(exclude_id)s::uuid)
+    ORDER BY e.embedding::halfvec({settings.search_dimensions})
+        <=> %(query)s::halfvec({settings.search_dimensions})
+    LIMIT %(candidates)s
+) c
+JOIN {ANALYSES_TABLE} a ON a.id = c.analysis_id
+JOIN {STOCKS_TABLE} s ON s.id = a.stock_id
+ORDER BY c.embedding <=> %(query)s
+LIMIT %(limit)s
+"""
+
+
+# Keyset pages by (created_at, analysis_id); ids already loaded come back without their
+# vector, so re-reading the lookback window costs no vector transfer
+_LOCAL_REFRESH_SQL = f"""
+SELECT e.analysis_id, s.ticker, a.created_at, e.created_at,
+       CASE WHEN e.analysis_id = ANY(%(loaded)s::uuid[]) THEN NULL ELSE e.embedding END
+FROM {EMBEDDINGS_TABLE} e
+JOIN {ANALYSES_TABLE} a ON a.id = e.analysis_id
+JOIN {STOCKS_TABLE} s ON s.id = a.stock_id
+WHERE %(after)s::timestamp IS NULL
+   OR (e.created_at, e.analysis_id) > (%(after)s::timestamp, %(after_id)s::uuid)
+ORDER BY e.created_at, e.analysis_id
+LIMIT %(limit)s
+"""
+_NIL_UUID = "00000000-0000-0000-0000-000000000000"
+
+_EMBEDDING_SQL = f"SELECT embedding FROM {EMBEDDINGS_TABLE} WHERE analysis_id = %s"
+_EF_SEARCH_SQL = "SELECT set_config('hnsw.ef_search', %s, true)"
+
+
+def fetch_analysis_embedding(analysis_id: str) -> List[float] | None:
+    with get_pg_connection() as pg_conn:
+        with pg_conn.cursor() as cursor:
+            cursor.execute(_EMBEDDING_SQL, (analysis_id,))
+            row = cursor.fetchone()
+    return None if row is None else list(row[0])
+
+
+async def fetch_analysis_embedding_async(analysis_id: str) -> List[float] | None:
+    async with get_async_pg_connection() as pg_conn:
+        async with pg_conn.cursor() as cursor:
+            await cursor.execute(_EMBEDDING_SQL, (analysis_id,))
+            row = await cursor.fetchone()
+    return None if row is None else list(row[0])
+
+
+def _search_params(
+    query: Sequence[float],
+    limit: int,
+    ticker: str | None,
+    start_date: date | None,
+    end_date: date | None,
+    exclude_id: str | None,
+) -> Dict[str, Any]:
+    return {
+        "query": np.asarray(query, dtype=np.float32),
+        "ticker": ticker,
+        "start_date": start_date,
+        "end_date": end_date,
+        "exclude_id": exclude_id,
+        "candidates": limit * settings.search_rerank_factor,
+        "limit": limit,
+    }
+
+
+def _search_results(rows: List[Any]) -> List[Dict[str, Any]]:
+    return [{**dict(zip(RESULT_COLUMNS, row[:-1])), "score": float(row[-1])} for row in rows]
+
+
+def _search_pgvector(
+    query: Sequence[float],
+    limit: int,
+    ticker: str | None,
+    start_date: date | None,
+    end_date: date | None,
+    exclude_id: str | None,
+) -> List[Dict[str, Any]]:
+    params = _search_params(query, limit, ticker, start_date, end_date, exclude_id)
+    with get_pg_connection() as pg_conn:
+        with pg_conn.cursor() as cursor:
+            # Filtered HNSW scans drop rows after the index walk, so widen the walk
+            cursor.execute(_EF_SEARCH_SQL, (str(max(40, params["candidates"])),))
+            cursor.execute(_PGVECTOR_SEARCH_SQL, params)
+            rows = cursor.fetchall()
+        pg_conn.commit()
+    return _search_results(rows)
+
+
+async def _search_pgvector_async(
+    query: Sequence[float],
+    limit: int,
+    ticker: str | None,
+    start_date: date | None,
+    end_date: date | None,
+    exclude_id: str | None,
+) -> List[Dict[str, Any]]:
+    params = _search_params(query, limit, ticker, start_date, end_date, exclude_id)
+    async with get_async_pg_connection() as pg_conn:
+        async with pg_conn.cursor() as cursor:
+            await cursor.execute(_EF_SEARCH_SQL, (str(max(40, params["candidates"])),))
+            await cursor.execute(_PGVECTOR_SEARCH_SQL, params)
+            rows = await cursor.fetchall()
+        await pg_conn.commit()
+    return _search_results(rows)
+
+
+class LocalSearchIndex:
+    """In-process VectorIndex over analysis embeddings, refreshed from Postgres.
+
+    Each refresh pages through embeddings from ``lookback_seconds`` before the newest
+    one already loaded. ``created_at`` is set when the inserting transaction starts,
+    so a row committed after a refresh can be stamped behind it; the overlap picks
+    it up, and the index skips ids it already holds.
+    """
+
+    def __init__(
+        self,
+        dimensions: int,
+        refresh_seconds: float,
+        lookback_seconds: float = 300.0,
+        page_size: int = 1000,
+    ) -> None:
+        self.index = VectorIndex(dimensions)
+        self.refresh_seconds = refresh_seconds
+        self.lookback_seconds = lookback_seconds
+        self.page_size = page_size
+        self._high_water: datetime | None = None
+        # Embedding created_at of the loaded ids still inside the lookback window
+        self._recent: Dict[str, datetime] = {}
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self, force: bool = False) -> None:
+        with self._lock:
+            if not force and time.monotonic() - self._refreshed_at < self.refresh_seconds:
+                return
+            after = None
+            if self._high_water is not None:
+                after = self._high_water - timedelta(seconds=self.lookback_seconds)
+            after_id = _NIL_UUID
+            loaded = [
+                analysis_id
+                for analysis_id, created_at in self._recent.items()
+                if after is None or created_at >= after
+            ]
+            with get_pg_connection() as pg_conn:
+                with pg_conn.cursor() as cursor:
+                    while True:
+                        cursor.execute(
+                            _LOCAL_REFRESH_SQL,
+                            {
+                                "loaded": loaded,
+                                "after": after,
+                                "after_id": after_id,
+                                "limit": self.page_size,
+                            },
+                        )
+                        rows = cursor.fetchall()
+                        self._load(rows)
+                        if len(rows) < self.page_size:
+                            break
+                        after, after_id = rows[-1][3], rows[-1][0]
+            if self._high_water is not None:
+                cutoff = self._high_water - timedelta(seconds=self.lookback_seconds)
+                self._recent = {
+                    analysis_id: created_at
+                    for analysis_id, created_at in self._recent.items()
+                    if created_at >= cutoff
+                }
+            self._refreshed_at = time.monotonic()
+
+    def _load(self, rows: List[Any]) -> None:
+        fresh = [row for row in rows if row[4] is not None]
+        if fresh:
+            self.index.add(
+                [IndexedAnalysis(str(row[0]), row[1], row[2]) for row in fresh],
+                [row[4] for row in fresh],
+            )
+        for row in rows:
+            self._recent[str(row[0])] = row[3]
+        if rows and (self._high_water is None or rows[-1][3] > self._high_water):
+            self._high_water = rows[-1][3]
+
+    def search(
+        self,
+        query: Sequence[float],
+        limit: int,
+        ticker: str | None,
+        start_date: date | None,
+        end_date: date | None,
+        exclude_id: str | None,
+    ) -> List[Dict[str, Any]]:
+        self.refresh()
+        matches = self.index.search(query, limit, ticker, start_date, end_date, exclude_id)
+        if not matches:
+            return []
+
+        with get_pg_connection() as pg_conn:
+            with pg_conn.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT a.id, s.ticker, a.date_range_start, a.date_range_end, a.signal, "
+                    f"a.summary, a.created_at FROM {ANALYSES_TABLE} a "
+                    f"JOIN {STOCKS_TABLE} s ON s.id = a.stock_id WHERE a.id = ANY(%s::uuid[])",
+                    ([match.analysis_id for match in matches],),
+                )
+                details = {str(row[0]): row for row in cursor.fetchall()}
+        return [
+            {**dict(zip(RESULT_COLUMNS, details[match.analysis_id])), "score": match.score}
+            for match in matches
+            if match.analysis_id in details
+        ]
+
+
+local_index = LocalSearchIndex(
+    dimensions=settings.search_dimensions,
+    refresh_seconds=settings.search_local_refresh_seconds,
+    lookback_seconds=settings.search_local_refresh_lookback_seconds,
+    page_size=settings.search_local_refresh_page_size,
+)
+
+
+def search_analyses(
+    query: Sequence[float],
+    limit: int,
+    ticker: str | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    exclude_id: str | None = None,
+) -> List[Dict[str, Any]]:
+    if settings.search_backend == "local":
+        return local_index.search(query, limit, ticker, start_date, end_date, exclude_id)
+    return _search_pgvector(query, limit, ticker, start_date, end_date, exclude_id)
+
+
+async def search_analyses_async(
+    query: Sequence[float],
+    limit: int,
+    ticker: str | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    exclude_id: str | None = None,
+) -> List[Dict[str, Any]]:
+    if settings.search_backend == "local":
+        # The in-process index is CPU-bound numpy work and refreshes on the sync pool
+        return await asyncio.to_thread(
+            local_index.search, query, limit, ticker, start_date, end_date, exclude_id
+        )
+    return await _search_pgvector_async(query, limit, ticker, start_date, end_date, exclude_id)
@@ -1,7 +1,17 @@
 from __future__ import annotations
 
+from app.services.gemini_client import estimate_tokens as _estimate_tokens
 from app.services.gemini_client import generate_text as _generate_text
+from app.services.gemini_client import generate_text_async as _generate_text_async
 
 
 def generate_text(prompt: str) -> str:
     return _generate_text(prompt)
+
+
+async def generate_text_async(prompt: str) -> str:
+    return await _generate_text_async(prompt)
+
+
+def estimate_tokens(text: str) -> int:
+    return _estimate_tokens(text)
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import List, Sequence
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class IndexedAnalysis:
+    analysis_id: str
+    ticker: str
+    created_at: datetime
+
+
+@dataclass(frozen=True)
+class VectorMatch:
+    analysis_id: str
+    score: float
+
+
+class VectorIndex:
+    """Exact cosine-similarity index over unit-normalized float32 vectors.
+
+    Vectors live in one contiguous matrix so a query is a single matrix-vector
+    product followed by ``argpartition``. Filters are applied as boolean masks
+    before ranking, so filtered queries never come back short.
+    """
+
+    def __init__(self, dimensions: int) -> None:
+        self.dimensions = dimensions
+        self._vectors = np.empty((0, dimensions), dtype=np.float32)
+        self._ids: List[str] = []
+        self._tickers = np.empty(0, dtype=object)
+        self._created = np.empty(0, dtype="datetime64[us]")
+        self._positions: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (vectors / norms).astype(np.float32, copy=False)
+
+    def add(self, items: Sequence[IndexedAnalysis], vectors: Sequence[Sequence[float]]) -> None:
+        fresh = [
+            (item, vector)
+            for item, vector in zip(items, vectors)
+            if item.analysis_id not in self._positions
+        ]
+        if not fresh:
+            return
+        matrix = self._normalize(np.asarray([vector for _, vector in fresh], dtype=np.float32))
+        with self._lock:
+            start = len(self._ids)
+            self._vectors = np.vstack([self._vectors, matrix])
+            self._tickers = np.concatenate(
+                [self._tickers, np.array([item.ticker for item, _ in fresh], dtype=object)]
+            )
+            self._created = np.concatenate(
+                [
+                    self._created,
+                    np.array([item.created_at for item, _ in fresh], dtype="datetime64[us]"),
+                ]
+            )
+            for offset, (item, _) in enumerate(fresh):
+                self._ids.append(item.analysis_id)
+                self._positions[item.analysis_id] = start + offset
+
+    def vector(self, analysis_id: str) -> np.ndarray | None:
+        position = self._positions.get(analysis_id)
+        return None if position is None else self._vectors[position]
+
+    def search(
+        self,
+        query: Sequence[float],
+        limit: int,
+        ticker: str | None = None,
+        start_date: date | None = None,
+        end_date: date | None = None,
+        exclude_id: str | None = None,
+    ) -> List[VectorMatch]:
+        with self._lock:
+            vectors, ids = self._vectors, self._ids
+            tickers, created = self._tickers, self._created
+        if not ids:
+            return []
+
+        mask = np.ones(len(ids), dtype=bool)
+        if ticker:
+            mask &= tickers == ticker
+        if start_date:
+            mask &= created >= np.datetime64(start_date, "us")
+        if end_date:
+            mask &= created < np.datetime64(end_date, "us") + np.timedelta64(1, "D")
+        if exclude_id and exclude_id in self._positions:
+            mask[self._positions[exclude_id]] = False
+
+        candidates = np.flatnonzero(mask)
+        if candidates.size == 0:
+            return []
+
+        q = self._normalize(np.asarray(query, dtype=np.float32))
+        scores = vectors[candidates] @ q if candidates.size < len(ids) else vectors @ q
+        k = min(limit, candidates.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [VectorMatch(ids[candidates[i]], float(scores[i])) for i in top]
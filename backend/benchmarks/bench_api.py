@@ -0,0 +1,185 @@
+"""End-to-end load test for /ingest, /stocks, /ohlc and /analyze.
+
+By default the app runs in-process against the in-memory database and the fake
+Gemini backend, so no credentials or quota are needed:
+
+    cd backend && python -m benchmarks.bench_api --tickers 8 --concurrency 8 --requests 64
+
+``--database-backend duckdb`` serves the same phases from an in-memory DuckDB instead.
+
+Pass ``--url`` to drive a running server instead (configure its backends through
+its own environment). Each phase reports throughput and p50/p95/p99 latency.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Awaitable, Callable, List
+
+import httpx
+import numpy as np
+
+
+@dataclass
+class PhaseResult:
+    name: str
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    elapsed: float = 0.0
+
+    def report(self) -> str:
+        if not self.latencies:
+            return f"{self.name:<8} no requests"
+        p50, p95, p99 = np.percentile(np.asarray(self.latencies) * 1000, [50, 95, 99])
+        return (
+            f"{self.name:<8} n={len(self.latencies):<5} err={self.errors:<3} "
+            f"{len(self.latencies) / self.elapsed:8.1f} req/s  "
+            f"p50={p50:8.1f}ms  p95={p95:8.1f}ms  p99={p99:8.1f}ms"
+        )
+
+
+def synthetic_csv(ticker: str, days: int, seed: int) -> bytes:
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, days)))
+    start = date(2020, 1, 1)
+    lines = ["Date,Open,High,Low,Close,Volume"]
+    for i, close in enumerate(closes):
+        open_ = close * (1 + rng.normal(0, 0.004))
+        high = max(open_, close) * (1 + abs(rng.normal(0, 0.006)))
+        low = min(open_, close) * (1 - abs(rng.normal(0, 0.006)))
+        volume = int(rng.integers(100_000, 5_000_000))
+        day = start + timedelta(days=i)
+        lines.append(f"{day},{open_:.2f},{high:.2f},{low:.2f},{close:.2f},{volume}")
+    return ("\n".join(lines) + "\n").encode()
+
+
+async def run_phase(
+    name: str,
+    requests: int,
+    concurrency: int,
+    send: Callable[[int], Awaitable[httpx.Response]],
+) -> PhaseResult:
+    result = PhaseResult(name)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await send(i)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            result.latencies.append(time.perf_counter() - started)
+            if not ok:
+                result.errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+async def run(args: argparse.Namespace) -> List[PhaseResult]:
+    if args.url:
+        transport = None
+        base_url = args.url
+    else:
+        from app.main import app
+
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://bench"
+
+    tickers = [f"BENCH{i:02d}" for i in range(args.tickers)]
+    start = date(2020, 1, 1)
+    rng = random.Random(args.seed)
+    phases = set(args.phases.split(","))
+    results: List[PhaseResult] = []
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url=base_url, timeout=args.timeout
+    ) as client:
+
+        async def ingest(i: int) -> httpx.Response:
+            content = synthetic_csv(tickers[i], args.days, args.seed + i)
+            files = {"files": (f"{tickers[i]}_EOD.csv", content, "text/csv")}
+            return await client.post("/ingest", files=files)
+
+        async def stocks(i: int) -> httpx.Response:
+            return await client.get("/stocks")
+
+        async def ohlc(i: int) -> httpx.Response:
+            return await client.get("/ohlc", params={"ticker": rng.choice(tickers)})
+
+        async def analyze(i: int) -> httpx.Response:
+            end = start + timedelta(days=rng.randint(args.window, args.days - 1))
+            body = {
+                "tickers": [rng.choice(tickers)],
+                "start_date": (end - timedelta(days=args.window)).isoformat(),
+                "end_date": end.isoformat(),
+            }
+            return await client.post("/analyze", json=body)
+
+        # Ingest always runs so the read phases have data to serve
+        results.append(await run_phase("ingest", len(tickers), args.concurrency, ingest))
+        for name, send in (("stocks", stocks), ("ohlc", ohlc), ("analyze", analyze)):
+            if name in phases:
+                results.append(await run_phase(name, args.requests, args.concurrency, send))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--tickers", type=int, default=8)
+    parser.add_argument("--days", type=int, default=750)
+    parser.add_argument("--window", type=int, default=120)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--phases", default="stocks,ohlc,analyze")
+    parser.add_argument("--latency-ms", type=float, default=800.0)
+    parser.add_argument("--jitter-ms", type=float, default=200.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--db-latency-ms", type=float, default=0.0)
+    parser.add_argument("--database-backend", choices=("memory", "duckdb"), default="memory")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    if not args.url:
+        defaults = {
+            "SUPABASE_URL": "http://bench",
+            "SUPABASE_SERVICE_KEY": "bench",
+            "SUPABASE_DB_URL": "postgresql://bench",
+            "GEMINI_API_KEY": "bench",
+            "DATABASE_BACKEND": args.database_backend,
+            "DUCKDB_PATH": ":memory:",
+            "GEMINI_BACKEND": "fake",
+            "EMBEDDING_WORKER_ENABLED": "false",
+            "EMBEDDING_CACHE_PERSISTENT": "false",
+            "GEMINI_RATE_LIMIT_ENABLED": "false",
+            "GRAPH_CHECKPOINT_PATH": ":memory:",
+            "FAKE_GEMINI_LATENCY_MS": str(args.latency_ms),
+            "FAKE_GEMINI_JITTER_MS": str(args.jitter_ms),
+            "FAKE_GEMINI_RATE_LIMIT_RATE": str(args.rate_limit_rate),
+            "FAKE_GEMINI_SEED": str(args.seed),
+            "MEMORY_DB_LATENCY_MS": str(args.db_latency_ms),
+        }
+        for key, value in defaults.items():
+            os.environ.setdefault(key, value)
+
+    results = asyncio.run(run(args))
+    target = args.url or f"in-process ({args.database_backend} db, fake Gemini)"
+    print(f"target={target} tickers={args.tickers} concurrency={args.concurrency}")
+    for result in results:
+        print(result.report())
+
+
+if __name__ == "__main__":
+    main()
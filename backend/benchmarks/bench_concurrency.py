@@ -0,0 +1,118 @@
+"""Per-worker throughput of the read endpoints with blocking vs awaited database calls.
+
+The app runs in-process on one event loop, like a single uvicorn worker, against the
+in-memory database with a simulated round trip per query and the read cache off, so
+every request reaches the database:
+
+    cd backend && python -m benchmarks.bench_concurrency --db-latency-ms 20 --concurrency 1,8,32
+
+``blocking`` reproduces the previous handlers, which called the synchronous client
+from ``async def`` routes and held the event loop for each round trip; ``async``
+is the current async client.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+from typing import List
+
+import httpx
+
+
+def blocking_client(db):
+    """The memory db behind awaitable queries that block the loop, like a sync client."""
+    from app.db.memory import AsyncMemorySupabase, MemoryQuery
+
+    class BlockingQuery(MemoryQuery):
+        async def execute(self):
+            return MemoryQuery.execute(self)
+
+    class BlockingSupabase(AsyncMemorySupabase):
+        def table(self, name: str) -> BlockingQuery:
+            return BlockingQuery(self.db, name)
+
+    return BlockingSupabase(db)
+
+
+def seed_data(tickers: List[str], days: int) -> None:
+    from app.db.client import memory_db
+    from app.db.repository import get_repository
+    from app.ingestion.csv_parser import parse_csv_bytes
+    from app.ingestion.loader import load_ohlc_data
+
+    from benchmarks.bench_api import synthetic_csv
+
+    latency, memory_db.latency = memory_db.latency, 0.0
+    repo = get_repository()
+    for i, ticker in enumerate(tickers):
+        load_ohlc_data(repo, ticker, parse_csv_bytes(synthetic_csv(ticker, days, i)), "seed")
+    memory_db.latency = latency
+
+
+async def run(args: argparse.Namespace) -> None:
+    from app.api.routes import stocks
+    from app.db.client import async_memory_db, memory_db
+    from app.db.repository import SupabaseRepository
+    from app.main import app
+
+    from benchmarks.bench_api import run_phase
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    tickers = [f"BENCH{i:02d}" for i in range(args.tickers)]
+    seed_data(tickers, args.days)
+    repos = {
+        "blocking": SupabaseRepository(memory_db, blocking_client(memory_db)),
+        "async": SupabaseRepository(memory_db, async_memory_db),
+    }
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        paths = {
+            "stocks": lambda i: client.get("/stocks"),
+            "ohlc": lambda i: client.get(
+                "/ohlc", params={"ticker": tickers[i % len(tickers)], "limit": 100}
+            ),
+            "analyses": lambda i: client.get(
+                "/analyses", params={"ticker": tickers[i % len(tickers)]}
+            ),
+        }
+        for concurrency in (int(value) for value in args.concurrency.split(",")):
+            for mode, repo in repos.items():
+                stocks.get_repository = lambda repo=repo: repo
+                for name, send in paths.items():
+                    result = await run_phase(name, args.requests, concurrency, send)
+                    print(f"c={concurrency:<3} {mode:<8} {result.report()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tickers", type=int, default=8)
+    parser.add_argument("--days", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=128)
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--db-latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    defaults = {
+        "SUPABASE_URL": "http://bench",
+        "SUPABASE_SERVICE_KEY": "bench",
+        "SUPABASE_DB_URL": "postgresql://bench",
+        "GEMINI_API_KEY": "bench",
+        "DATABASE_BACKEND": "memory",
+        "GEMINI_BACKEND": "fake",
+        "EMBEDDING_WORKER_ENABLED": "false",
+        "READ_CACHE_ENABLED": "false",
+        "MEMORY_DB_LATENCY_MS": str(args.db_latency_ms),
+    }
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+
+    print(f"db_latency={args.db_latency_ms:.0f}ms requests={args.requests} per phase")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
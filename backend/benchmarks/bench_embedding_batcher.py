@@ -0,0 +1,97 @@
+"""Compare per-item embedding writes against the coalescing EmbeddingBatcher.
+
+Gemini and Postgres are simulated with fixed round-trip latencies, and Gemini
+requests draw from the same per-model requests-per-minute limiter the client
+uses, so the benchmark runs without credentials:
+
+    cd backend && python -m benchmarks.bench_embedding_batcher --items 128 --concurrency 16
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+for key in ("SUPABASE_URL", "SUPABASE_SERVICE_KEY", "SUPABASE_DB_URL", "GEMINI_API_KEY"):
+    os.environ.setdefault(key, "bench")
+
+from app.services.embedding_batcher import EmbeddingBatcher  # noqa: E402
+from app.services.rate_limiter import ModelRateLimiter  # noqa: E402
+
+EMBED_RTT = 0.120
+EMBED_PER_ITEM = 0.002
+INSERT_RTT = 0.030
+
+
+limiter = ModelRateLimiter(requests_per_minute=600, tokens_per_minute=10_000_000)
+
+
+def steady_state_limiter(rpm: int) -> ModelRateLimiter:
+    # Spend the initial burst so both paths are measured against the sustained quota
+    fresh = ModelRateLimiter(requests_per_minute=rpm, tokens_per_minute=10_000_000)
+    fresh.requests.reserve(rpm)
+    return fresh
+
+
+def fake_embed(texts):
+    limiter.acquire(sum(len(text) for text in texts) // 4 + 1)
+    time.sleep(EMBED_RTT + EMBED_PER_ITEM * len(texts))
+    return [[0.0] * 8 for _ in texts]
+
+
+def fake_write(items):
+    time.sleep(INSERT_RTT)
+
+
+def run_per_item(items: int, concurrency: int) -> float:
+    def one(i: int) -> None:
+        fake_write([(f"a{i}", fake_embed([f"text {i}"])[0])])
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(items)))
+    return time.perf_counter() - started
+
+
+def run_batched(
+    items: int, concurrency: int, batch_size: int, window: float, in_flight: int
+) -> float:
+    batcher = EmbeddingBatcher(fake_embed, fake_write, batch_size, window, in_flight)
+
+    def one(i: int) -> None:
+        batcher.submit(f"a{i}", f"text {i}").result()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(items)))
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=128)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--window-ms", type=float, default=50.0)
+    parser.add_argument("--in-flight", type=int, default=2)
+    parser.add_argument("--rpm", type=int, default=600)
+    args = parser.parse_args()
+
+    global limiter
+    limiter = steady_state_limiter(args.rpm)
+    per_item = run_per_item(args.items, args.concurrency)
+    limiter = steady_state_limiter(args.rpm)
+    batched = run_batched(
+        args.items, args.concurrency, args.batch_size, args.window_ms / 1000, args.in_flight
+    )
+
+    print(f"items={args.items} concurrency={args.concurrency} rpm={args.rpm}")
+    print(f"per-item: {per_item:.2f}s  {args.items / per_item:.1f} items/s")
+    print(f"batched:  {batched:.2f}s  {args.items / batched:.1f} items/s")
+    print(f"speedup:  {per_item / batched:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Compare end-to-end /analyze graph latency for the sequential chain and the fan-out graph.
+
+Both graphs use the same node functions. Supabase is the in-memory backend with a
+simulated round-trip per query, and Gemini is the fake backend. Embeddings are
+computed inline (EMBEDDING_DEFERRED=false):
+
+    cd backend && python -m benchmarks.bench_graph --runs 20 --db-latency-ms 40
+
+The semantic cache is enabled but never hits, so its prior-analysis lookup is
+paid on every run, as it would be in production with the cache turned on.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from concurrent.futures import Future
+from datetime import date, timedelta
+from typing import List
+
+
+def build_chain_graph():
+    """The pre-fan-out topology: every step in sequence, plus the no-op reporter."""
+    from langgraph.graph import END, StateGraph
+
+    from app.agents import graph as g
+
+    graph = StateGraph(g.AnalystState)
+    g._add_node(graph, "resolve_stock", g.resolve_stock, g.aresolve_stock)
+    g._add_node(graph, "load_ohlc", g.load_ohlc, g.aload_ohlc)
+    g._add_node(
+        graph, "fetch_prior_analyses", g.fetch_prior_analyses, g.afetch_prior_analyses
+    )
+    g._add_node(graph, "data_analyst", g.run_data_analyst)
+    g._add_node(graph, "semantic_cache", g.run_semantic_cache)
+    g._add_node(graph, "research", g.run_research_agent, g.arun_research_agent)
+    g._add_node(graph, "reporter", lambda state: state)
+    g._add_node(graph, "store_results", g.store_results, g.astore_results)
+    g._add_node(graph, "embed_report", g.embed_report, g.aembed_report)
+    g._add_node(graph, "index_embedding", g.index_embedding, g.aindex_embedding)
+
+    chain = [
+        "resolve_stock",
+        "load_ohlc",
+        "fetch_prior_analyses",
+        "data_analyst",
+        "semantic_cache",
+        "research",
+        "reporter",
+        "store_results",
+        "embed_report",
+        "index_embedding",
+    ]
+    graph.set_entry_point(chain[0])
+    for source, target in zip(chain, chain[1:]):
+        graph.add_edge(source, target)
+    graph.add_edge(chain[-1], END)
+    return graph.compile()
+
+
+class _WriteOnlyBatcher:
+    """Stands in for the embedding batcher: a cache-hit embed plus one simulated insert."""
+
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+
+    def submit(self, analysis_id: str, text: str) -> Future:
+        from app.services.embeddings import embed_texts
+
+        future: Future = Future()
+        embedding = embed_texts([text])[0]
+        time.sleep(self.latency)
+        future.set_result(embedding)
+        return future
+
+
+def seed_data(tickers: List[str], days: int) -> None:
+    import pandas as pd
+
+    from app.db.client import memory_db
+    from app.db.repository import get_repository
+    from app.ingestion.loader import load_ohlc_data
+
+    latency, memory_db.latency = memory_db.latency, 0.0
+    start = date(2020, 1, 1)
+    for i, ticker in enumerate(tickers):
+        closes = [100 + ((day * (i + 3)) % 17) - 8 + day * 0.05 for day in range(days)]
+        df = pd.DataFrame(
+            {
+                "date": [start + timedelta(days=day) for day in range(days)],
+                "open": closes,
+                "high": [close + 1 for close in closes],
+                "low": [close - 1 for close in closes],
+                "close": closes,
+                "volume": 1_000_000,
+            }
+        )
+        load_ohlc_data(get_repository(), ticker, df, f"seed-{ticker}")
+    memory_db.latency = latency
+
+
+def reset_caches() -> None:
+    from app.db.client import memory_db
+    from app.services.embedding_cache import embedding_cache
+
+    # Analyses and embeddings from the previous graph would turn every run into a cache hit
+    memory_db.tables.pop("analyses", None)
+    embedding_cache._entries.clear()
+
+
+async def measure(app, runs: int, tickers: List[str], window: int) -> List[float]:
+    reset_caches()
+    latencies = []
+    end = date(2020, 1, 1) + timedelta(days=window + 30)
+    for i in range(runs):
+        state = {
+            "ticker": tickers[i % len(tickers)],
+            "start_date": (end - timedelta(days=window)).isoformat(),
+            # Vary the window so neither the semantic cache nor the embedding cache hits
+            "end_date": (end + timedelta(days=i)).isoformat(),
+        }
+        started = time.perf_counter()
+        await app.ainvoke(state)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--tickers", type=int, default=4)
+    parser.add_argument("--days", type=int, default=400)
+    parser.add_argument("--window", type=int, default=120)
+    parser.add_argument("--db-latency-ms", type=float, default=40.0)
+    parser.add_argument("--gemini-latency-ms", type=float, default=800.0)
+    args = parser.parse_args()
+
+    defaults = {
+        "SUPABASE_URL": "http://bench",
+        "SUPABASE_SERVICE_KEY": "bench",
+        "SUPABASE_DB_URL": "postgresql://bench",
+        "GEMINI_API_KEY": "bench",
+        "DATABASE_BACKEND": "memory",
+        "MEMORY_DB_LATENCY_MS": str(args.db_latency_ms),
+        "GEMINI_BACKEND": "fake",
+        "FAKE_GEMINI_LATENCY_MS": str(args.gemini_latency_ms),
+        "FAKE_GEMINI_JITTER_MS": "0",
+        "GEMINI_RATE_LIMIT_ENABLED": "false",
+        "EMBEDDING_DEFERRED": "false",
+        "EMBEDDING_CACHE_PERSISTENT": "false",
+        "SEMANTIC_CACHE_ENABLED": "true",
+        "GRAPH_CHECKPOINT_ENABLED": "false",
+    }
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+
+    from app.agents import graph as g
+
+    g.get_embedding_batcher = lambda: _WriteOnlyBatcher(args.db_latency_ms / 1000)
+    tickers = [f"BENCH{i:02d}" for i in range(args.tickers)]
+    seed_data(tickers, args.days)
+
+    chain = asyncio.run(measure(build_chain_graph(), args.runs, tickers, args.window))
+    fan_out = asyncio.run(measure(g.build_graph(), args.runs, tickers, args.window))
+
+    print(
+        f"runs={args.runs} db_latency={args.db_latency_ms:.0f}ms "
+        f"gemini_latency={args.gemini_latency_ms:.0f}ms"
+    )
+    for name, latencies in (("chain", chain), ("fan-out", fan_out)):
+        ms = [value * 1000 for value in latencies]
+        print(
+            f"{name:<8} mean={statistics.mean(ms):7.1f}ms  "
+            f"p50={statistics.median(ms):7.1f}ms  max={max(ms):7.1f}ms"
+        )
+    print(f"saved:   {(statistics.mean(chain) - statistics.mean(fan_out)) * 1000:.1f}ms per run")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Range-scan cost of the original and compact ``ohlc_daily`` layouts on a real Postgres.
+
+Both layouts are built side by side in a scratch schema from the same synthetic bars,
+loaded day by day across all tickers the way daily ingests interleave them. The
+compact table is then rewritten in key order, as infra/migrations/ohlc_compact.sql
+does. Each layout then serves the same random per-ticker date ranges, the query
+behind /ohlc:
+
+    cd backend && python -m benchmarks.bench_ohlc_schema --dsn "$SUPABASE_DB_URL"
+
+Reports table and index sizes, scan latency and the shared buffers one scan touches.
+The scratch schema is dropped afterwards unless ``--keep`` is given.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import re
+import time
+from datetime import date, timedelta
+from typing import Dict, List
+
+import numpy as np
+import psycopg
+
+SCHEMA = "bench_ohlc"
+
+LAYOUTS: Dict[str, str] = {
+    "legacy": """
+        create table {schema}.legacy (
+            id uuid primary key default gen_random_uuid(),
+            stock_id uuid,
+            date date not null,
+            open numeric,
+            high numeric,
+            low numeric,
+            close numeric,
+            volume bigint,
+            source_file_hash text,
+            created_at timestamp default now(),
+            unique (stock_id, date)
+        );
+        create index on {schema}.legacy (stock_id, date);
+    """,
+    "compact": """
+        create table {schema}.compact (
+            stock_id uuid not null,
+            date date not null,
+            open double precision not null,
+            high double precision not null,
+            low double precision not null,
+            close double precision not null,
+            volume bigint not null,
+            primary key (stock_id, date)
+        );
+    """,
+}
+
+# Day-major order, like one daily file per ticker arriving each day
+LOAD_SQL = """
+    insert into {schema}.{table} (stock_id, date, open, high, low, close, volume{extra})
+    select s.id, %(start)s::date + d, p, p * 1.01, p * 0.99, p, 1000000 + d * 17{extra_value}
+    from {schema}.stocks s
+    cross join generate_series(0, %(days)s - 1) d
+    cross join lateral (select round((100 + 20 * sin(d / 30.0 + s.n))::numeric, 2) p) price
+    order by d, s.n
+"""
+
+SCAN_SQL = (
+    "select date, open, high, low, close, volume from {schema}.{table} "
+    "where stock_id = %s and date between %s and %s order by date"
+)
+
+
+def setup(conn: psycopg.Connection, tickers: int, days: int, start: date) -> list:
+    conn.execute(f"drop schema if exists {SCHEMA} cascade")
+    conn.execute(f"create schema {SCHEMA}")
+    conn.execute(
+        f"create table {SCHEMA}.stocks as "
+        "select gen_random_uuid() as id, n from generate_series(1, %s) n",
+        (tickers,),
+    )
+    for table, ddl in LAYOUTS.items():
+        conn.execute(ddl.format(schema=SCHEMA))
+        legacy = table == "legacy"
+        conn.execute(
+            LOAD_SQL.format(
+                schema=SCHEMA,
+                table=table,
+                extra=", source_file_hash" if legacy else "",
+                extra_value=", encode(sha256(s.id::text::bytea), 'hex')" if legacy else "",
+            ),
+            {"start": start, "days": days},
+        )
+    conn.execute(f"cluster {SCHEMA}.compact using compact_pkey")
+    for table in LAYOUTS:
+        conn.execute(f"vacuum analyze {SCHEMA}.{table}")
+    return [row[0] for row in conn.execute(f"select id from {SCHEMA}.stocks")]
+
+
+def sizes(conn: psycopg.Connection, table: str) -> str:
+    heap, total = conn.execute(
+        "select pg_relation_size(%s), pg_total_relation_size(%s)",
+        (f"{SCHEMA}.{table}", f"{SCHEMA}.{table}"),
+    ).fetchone()
+    return f"heap={heap / 2**20:7.1f}MB  indexes={(total - heap) / 2**20:7.1f}MB"
+
+
+def buffers(conn: psycopg.Connection, table: str, params: tuple) -> int:
+    sql = "explain (analyze, buffers) " + SCAN_SQL.format(schema=SCHEMA, table=table)
+    plan = "\n".join(row[0] for row in conn.execute(sql, params))
+    # The first Buffers line belongs to the top plan node and includes its children
+    top = re.search(r"Buffers: (.*)", plan)
+    if top is None:
+        return 0
+    return sum(int(value) for value in re.findall(r"(?:hit|read)=(\d+)", top.group(1)))
+
+
+def scan(conn: psycopg.Connection, table: str, queries: List[tuple]) -> List[float]:
+    sql = SCAN_SQL.format(schema=SCHEMA, table=table)
+    latencies = []
+    for params in queries:
+        started = time.perf_counter()
+        conn.execute(sql, params, prepare=True).fetchall()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dsn", default=os.environ.get("SUPABASE_DB_URL"))
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--days", type=int, default=2500)
+    parser.add_argument("--window", type=int, default=365)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", action="store_true", help="leave the scratch schema in place")
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error("pass --dsn or set SUPABASE_DB_URL")
+
+    start = date(2015, 1, 1)
+    rng = random.Random(args.seed)
+    with psycopg.connect(args.dsn, autocommit=True) as conn:
+        print(f"loading {args.tickers} tickers x {args.days} days into {SCHEMA} ...")
+        try:
+            stock_ids = setup(conn, args.tickers, args.days, start)
+            queries = []
+            for _ in range(args.queries):
+                first = start + timedelta(days=rng.randint(0, args.days - args.window))
+                queries.append((rng.choice(stock_ids), first, first + timedelta(days=args.window)))
+
+            for table in LAYOUTS:
+                scan(conn, table, queries)  # warm the cache so both read from shared buffers
+                latencies = np.asarray(scan(conn, table, queries)) * 1000
+                p50, p95 = np.percentile(latencies, [50, 95])
+                touched = buffers(conn, table, queries[0])
+                print(
+                    f"{table:<8} {sizes(conn, table)}  buffers/scan={touched:<4} "
+                    f"p50={p50:6.2f}ms  p95={p95:6.2f}ms"
+                )
+        finally:
+            if not args.keep:
+                conn.execute(f"drop schema if exists {SCHEMA} cascade")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Per-read cost of a ticker's full OHLC history from each tier, as seen by /ohlc and analyses:
+
+    cd backend && python -m benchmarks.bench_ohlc_store --years 20
+
+``database`` loads through the repository (in-memory backend, no simulated latency),
+``read_cache`` is a hit in the in-process LRU, ``mmap`` is a hit in the on-disk store
+with the mapping already open, and ``mmap_open`` maps the files afresh, like the first
+read in another worker once the pages are in the OS page cache.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Callable
+
+for key in ("SUPABASE_URL", "SUPABASE_SERVICE_KEY", "SUPABASE_DB_URL", "GEMINI_API_KEY"):
+    os.environ.setdefault(key, "bench")
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from app.agents import tools  # noqa: E402
+from app.db.memory import AsyncMemorySupabase, MemorySupabase  # noqa: E402
+from app.db.repository import SupabaseRepository  # noqa: E402
+from app.ingestion.loader import load_ohlc_data  # noqa: E402
+from app.services.ohlc_store import OhlcStore  # noqa: E402
+from app.services.read_cache import read_cache  # noqa: E402
+
+
+def timed(name: str, reads: int, read: Callable[[], object]) -> None:
+    read()
+    started = time.perf_counter()
+    for _ in range(reads):
+        read()
+    per_read = (time.perf_counter() - started) / reads
+    print(f"{name:<12} {per_read * 1e6:10.1f} us/read")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=int, default=20)
+    parser.add_argument("--reads", type=int, default=200)
+    args = parser.parse_args()
+
+    days = [date(2000, 1, 3) + timedelta(days=i) for i in range(args.years * 365)]
+    days = [day for day in days if day.weekday() < 5]
+    closes = 100 + np.cumsum(np.random.default_rng(0).normal(0, 1, len(days)))
+    df = pd.DataFrame(
+        {
+            "date": days,
+            "open": closes,
+            "high": closes + 1,
+            "low": closes - 1,
+            "close": closes,
+            "volume": 1_000_000,
+        }
+    )
+    db = MemorySupabase()
+    repo = SupabaseRepository(db, AsyncMemorySupabase(db))
+    load_ohlc_data(repo, "BENCH", df, "bench")
+    print(f"{len(days)} bars ({args.years} years)")
+
+    read_cache.enabled = False
+    timed("database", args.reads // 10 or 1, lambda: tools.ohlc_columns(repo, "BENCH"))
+    read_cache.enabled = True
+    timed("read_cache", args.reads, lambda: tools.ohlc_columns(repo, "BENCH"))
+
+    with tempfile.TemporaryDirectory() as root:
+        tools.ohlc_store = OhlcStore(enabled=True, root=root, refresh_seconds=3600.0)
+        timed("mmap", args.reads, lambda: tools.ohlc_columns(repo, "BENCH"))
+
+        def fresh_worker() -> object:
+            store = OhlcStore(enabled=True, root=root, refresh_seconds=3600.0)
+            return store.get_or_fill("BENCH", lambda start: None)
+
+        timed("mmap_open", args.reads, fresh_worker)
+
+
+if __name__ == "__main__":
+    main()
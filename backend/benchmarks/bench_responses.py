@@ -0,0 +1,181 @@
+"""Encode and transfer cost of large /ohlc and /analyses responses:
+
+    cd backend && python -m benchmarks.bench_responses --bars 5000 --analyses 100
+
+``encode`` times only turning one page into body bytes. ``models`` is the previous path:
+build the response models, let FastAPI validate them against ``response_model`` and run
+``jsonable_encoder``, then ``json.dumps``. ``orjson`` encodes the rows as loaded. ``request``
+runs whole requests through the app in process, once per content coding, and reports the
+body size on the wire; with no network in between, its times include the client decoding
+the body and leave out the transfer that compression saves.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+for key in ("SUPABASE_URL", "SUPABASE_SERVICE_KEY", "SUPABASE_DB_URL", "GEMINI_API_KEY"):
+    os.environ.setdefault(key, "bench")
+os.environ.setdefault("DATABASE_BACKEND", "memory")
+
+
+async def timed(reads: int, read: Callable[[], Awaitable[Any]]) -> float:
+    await read()
+    started = time.perf_counter()
+    for _ in range(reads):
+        await read()
+    return (time.perf_counter() - started) / reads
+
+
+def seed(bars: int, analyses: int) -> None:
+    from app.db.repository import get_repository
+    from app.ingestion.csv_parser import parse_csv_bytes
+    from app.ingestion.loader import load_ohlc_data
+
+    from benchmarks.bench_api import synthetic_csv
+
+    repo = get_repository()
+    load_ohlc_data(repo, "BENCH", parse_csv_bytes(synthetic_csv("BENCH", bars, 0)), "bench")
+    stock_id = repo.find_stock_id("BENCH")
+    for i in range(analyses):
+        paragraph = (
+            f"RSI at {40 + i % 30}.5 with MACD {i % 7 - 3}.25 over the window points to a "
+            f"{'constructive' if i % 2 else 'cautious'} setup; volume trends and the recent "
+            "range suggest waiting for confirmation before adding exposure. "
+        )
+        repo.insert_analysis(
+            {
+                "stock_id": stock_id,
+                "date_range_start": "2020-01-01",
+                "date_range_end": f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+                "rsi": 40.5 + i % 30,
+                "macd": i % 7 - 3.25,
+                "hist": 0.1,
+                "signal": "bullish" if i % 2 else "neutral",
+                "summary": paragraph * 12,
+                "created_at": f"2024-01-01T00:{i // 60:02d}:{i % 60:02d}",
+            }
+        )
+
+
+async def encode(args: argparse.Namespace) -> None:
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+    from starlette.responses import JSONResponse as StarletteJSONResponse
+
+    from app.agents.tools import ohlc_columns_async
+    from app.api.routes.stocks import ANALYSIS_FIELDS
+    from app.core.responses import JSONResponse
+    from app.db.repository import OHLC_COLUMNS, get_repository
+    from app.schemas.responses import (
+        AnalysisHistory,
+        AnalysisHistoryResponse,
+        OhlcData,
+        OhlcDataResponse,
+    )
+
+    repo = get_repository()
+    columns = await ohlc_columns_async(repo, "BENCH")
+    fields = ANALYSIS_FIELDS + ("summary",)
+    analyses = await repo.list_analyses_async(
+        repo.find_stock_id("BENCH"), fields, None, args.analyses
+    )
+
+    async def through_models(model: type, content: Any) -> bytes:
+        field = create_response_field(name="response", type_=model)
+        encoded = await serialize_response(field=field, response_content=content)
+        return StarletteJSONResponse(encoded).body
+
+    def ohlc_rows() -> list:
+        lists = [columns[name].tolist() for name in OHLC_COLUMNS]
+        return [dict(zip(OHLC_COLUMNS, values)) for values in zip(*lists)]
+
+    async def rows_models() -> bytes:
+        data = [OhlcData(**row) for row in ohlc_rows()]
+        return await through_models(OhlcDataResponse, OhlcDataResponse(ticker="BENCH", data=data))
+
+    async def rows_orjson() -> bytes:
+        return JSONResponse({"ticker": "BENCH", "data": ohlc_rows(), "next_cursor": None}).body
+
+    async def columns_json() -> bytes:
+        lists = {name: values.tolist() for name, values in columns.items()}
+        return StarletteJSONResponse({"ticker": "BENCH", **lists, "next_cursor": None}).body
+
+    async def columns_orjson() -> bytes:
+        return JSONResponse({"ticker": "BENCH", **columns, "next_cursor": None}).body
+
+    async def analyses_models() -> bytes:
+        page = AnalysisHistoryResponse(analyses=[AnalysisHistory(**row) for row in analyses])
+        return await through_models(AnalysisHistoryResponse, page)
+
+    async def analyses_orjson() -> bytes:
+        return JSONResponse({"analyses": analyses, "next_cursor": None}).body
+
+    cases: Dict[str, Dict[str, Callable[[], Awaitable[bytes]]]] = {
+        "ohlc rows": {"models": rows_models, "orjson": rows_orjson},
+        "ohlc columns": {"json": columns_json, "orjson": columns_orjson},
+        "analyses": {"models": analyses_models, "orjson": analyses_orjson},
+    }
+    print("encode")
+    for name, paths in cases.items():
+        for path, run in paths.items():
+            per_read = await timed(args.reads, run)
+            size = len(await run())
+            print(f"  {name:<13} {path:<7} {per_read * 1000:8.2f} ms  {size / 1024:8.1f} KiB")
+
+
+async def request(args: argparse.Namespace) -> None:
+    import httpx
+
+    from app.main import app
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    targets = {
+        "ohlc rows": ("/ohlc", {"ticker": "BENCH", "limit": args.bars}),
+        "ohlc columns": ("/ohlc", {"ticker": "BENCH", "limit": args.bars, "format": "columns"}),
+        "analyses": (
+            "/analyses",
+            {"ticker": "BENCH", "limit": args.analyses, "include_summary": "true"},
+        ),
+    }
+    print("request")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, (path, params) in targets.items():
+            for coding in ("identity", "gzip", "br"):
+
+                async def send(path=path, params=params, coding=coding) -> httpx.Response:
+                    headers = {"Accept-Encoding": coding}
+                    response = await client.get(path, params=params, headers=headers)
+                    response.raise_for_status()
+                    return response
+
+                per_read = await timed(args.reads, send)
+                response = await send()
+                served = response.headers.get("content-encoding", "identity")
+                size = int(response.headers["content-length"])
+                print(f"  {name:<13} {served:<8} {per_read * 1000:8.2f} ms  {size / 1024:8.1f} KiB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bars", type=int, default=5000, help="one /ohlc page of this many")
+    parser.add_argument("--analyses", type=int, default=100)
+    parser.add_argument("--reads", type=int, default=50)
+    args = parser.parse_args()
+    # Sized before the app is imported so a single page holds the whole payload
+    os.environ["OHLC_PAGE_SIZE"] = str(args.bars)
+    os.environ["ANALYSES_MAX_PAGE_SIZE"] = str(args.analyses)
+
+    seed(args.bars, args.analyses)
+    asyncio.run(encode(args))
+    asyncio.run(request(args))
+
+
+if __name__ == "__main__":
+    main()
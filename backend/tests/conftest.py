@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+for key in ("SUPABASE_URL", "SUPABASE_SERVICE_KEY", "SUPABASE_DB_URL", "GEMINI_API_KEY"):
+    os.environ.setdefault(key, "test")
+
+from app.ingestion.csv_parser import parse_csv_bytes  # noqa: E402
+
+CSV_HEADER = "Date,Open,High,Low,Close,Volume\n"
+
+
+@pytest.fixture
+def ohlc_csv():
+    """``ohlc_csv(*days, close=...)`` builds an EOD CSV upload with one bar per day.
+
+    Days are days of January 2024 or ISO dates. Each bar closes at ``close``, or at
+    its day of the month when ``close`` is left out.
+    """
+
+    def build(*days: int | str, close: float = 0.0) -> bytes:
+        dates = [day if isinstance(day, str) else f"2024-01-{day:02d}" for day in days]
+        rows = "".join(f"{day},10,11,9,{close or int(day[-2:])},1000\n" for day in dates)
+        return (CSV_HEADER + rows).encode()
+
+    return build
+
+
+@pytest.fixture
+def ohlc_frame(ohlc_csv):
+    """``ohlc_frame(*days, close=...)``: the ``ohlc_csv`` upload as the parser returns it."""
+    return lambda *days, close=0.0: parse_csv_bytes(ohlc_csv(*days, close=close))
@@ -1,5 +1,10 @@
+import asyncio
+
+import httpx
 import pandas as pd
 
+from app.api.routes import analyze
+from app.main import app
 from app.services.indicators import compute_macd, compute_rsi
 
 
@@ -9,3 +14,28 @@ def test_indicators_compute():
     macd = compute_macd(close)
     assert len(rsi) == len(close)
     assert len(macd) == len(close)
+
+
+def test_reused_run_id_with_other_dates_starts_a_new_thread(monkeypatch):
+    threads = []
+
+    async def run_graph_async(state, thread_id):
+        threads.append(thread_id)
+        return {"indicators": {}, "final_report": "", "analysis_id": ""}
+
+    monkeypatch.setattr(analyze, "run_graph_async", run_graph_async)
+
+    async def post(end_date):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            body = {
+                "tickers": ["AAA"],
+                "start_date": "2024-01-01",
+                "end_date": end_date,
+                "run_id": "run-1",
+            }
+            return await client.post("/analyze", json=body)
+
+    for end_date in ("2024-01-31", "2024-01-31", "2024-02-29"):
+        assert asyncio.run(post(end_date)).status_code == 200
+    assert threads[0] == threads[1] != threads[2]
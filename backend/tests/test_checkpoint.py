@@ -0,0 +1,69 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from app.agents import checkpoint, graph
+from app.agents.checkpoint import StateSerializer
+from app.core.config import settings
+
+
+@pytest.fixture
+def checkpointer(monkeypatch):
+    monkeypatch.setattr(settings, "graph_checkpoint_path", ":memory:")
+    monkeypatch.setattr(checkpoint, "_checkpointer", None)
+    yield
+    checkpoint._checkpointer = None
+
+
+def test_serializer_round_trips_ohlc_frame():
+    df = pd.DataFrame(
+        {"date": [date(2024, 1, 1), date(2024, 1, 2)], "close": [10.0, 10.5], "volume": [1, 2]}
+    )
+    serde = StateSerializer()
+    restored = serde.loads(serde.dumps({"ohlc_df": df, "end": date(2024, 1, 2)}))
+    pd.testing.assert_frame_equal(restored["ohlc_df"], df[["close", "volume", "date"]])
+    assert restored["end"] == date(2024, 1, 2)
+
+
+def test_failed_run_resumes_without_repeating_completed_nodes(checkpointer, monkeypatch):
+    calls = {"fetch": 0, "research": 0, "store": 0}
+
+    def fetch(state):
+        calls["fetch"] += 1
+        return {"ohlc_df": pd.DataFrame({"date": [date(2024, 1, 1)], "close": [1.0]})}
+
+    def analyst(state):
+        state["indicators"] = {"rsi": 50.0, "macd": 0.0, "hist": 0.0, "signal": "neutral"}
+        state["ohlc_df"] = None
+        return state
+
+    def research(state):
+        calls["research"] += 1
+        state["final_report"] = "thesis"
+        return state
+
+    def store(state):
+        calls["store"] += 1
+        if calls["store"] == 1:
+            raise RuntimeError("insert failed")
+        return {"analysis_id": "analysis"}
+
+    monkeypatch.setattr(graph, "resolve_stock", lambda state: {"stock_id": "stock"})
+    monkeypatch.setattr(graph, "load_ohlc", fetch)
+    monkeypatch.setattr(graph, "run_data_analyst", analyst)
+    monkeypatch.setattr(graph, "run_research_agent", research)
+    monkeypatch.setattr(graph, "store_results", store)
+    monkeypatch.setattr(graph, "index_embedding", lambda state: {"embedding_status": "queued"})
+
+    initial = {"ticker": "AAA", "start_date": "2024-01-01", "end_date": "2024-01-31"}
+    with pytest.raises(RuntimeError):
+        graph.run_graph(dict(initial), thread_id="run-1:AAA")
+
+    result = graph.run_graph(dict(initial), thread_id="run-1:AAA")
+    assert result["analysis_id"] == "analysis"
+    assert calls == {"fetch": 1, "research": 1, "store": 2}
+
+    # A finished run hands back its stored result
+    assert graph.run_graph(dict(initial), thread_id="run-1:AAA")["final_report"] == "thesis"
+    assert calls["research"] == 1
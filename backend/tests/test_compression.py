@@ -0,0 +1,124 @@
+import asyncio
+import gzip
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import StreamingResponse
+from starlette.routing import Route
+
+from app.api.routes import stocks
+from app.core.compression import SUPPORTED, CompressionMiddleware, negotiate
+from app.db.memory import AsyncMemorySupabase, MemorySupabase
+from app.db.repository import SupabaseRepository
+from app.ingestion.loader import load_ohlc_data
+from app.main import app
+from app.schemas.responses import AnalysisHistoryResponse, OhlcColumnsResponse, OhlcDataResponse
+from app.services.data_versions import last_writes
+from app.services.read_cache import read_cache
+
+
+@pytest.fixture
+def repo(monkeypatch, ohlc_frame):
+    db = MemorySupabase()
+    repo = SupabaseRepository(db, AsyncMemorySupabase(db))
+    monkeypatch.setattr(stocks, "get_repository", lambda: repo)
+    read_cache.clear()
+    last_writes.clear()
+    days = [f"2024-{month:02d}-{day:02d}" for month in (1, 2) for day in range(1, 29)]
+    load_ohlc_data(repo, "AAA", ohlc_frame(*days), "a")
+    repo.insert_analysis(
+        {
+            "stock_id": repo.find_stock_id("AAA"),
+            "date_range_start": "2024-01-01",
+            "date_range_end": "2024-02-28",
+            "rsi": 55.5,
+            "macd": 0.25,
+            "hist": 0.1,
+            "signal": "bullish",
+            "summary": "thesis",
+            "created_at": "2024-03-01T00:00:00",
+        }
+    )
+    return repo
+
+
+def get(target, path, headers=None, **params):
+    async def send():
+        transport = httpx.ASGITransport(app=target)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path, headers=headers, params=params)
+
+    return asyncio.run(send())
+
+
+def test_negotiates_highest_q_value():
+    assert negotiate("gzip, deflate, br") == "br"
+    assert negotiate("br;q=0.5, gzip") == "gzip"
+    assert negotiate("br;q=0, *;q=0.1") == "gzip"
+    assert negotiate("deflate, identity") is None
+    assert negotiate("br, gzip", supported=("gzip",)) == "gzip"
+
+
+@pytest.mark.parametrize(
+    "coding",
+    ["gzip", pytest.param("br", marks=pytest.mark.skipif("br" not in SUPPORTED, reason="brotli"))],
+)
+def test_large_bodies_are_compressed_and_match_the_models(repo, coding):
+    response = get(app, "/ohlc", {"Accept-Encoding": coding}, ticker="AAA")
+    assert response.headers["content-encoding"] == coding
+    assert response.headers["vary"] == "Accept-Encoding"
+    body = response.json()
+    # Served without the models, but still exactly their shape
+    assert OhlcDataResponse.model_validate(body).model_dump() == body
+    assert body["data"][0] == {
+        "date": "2024-01-01",
+        "open": 10.0,
+        "high": 11.0,
+        "low": 9.0,
+        "close": 1.0,
+        "volume": 1000,
+    }
+
+    columns = get(app, "/ohlc", {"Accept-Encoding": coding}, ticker="AAA", format="columns")
+    assert OhlcColumnsResponse.model_validate(columns.json()).model_dump() == columns.json()
+    assert columns.json()["close"] == [row["close"] for row in body["data"]]
+
+
+def test_small_unaccepted_and_not_modified_bodies_pass_through(repo):
+    small = get(app, "/ohlc", {"Accept-Encoding": "gzip"}, ticker="AAA", limit=2)
+    assert "content-encoding" not in small.headers
+    assert int(small.headers["content-length"]) == len(small.content)
+
+    identity = get(app, "/ohlc", {"Accept-Encoding": "identity"}, ticker="AAA")
+    assert "content-encoding" not in identity.headers
+    assert identity.headers["vary"] == "Accept-Encoding"
+
+    etag = identity.headers["etag"]
+    cached = get(app, "/ohlc", {"Accept-Encoding": "gzip", "If-None-Match": etag}, ticker="AAA")
+    assert cached.status_code == 304
+    assert "content-encoding" not in cached.headers
+
+    analyses = get(app, "/analyses", {"Accept-Encoding": "gzip"}, ticker="AAA").json()
+    assert AnalysisHistoryResponse.model_validate(analyses).model_dump() == analyses
+    assert analyses["analyses"][0]["summary"] is None
+
+
+def test_streamed_bodies_are_compressed_chunk_by_chunk():
+    async def chunks():
+        for i in range(3):
+            yield f"chunk {i}\n".encode()
+
+    inner = Starlette(routes=[Route("/", lambda request: StreamingResponse(chunks()))])
+    target = CompressionMiddleware(inner, minimum_size=1024)
+
+    async def send():
+        transport = httpx.ASGITransport(app=target)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            async with client.stream("GET", "/", headers={"Accept-Encoding": "gzip"}) as response:
+                return response.headers, b"".join([part async for part in response.aiter_raw()])
+
+    headers, raw = asyncio.run(send())
+    assert headers["content-encoding"] == "gzip"
+    assert "content-length" not in headers
+    assert gzip.decompress(raw) == b"chunk 0\nchunk 1\nchunk 2\n"
@@ -0,0 +1,47 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.db import client
+
+
+@pytest.fixture
+def supabase_backend(monkeypatch):
+    monkeypatch.setattr(settings, "database_backend", "supabase")
+    monkeypatch.setattr(settings, "supabase_url", "http://localhost:54321")
+    yield
+    client.close_clients()
+
+
+def test_supabase_client_is_shared_and_pooled(supabase_backend):
+    first = client.get_supabase_client()
+    assert client.get_supabase_client() is first
+    assert first.postgrest.session is client._http_client
+
+    stats = client.pool_stats()["supabase_http"]
+    assert stats["max_connections"] == settings.supabase_max_connections
+    assert stats["connections"] == 0
+
+    client.close_clients()
+    assert client.get_supabase_client() is not first
+
+
+def test_pool_stats_survive_a_transport_without_a_pool(supabase_backend):
+    http = httpx.Client(transport=httpx.MockTransport(lambda request: None))
+    stats = client._http_pool_stats(http)
+    assert stats["connections"] == stats["idle"] == "unknown"
+    http.close()
+
+
+def test_async_supabase_client_is_shared_and_pooled(supabase_backend):
+    async def check():
+        first = await client.get_async_supabase_client()
+        assert await client.get_async_supabase_client() is first
+        assert first.postgrest.session is client._async_http_client
+        assert client.pool_stats()["supabase_http_async"]["connections"] == 0
+        await client.close_clients_async()
+        assert client._async_supabase is None
+
+    asyncio.run(check())
@@ -0,0 +1,40 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+from app.services.downsampling import bucket_ohlc, lttb
+
+
+def make_columns(size: int):
+    dates = [(date(2000, 1, 1) + timedelta(days=i)).isoformat() for i in range(size)]
+    close = 100 + np.sin(np.arange(size) / 7) * 10
+    return {
+        "date": np.array(dates, dtype="U10"),
+        "open": close - 1,
+        "high": close + 2,
+        "low": close - 2,
+        "close": close,
+        "volume": np.full(size, 10, dtype=np.int64),
+    }
+
+
+def test_bucket_ohlc_keeps_range_extremes_and_volume():
+    columns = make_columns(1000)
+    buckets = bucket_ohlc(columns, 100)
+    assert len(buckets["date"]) == 100
+    assert buckets["date"][0] == "2000-01-01"
+    assert buckets["open"][0] == columns["open"][0]
+    assert buckets["close"][-1] == columns["close"][-1]
+    assert buckets["high"].max() == columns["high"].max()
+    assert buckets["low"].min() == columns["low"].min()
+    assert buckets["volume"].sum() == columns["volume"].sum()
+
+
+def test_lttb_picks_ordered_bars_including_endpoints():
+    columns = make_columns(1000)
+    picked = lttb(columns, 50)
+    assert len(picked["date"]) == 50
+    assert picked["date"][0] == columns["date"][0]
+    assert picked["date"][-1] == columns["date"][-1]
+    assert list(picked["date"]) == sorted(picked["date"])
+    assert bucket_ohlc(columns, 5000) is columns
@@ -0,0 +1,53 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from app.agents.tools import store_embeddings
+from app.core.config import settings
+from app.services.embedding_batcher import EmbeddingBatcher
+
+
+def test_concurrent_submissions_share_batches():
+    embed_calls = []
+    written = []
+
+    def embed(texts):
+        embed_calls.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+    batcher = EmbeddingBatcher(embed, written.extend, max_batch_size=8, max_wait=0.2)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = list(pool.map(lambda i: batcher.submit(f"a{i}", "x" * i), range(8)))
+    results = [future.result(timeout=5) for future in futures]
+
+    assert results == [[float(i)] for i in range(8)]
+    assert len(embed_calls) < 8
+    assert sorted(written) == sorted((f"a{i}", [float(i)]) for i in range(8))
+
+
+def test_batch_failure_propagates_to_every_caller():
+    def embed(texts):
+        raise RuntimeError("quota")
+
+    batcher = EmbeddingBatcher(embed, lambda items: None, max_batch_size=4, max_wait=0.01)
+    future = batcher.submit("a1", "text")
+    assert isinstance(future.exception(timeout=5), RuntimeError)
+
+
+def test_stored_embeddings_record_the_configured_model(monkeypatch):
+    monkeypatch.setattr(settings, "gemini_embedding_model", "models/test-embedding")
+    executed = []
+
+    class Connection:
+        @contextmanager
+        def cursor(self):
+            yield self
+
+        def execute(self, sql, params):
+            executed.append(params)
+
+        def commit(self):
+            pass
+
+    store_embeddings(Connection(), [("a1", [1.0]), ("a2", [2.0])])
+    model = "models/test-embedding"
+    assert executed == [["a1", [1.0], model, "a2", [2.0], model]]
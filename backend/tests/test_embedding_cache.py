@@ -0,0 +1,35 @@
+from app.core.metrics import metrics
+from app.services import embeddings
+from app.services.embedding_cache import EmbeddingCache, content_hash
+
+
+def test_content_hash_ignores_whitespace_layout():
+    assert content_hash("Buy  the\ndip.") == content_hash(" Buy the dip. ")
+    assert content_hash("Buy the dip.") != content_hash("Sell the rip.")
+
+
+def test_memory_tier_is_bounded_lru():
+    cache = EmbeddingCache(max_entries=2, persistent=False)
+    cache.put_many("m", ["a", "b"], [[1.0], [2.0]])
+    cache.get_many(["a"], ["m"])
+    cache.put_many("m", ["c"], [[3.0]])
+
+    found = cache.get_many(["a", "b", "c"], ["m"])
+    assert found == {0: [1.0], 2: [3.0]}
+
+
+def test_cache_hit_skips_gemini(monkeypatch):
+    calls = []
+
+    def fake_embed(texts):
+        calls.append(list(texts))
+        return "m", [[float(len(text))] for text in texts]
+
+    monkeypatch.setattr(embeddings, "embedding_cache", EmbeddingCache(16, persistent=False))
+    monkeypatch.setattr(embeddings, "_embed_texts_with_model", fake_embed)
+    monkeypatch.setattr(embeddings.settings, "gemini_embedding_models", ["m"])
+
+    assert embeddings.embed_texts(["one", "three"]) == [[3.0], [5.0]]
+    assert embeddings.embed_texts(["three", "fifteen"]) == [[5.0], [7.0]]
+    assert calls == [["one", "three"], ["fifteen"]]
+    assert "embedding_cache_hit_ratio" in metrics.render_prometheus()
@@ -1,4 +1,49 @@
+import asyncio
+import sys
+import time
+from datetime import date
+
+import httpx
+import pytest
+
+from app.api.routes import ingest, stocks
+from app.api.routes.stocks import ARROW_MEDIA_TYPE
+from app.core.config import settings
+from app.db.memory import AsyncMemorySupabase, MemorySupabase
+from app.db.repository import OHLC_COLUMNS, SupabaseRepository
 from app.ingestion.csv_parser import parse_csv_bytes
+from app.ingestion.loader import load_ohlc_data
+from app.main import app
+from app.services.data_versions import last_writes
+from app.services.read_cache import read_cache
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = MemorySupabase()
+    repo = SupabaseRepository(db, AsyncMemorySupabase(db))
+    monkeypatch.setattr(stocks, "get_repository", lambda: repo)
+    monkeypatch.setattr(ingest, "get_repository", lambda: repo)
+    read_cache.clear()
+    last_writes.clear()
+    return db
+
+
+def request(method, path, headers=None, **kwargs):
+    async def send():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.request(method, path, headers=headers, **kwargs)
+
+    return asyncio.run(send())
+
+
+def get(path, headers=None, **params):
+    return request("GET", path, headers, params=params)
+
+
+def load(db, ticker: str, content: bytes, source_hash: str):
+    return load_ohlc_data(SupabaseRepository(db), ticker, parse_csv_bytes(content), source_hash)
 
 
 def test_parse_csv_bytes():
@@ -6,3 +51,246 @@ def test_parse_csv_bytes():
     df = parse_csv_bytes(sample)
     assert df.shape[0] == 1
     assert df.loc[0, "close"] == 10.5
+
+
+def test_stocks_lists_coverage_maintained_by_loader(db, ohlc_csv):
+    files = {"files": ("BBB_EOD.csv", ohlc_csv(2, 3), "text/csv")}
+    assert request("POST", "/ingest", files=files).json() == [{"ticker": "BBB", "rows": 2}]
+    load(db, "AAA", ohlc_csv(2, 3), "b")
+    # Overlapping re-ingest extends the range without double counting
+    load(db, "AAA", ohlc_csv(2, 3, 4), "c")
+
+    stocks = get("/stocks").json()["stocks"]
+    assert [(s["ticker"], s["min_date"], s["max_date"], s["row_count"]) for s in stocks] == [
+        ("AAA", "2024-01-02", "2024-01-04", 3),
+        ("BBB", "2024-01-02", "2024-01-03", 2),
+    ]
+    # Provenance lives on the coverage row; bars carry only the key and prices
+    hashes = {row["ticker"]: row["last_source_file_hash"] for row in db.tables["stock_coverage"]}
+    assert hashes["AAA"] == "c"
+    assert set(db.tables["ohlc_daily"][0]) == {"stock_id", *OHLC_COLUMNS}
+
+
+def test_ohlc_pages_by_date_in_columnar_format(db, ohlc_csv):
+    load(db, "AAA", ohlc_csv(1, 2, 3, 4, 5), "a")
+
+    closes, params = [], {"ticker": "AAA", "format": "columns", "limit": 2}
+    for _ in range(3):
+        body = get("/ohlc", **params).json()
+        closes += body["close"]
+        params["after"] = body["next_cursor"]
+    assert closes == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert body["next_cursor"] is None
+    assert body["date"] == ["2024-01-05"]
+
+
+def test_uncached_ohlc_pages_read_only_the_page(db, monkeypatch, ohlc_csv):
+    load(db, "AAA", ohlc_csv(1, 2, 3, 4, 5), "a")
+    monkeypatch.setattr(read_cache, "enabled", False)
+    monkeypatch.setattr(settings, "ohlc_page_size", 2)  # PostgREST pages smaller than a request
+    requested = []
+    original = SupabaseRepository.ohlc_columns_async
+
+    async def ohlc_columns_async(self, stock_id, start_date, end_date, after, limit):
+        requested.append((after, limit))
+        return await original(self, stock_id, start_date, end_date, after, limit)
+
+    monkeypatch.setattr(SupabaseRepository, "ohlc_columns_async", ohlc_columns_async)
+    first = get("/ohlc", ticker="AAA", limit=2).json()
+    second = get("/ohlc", ticker="AAA", limit=2, after=first["next_cursor"]).json()
+    assert [bar["close"] for bar in first["data"] + second["data"]] == [1.0, 2.0, 3.0, 4.0]
+    assert second["next_cursor"] == "2024-01-04"
+    assert requested == [(None, 3), ("2024-01-02", 3)]
+
+    downsampled = get("/ohlc", ticker="AAA", max_points=3).json()
+    assert downsampled["next_cursor"] is None
+    assert requested[-1] == (None, None)
+
+
+def test_ohlc_arrow_stream_carries_the_cursor_in_a_header(db, ohlc_csv):
+    pa = pytest.importorskip("pyarrow")
+    load(db, "AAA", ohlc_csv(1, 2, 3), "a")
+
+    response = get("/ohlc", ticker="AAA", format="arrow", limit=2)
+    assert response.headers["content-type"] == ARROW_MEDIA_TYPE
+    assert response.headers["x-next-cursor"] == "2024-01-02"
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.column_names == list(OHLC_COLUMNS)
+    assert table["date"].to_pylist() == [date(2024, 1, 1), date(2024, 1, 2)]
+    assert table["close"].to_pylist() == [1.0, 2.0]
+
+    last = get("/ohlc", ticker="AAA", format="arrow", after="2024-01-02")
+    assert "x-next-cursor" not in last.headers
+    assert pa.ipc.open_stream(last.content).read_all().num_rows == 1
+
+
+def test_ohlc_arrow_without_pyarrow_is_not_implemented(db, monkeypatch, ohlc_csv):
+    load(db, "AAA", ohlc_csv(1), "a")
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    assert get("/ohlc", ticker="AAA", format="arrow").status_code == 501
+
+
+def test_concurrent_requests_overlap_database_round_trips(db, monkeypatch, ohlc_csv):
+    load(db, "AAA", ohlc_csv(1, 2), "a")
+    monkeypatch.setattr(read_cache, "enabled", False)
+    db.latency = 0.05
+
+    async def burst():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            started = time.perf_counter()
+            responses = await asyncio.gather(*(client.get("/stocks") for _ in range(10)))
+            return time.perf_counter() - started, responses
+
+    elapsed, responses = asyncio.run(burst())
+    assert all(response.status_code == 200 for response in responses)
+    # Ten one-query requests would take 0.5s if each blocked the event loop
+    assert elapsed < 0.25
+
+
+def test_ohlc_revalidates_against_persisted_coverage(db, ohlc_csv):
+    load(db, "AAA", ohlc_csv(1, 2), "a")
+    first = get("/ohlc", ticker="AAA")
+    etag = first.headers["etag"]
+    assert first.headers["last-modified"]
+
+    db.tables["ohlc_daily"].clear()  # a 304 reads the coverage row, never the bars
+    assert get("/ohlc", {"If-None-Match": etag}, ticker="AAA").status_code == 304
+    assert get("/ohlc", {"If-None-Match": etag}, ticker="AAA", limit=1).status_code == 200
+
+    # Written by another worker: no in-process write counter sees it, so revalidations
+    # keep the reused lookup until it expires
+    other = SupabaseRepository(db)
+    other.upsert_ohlc(other.find_stock_id("AAA"), parse_csv_bytes(ohlc_csv(1, 2, 3)), "b")
+    assert get("/ohlc", {"If-None-Match": etag}, ticker="AAA").status_code == 304
+    last_writes.clear()
+    fresh = get("/ohlc", {"If-None-Match": etag}, ticker="AAA")
+    assert fresh.status_code == 200
+    assert fresh.headers["etag"] != etag
+    assert len(fresh.json()["data"]) == 3
+
+
+def test_revalidation_reuses_the_write_lookup_until_a_local_write(db, monkeypatch, ohlc_csv):
+    load(db, "AAA", ohlc_csv(1, 2), "a")
+    etag = get("/stocks").headers["etag"]
+    lookups = []
+    last_ingest_async = SupabaseRepository.last_ingest_async
+
+    async def counted(self, ticker):
+        lookups.append(ticker)
+        return await last_ingest_async(self, ticker)
+
+    monkeypatch.setattr(SupabaseRepository, "last_ingest_async", counted)
+    for _ in range(3):
+        assert get("/stocks", {"If-None-Match": etag}).status_code == 304
+    assert lookups == []
+
+    load(db, "AAA", ohlc_csv(1, 2, 3), "b")
+    fresh = get("/stocks", {"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["etag"] != etag
+    assert lookups == [None]
+
+
+def test_analyses_revalidate_against_the_newest_stored_analysis(db, ohlc_csv):
+    load(db, "AAA", ohlc_csv(1), "a")
+    stock_id = db.tables["stocks"][0]["id"]
+
+    def insert(end: str, created_at: str):
+        row = {
+            "stock_id": stock_id,
+            "date_range_start": "2024-01-01",
+            "date_range_end": end,
+            "rsi": 50.0,
+            "macd": 0.1,
+            "signal": "neutral",
+            "summary": "thesis",
+            "created_at": created_at,
+        }
+        # Straight to the table, as a worker in another process would
+        db.table("analyses").insert(row).execute()
+
+    insert("2024-01-01", "2024-02-01T00:00:00")
+    first = get("/analyses", ticker="AAA")
+    latest = get("/analyses/latest")
+    etag = first.headers["etag"]
+    assert first.headers["last-modified"] == "Thu, 01 Feb 2024 00:00:00 GMT"
+    assert get("/analyses", {"If-None-Match": etag}, ticker="AAA").status_code == 304
+
+    insert("2024-01-02", "2024-02-02T00:00:00")
+    last_writes.clear()
+    fresh = get("/analyses", {"If-None-Match": etag}, ticker="AAA")
+    assert fresh.status_code == 200
+    assert [row["date_range_end"] for row in fresh.json()["analyses"]] == [
+        "2024-01-02",
+        "2024-01-01",
+    ]
+    fresh_latest = get("/analyses/latest", {"If-None-Match": latest.headers["etag"]})
+    assert fresh_latest.json()["analyses"][0]["date_range_end"] == "2024-01-02"
+    assert get("/analyses", ticker="BBB").headers["etag"] != etag
+
+
+def test_analyses_page_without_summary_and_load_thesis_by_id(db, ohlc_csv):
+    load(db, "AAA", ohlc_csv(1), "a")
+    stock_id = db.tables["stocks"][0]["id"]
+    for i in range(5):
+        db.table("analyses").insert(
+            {
+                "stock_id": stock_id,
+                "date_range_start": "2024-01-01",
+                "date_range_end": f"2024-01-0{i + 1}",
+                "rsi": 50.0,
+                "macd": 0.1,
+                "signal": "neutral",
+                "summary": f"thesis {i}",
+                "created_at": f"2024-02-0{i + 1}T00:00:00",
+            }
+        ).execute()
+
+    ends, params = [], {"ticker": "AAA", "limit": 2}
+    for _ in range(3):
+        body = get("/analyses", **params).json()
+        assert all(analysis["summary"] is None for analysis in body["analyses"])
+        ends += [analysis["date_range_end"] for analysis in body["analyses"]]
+        params["before"] = body["next_cursor"]
+    assert ends == [f"2024-01-0{day}" for day in (5, 4, 3, 2, 1)]
+    assert body["next_cursor"] is None
+
+    assert get("/analyses", ticker="AAA", before='2024"),id.gt.(0').status_code == 422
+
+    analysis_id = body["analyses"][0]["id"]
+    assert get(f"/analyses/{analysis_id}").json()["summary"] == "thesis 0"
+    assert get("/analyses/not-a-uuid").status_code == 404
+
+
+def test_latest_analyses_returns_the_newest_of_each_ticker(db, ohlc_csv):
+    for ticker in ("CCC", "AAA", "BBB"):
+        load(db, ticker, ohlc_csv(1), ticker)
+    stock_ids = {row["ticker"]: row["id"] for row in db.tables["stocks"]}
+    created = {"AAA": (3, 1, 2), "BBB": (1, 2), "CCC": ()}
+    for ticker, days in created.items():
+        for day in days:
+            db.table("analyses").insert(
+                {
+                    "stock_id": stock_ids[ticker],
+                    "date_range_start": "2024-01-01",
+                    "date_range_end": f"2024-01-0{day}",
+                    "rsi": 50.0,
+                    "macd": 0.1,
+                    "signal": "neutral",
+                    "summary": f"{ticker} thesis {day}",
+                    "created_at": f"2024-02-0{day}T00:00:00",
+                }
+            ).execute()
+
+    latest = get("/analyses/latest").json()["analyses"]
+    # Ordered by ticker, one row each, without tickers that have no analysis
+    assert [(row["ticker"], row["date_range_end"]) for row in latest] == [
+        ("AAA", "2024-01-03"),
+        ("BBB", "2024-01-02"),
+    ]
+    assert all("summary" not in row for row in latest)
+
+    subset = get("/analyses/latest", tickers="BBB, CCC,ZZZ").json()["analyses"]
+    assert [(row["ticker"], row["date_range_end"]) for row in subset] == [("BBB", "2024-01-02")]
+    assert get("/analyses/latest", tickers="ZZZ").json()["analyses"] == []
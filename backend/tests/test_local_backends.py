@@ -0,0 +1,51 @@
+import pytest
+from postgrest.exceptions import APIError
+
+from app.core.config import settings
+from app.db.memory import MemorySupabase
+from app.services import fake_gemini, gemini_client
+
+
+def test_memory_db_filters_orders_and_upserts():
+    db = MemorySupabase()
+    stock = db.table("stocks").insert({"ticker": "AAA"}).execute().data[0]
+    rows = [
+        {"stock_id": stock["id"], "date": f"2024-01-0{day}", "close": float(day)}
+        for day in (3, 1, 2)
+    ]
+    db.table("ohlc_daily").upsert(rows, on_conflict="stock_id,date").execute()
+    db.table("ohlc_daily").upsert(
+        {"stock_id": stock["id"], "date": "2024-01-02", "close": 20.0},
+        on_conflict="stock_id,date",
+    ).execute()
+
+    result = (
+        db.table("ohlc_daily")
+        .select("date,close")
+        .eq("stock_id", stock["id"])
+        .gte("date", "2024-01-02")
+        .order("date", desc=True)
+        .execute()
+    )
+    assert result.data == [
+        {"date": "2024-01-03", "close": 3.0},
+        {"date": "2024-01-02", "close": 20.0},
+    ]
+    with pytest.raises(APIError):
+        db.table("stocks").insert({"ticker": "AAA"}).execute()
+
+
+def test_fake_gemini_is_deterministic_and_retries_429(monkeypatch):
+    monkeypatch.setattr(settings, "gemini_backend", "fake")
+    monkeypatch.setattr(settings, "gemini_rate_limit_enabled", False)
+    monkeypatch.setattr(settings, "gemini_retry_base_delay", 0.0)
+    monkeypatch.setattr(settings, "fake_gemini_latency_ms", 0.0)
+    monkeypatch.setattr(settings, "fake_gemini_jitter_ms", 0.0)
+
+    assert gemini_client.generate_text("prompt") == fake_gemini.fake_text("prompt")
+    assert fake_gemini.fake_embedding("a") == fake_gemini.fake_embedding("a")
+
+    calls = iter([True, False])
+    monkeypatch.setattr(fake_gemini._rng, "random", lambda: 0.0 if next(calls) else 1.0)
+    monkeypatch.setattr(settings, "fake_gemini_rate_limit_rate", 0.5)
+    assert gemini_client.generate_text("prompt") == fake_gemini.fake_text("prompt")
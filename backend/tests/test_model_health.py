@@ -0,0 +1,21 @@
+from app.services.model_health import ModelHealthRegistry
+
+
+def test_rate_limits_open_circuit_and_reorder_models():
+    registry = ModelHealthRegistry(failure_threshold=2, cooldown_seconds=60)
+    models = ["primary", "secondary"]
+
+    assert registry.record_rate_limit("primary", RuntimeError("429")) is False
+    assert registry.ordered(models) == models
+
+    assert registry.record_rate_limit("primary", RuntimeError("429")) is True
+    assert registry.is_open("primary")
+    assert registry.ordered(models) == ["secondary", "primary"]
+
+
+def test_success_closes_circuit():
+    registry = ModelHealthRegistry(failure_threshold=1, cooldown_seconds=60)
+    registry.record_rate_limit("primary", RuntimeError("429"))
+    registry.record_success("primary", latency=0.5)
+    assert not registry.is_open("primary")
+    assert registry.snapshot()[0]["latency_ewma"] == 0.5
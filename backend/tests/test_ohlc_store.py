@@ -0,0 +1,110 @@
+import asyncio
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.agents import tools
+from app.db.memory import AsyncMemorySupabase, MemorySupabase
+from app.db.repository import SupabaseRepository
+from app.ingestion import loader
+from app.ingestion.loader import load_ohlc_data
+from app.services.data_versions import last_writes
+from app.services.ohlc_store import OhlcStore
+from app.services.read_cache import read_cache
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = OhlcStore(enabled=True, root=str(tmp_path / "ohlc"), refresh_seconds=300.0)
+    monkeypatch.setattr(tools, "ohlc_store", store)
+    monkeypatch.setattr(loader, "ohlc_store", store)
+    read_cache.clear()
+    last_writes.clear()
+    return store
+
+
+@pytest.fixture
+def repo():
+    db = MemorySupabase()
+    return SupabaseRepository(db, AsyncMemorySupabase(db))
+
+
+def record_starts(repo, monkeypatch):
+    """Start dates of every OHLC range the repository is asked for."""
+    starts = []
+    original = repo.ohlc_columns
+
+    def ohlc_columns(stock_id, start_date=None, end_date=None):
+        starts.append(start_date)
+        return original(stock_id, start_date, end_date)
+
+    monkeypatch.setattr(repo, "ohlc_columns", ohlc_columns)
+    return starts
+
+
+def test_fills_once_then_serves_memory_mapped_columns(store, repo, monkeypatch, ohlc_frame):
+    load_ohlc_data(repo, "AAA", ohlc_frame(1, 2, 3), "a")
+    starts = record_starts(repo, monkeypatch)
+
+    first = tools.ohlc_columns(repo, "AAA")
+    again = tools.ohlc_columns(repo, "AAA", "2024-01-02")
+    assert starts == [None]
+    assert isinstance(again["close"], np.memmap)
+    assert again["date"].tolist() == ["2024-01-01", "2024-01-02", "2024-01-03"]
+    assert first["close"].tolist() == again["close"].tolist() == [1.0, 2.0, 3.0]
+    assert tools.fetch_ohlc(repo, "AAA", "2024-01-02", "2024-01-03")["close"].tolist() == [2.0, 3.0]
+    assert tools.ohlc_columns(repo, "ZZZ") is None
+
+
+def test_ingest_appends_past_high_water_mark_and_drops_on_rewrite(store, repo, ohlc_frame):
+    load_ohlc_data(repo, "AAA", ohlc_frame(1, 2), "a")
+    tools.ohlc_columns(repo, "AAA")
+    generation = store._read("AAA", store._dir("AAA")).meta["generation"]
+
+    load_ohlc_data(repo, "AAA", ohlc_frame(4, 3), "b")
+    appended = store._read("AAA", store._dir("AAA"))
+    assert appended.meta["generation"] == generation
+    assert appended.columns["date"].tolist()[-2:] == ["2024-01-03", "2024-01-04"]
+
+    # Overlapping dates would need rows rewritten in place, so the ticker is refilled
+    load_ohlc_data(repo, "AAA", ohlc_frame(2, close=7.5), "c")
+    assert store._read("AAA", store._dir("AAA")) is None
+    assert tools.ohlc_columns(repo, "AAA")["close"].tolist() == [1.0, 7.5, 3.0, 4.0]
+
+
+def test_stale_ticker_fetches_only_newer_bars(store, repo, monkeypatch, ohlc_frame):
+    stock_id = repo.get_or_create_stock("AAA")["id"]
+    repo.upsert_ohlc(stock_id, ohlc_frame(1, 2), "a")
+    tools.ohlc_columns(repo, "AAA")
+    # Written by another host, so this store never saw the ingest
+    repo.upsert_ohlc(stock_id, ohlc_frame(3), "b")
+    assert tools.ohlc_columns(repo, "AAA")["date"].tolist()[-1] == "2024-01-02"
+
+    monkeypatch.setattr(store, "refresh_seconds", 0.0)
+    starts = record_starts(repo, monkeypatch)
+    assert tools.ohlc_columns(repo, "AAA")["close"].tolist() == [1.0, 2.0, 3.0]
+    assert starts == ["2024-01-03"]
+
+
+def test_a_new_stamp_refills_before_the_refresh_interval(store, repo, ohlc_frame):
+    stock_id = repo.get_or_create_stock("AAA")["id"]
+    repo.upsert_ohlc(stock_id, ohlc_frame(1, 2), "a")
+    asyncio.run(tools.ohlc_columns_async(repo, "AAA", stamp="first"))
+    # Another host appends a bar and corrects one this store already holds
+    repo.upsert_ohlc(stock_id, ohlc_frame(2, 3, close=7.5), "b")
+
+    same = asyncio.run(tools.ohlc_columns_async(repo, "AAA", stamp="first"))
+    assert same["date"].tolist()[-1] == "2024-01-02"
+    # The request was validated against a newer write, so the store must catch up to it
+    newer = asyncio.run(tools.ohlc_columns_async(repo, "AAA", stamp="second"))
+    assert newer["close"].tolist() == [1.0, 7.5, 7.5]
+    assert store._read("AAA", store._dir("AAA")).meta["stamp"] == "second"
+
+
+def test_the_app_imports_without_fcntl():
+    # Windows has no fcntl; the store only needs it once enabled
+    code = "import sys; sys.modules['fcntl'] = None; import app.main"
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=Path(__file__).parents[1])
@@ -0,0 +1,18 @@
+import pytest
+
+from app.services.rate_limiter import ModelRateLimiter, TokenBucket
+
+
+def test_token_bucket_reservations_queue_in_order():
+    bucket = TokenBucket(capacity=2, refill_per_second=1)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(1.0, abs=0.05)
+    assert bucket.reserve() == pytest.approx(2.0, abs=0.05)
+
+
+def test_model_limiter_waits_on_the_tighter_bucket():
+    limiter = ModelRateLimiter(requests_per_minute=60, tokens_per_minute=600)
+    assert limiter.reserve(600) == 0
+    # One request token is left, but the token bucket needs 60s to cover 600 more
+    assert limiter.reserve(600) == pytest.approx(60.0, abs=0.5)
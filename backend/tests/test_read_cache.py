@@ -0,0 +1,42 @@
+import numpy as np
+
+from app.core.metrics import metrics
+from app.services.data_versions import ANALYSES, INGEST, data_versions
+from app.services.read_cache import ReadCache
+
+
+def test_lru_and_memory_cap_evict_oldest_entries():
+    cache = ReadCache(enabled=True, max_entries=2, max_bytes=2500, ttl_seconds=60)
+    for ticker in ("A", "B"):
+        cache.get_or_load("ohlc", ticker, lambda: np.zeros(100))
+    cache.get("ohlc", "A")
+    cache.get_or_load("ohlc", "C", lambda: np.zeros(100))
+    assert cache.get("ohlc", "B") is None
+    assert cache.get("ohlc", "A") is not None
+
+    before = metrics.counter_value("read_cache_evictions_total", resource="ohlc", reason="size")
+    cache.get_or_load("ohlc", "D", lambda: np.zeros(250))
+    assert metrics.counter_value(
+        "read_cache_evictions_total", resource="ohlc", reason="size"
+    ) == before + 1
+
+
+def test_writes_invalidate_only_affected_entries():
+    cache = ReadCache(enabled=True, max_entries=10, max_bytes=10_000, ttl_seconds=60)
+    data_versions.subscribe(cache.invalidate)
+    cache.get_or_load("ohlc", "INV", lambda: [1])
+    cache.get_or_load("analyses", "INV", lambda: [2])
+    cache.get_or_load("ohlc", "OTHER", lambda: [3])
+
+    data_versions.bump(INGEST, "INV")
+    assert cache.get("ohlc", "INV") is None
+    assert cache.get("analyses", "INV") == [2]
+    assert cache.get("ohlc", "OTHER") == [3]
+
+    # A load that raced a write is never served
+    def racing_load():
+        data_versions.bump(ANALYSES, "RACE")
+        return [4]
+
+    assert cache.get_or_load("analyses", "RACE", racing_load) == [4]
+    assert cache.get("analyses", "RACE") is None
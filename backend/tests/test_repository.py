@@ -0,0 +1,175 @@
+import asyncio
+
+import pytest
+
+from app import main
+from app.agents import graph
+from app.core.config import settings
+from app.db.memory import AsyncMemorySupabase, MemorySupabase
+from app.db.models import PENDING_EMBEDDINGS_TABLE
+from app.db.repository import SupabaseRepository, analysis_cursor
+
+
+def memory_repo():
+    db = MemorySupabase()
+    return SupabaseRepository(db, AsyncMemorySupabase(db))
+
+
+def duckdb_repo():
+    pytest.importorskip("duckdb")
+    from app.db.duckdb_repository import DuckDBRepository
+
+    return DuckDBRepository(":memory:")
+
+
+@pytest.fixture(params=[memory_repo, duckdb_repo], ids=["memory", "duckdb"])
+def repo(request):
+    repo = request.param()
+    yield repo
+    repo.close()
+
+
+def analysis(stock_id: str, end: str, created_at: str):
+    return {
+        "stock_id": stock_id,
+        "date_range_start": "2024-01-01",
+        "date_range_end": end,
+        "rsi": 50.0,
+        "macd": 0.1,
+        "hist": 0.02,
+        "signal": "neutral",
+        "summary": f"thesis to {end}",
+        "created_at": created_at,
+    }
+
+
+def test_ohlc_upsert_replaces_dates_and_scans_ranges(repo, ohlc_frame):
+    stock_id = repo.get_or_create_stock("AAA")["id"]
+    assert repo.get_or_create_stock("AAA")["id"] == stock_id
+    assert repo.find_stock_id("AAA") == stock_id
+    assert repo.find_stock_id("BBB") is None
+
+    assert repo.upsert_ohlc(stock_id, ohlc_frame(3, 1, 2), "a") == 3
+    assert repo.upsert_ohlc(stock_id, ohlc_frame(2, 4, close=7.5), "b") == 2
+
+    columns = repo.ohlc_columns(stock_id)
+    assert columns["date"].tolist() == ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04"]
+    assert columns["close"].tolist() == [1.0, 7.5, 3.0, 7.5]
+    assert columns["volume"].dtype.kind == "i"
+    window = asyncio.run(repo.ohlc_columns_async(stock_id, "2024-01-02", "2024-01-03"))
+    assert window["date"].tolist() == ["2024-01-02", "2024-01-03"]
+    page = repo.ohlc_columns(stock_id, None, "2024-01-03", after="2024-01-01", limit=5)
+    assert page["date"].tolist() == ["2024-01-02", "2024-01-03"]
+    page = asyncio.run(repo.ohlc_columns_async(stock_id, after="2024-01-01", limit=1))
+    assert page["date"].tolist() == ["2024-01-02"]
+
+    coverage = repo.stock_coverage()
+    summary = [
+        (row["ticker"], row["min_date"], row["max_date"], row["row_count"])
+        for row in coverage
+    ]
+    assert summary == [("AAA", "2024-01-01", "2024-01-04", 4)]
+    assert coverage[0]["last_ingested_at"]
+
+    other = repo.get_or_create_stock("BBB")["id"]
+    repo.upsert_ohlc(other, ohlc_frame(1), "c")
+    assert repo.last_ingest(None)["ticker"] == "BBB"
+    assert asyncio.run(repo.last_ingest_async("AAA"))["ticker"] == "AAA"
+    assert repo.last_ingest("CCC") is None
+
+
+def test_analyses_page_newest_first_and_match_end_dates(repo):
+    aaa = repo.get_or_create_stock("AAA")["id"]
+    bbb = repo.get_or_create_stock("BBB")["id"]
+    for day in (1, 2, 3):
+        repo.insert_analysis(analysis(aaa, f"2024-01-0{day}", f"2024-02-0{day}T00:00:00+00:00"))
+    stored = repo.insert_analysis(analysis(bbb, "2024-01-09", "2024-02-01T00:00:00+00:00"))
+
+    columns = ("id", "date_range_end", "created_at")
+    first = repo.list_analyses(aaa, columns, None, 2)
+    assert [row["date_range_end"] for row in first] == ["2024-01-03", "2024-01-02"]
+    rest = asyncio.run(repo.list_analyses_async(aaa, columns, first[-1]["created_at"], 2))
+    assert [row["date_range_end"] for row in rest] == ["2024-01-01"]
+
+    detail = repo.get_analysis(stored["id"], ("summary", "hist"))
+    assert detail == {"summary": "thesis to 2024-01-09", "hist": 0.02}
+
+    newest = repo.last_analysis(aaa)
+    assert newest == {"id": first[0]["id"], "created_at": first[0]["created_at"]}
+    assert asyncio.run(repo.last_analysis_async(None)) == newest
+    assert repo.last_analysis(repo.get_or_create_stock("CCC")["id"]) is None
+
+    latest = repo.latest_analyses()
+    assert [(row["ticker"], row["date_range_end"]) for row in latest] == [
+        ("AAA", "2024-01-03"),
+        ("BBB", "2024-01-09"),
+    ]
+    recent = repo.recent_analyses(aaa, "2024-01-04", 1, 10)
+    assert [row["date_range_end"] for row in recent] == ["2024-01-03"]
+
+
+def test_analyses_created_at_the_same_instant_page_by_id(repo):
+    stock_id = repo.get_or_create_stock("AAA")["id"]
+    for day in range(1, 6):
+        repo.insert_analysis(analysis(stock_id, f"2024-01-0{day}", "2024-02-01T00:00:00+00:00"))
+    repo.insert_analysis(analysis(stock_id, "2024-01-09", "2024-01-31T00:00:00+00:00"))
+
+    columns = ("id", "date_range_end", "created_at")
+    seen, cursor = [], None
+    while True:
+        page = repo.list_analyses(stock_id, columns, cursor, 2)
+        if not page:
+            break
+        seen += page
+        cursor = analysis_cursor(page[-1])
+    assert [row["date_range_end"] for row in seen][-1] == "2024-01-09"
+    assert len({row["id"] for row in seen}) == len(seen) == 6
+    assert [row["id"] for row in seen[:5]] == sorted((row["id"] for row in seen[:5]), reverse=True)
+
+    # Cursors handed out before ids were part of them still page by time alone
+    older = repo.list_analyses(stock_id, columns, seen[0]["created_at"], 10)
+    assert [row["date_range_end"] for row in older] == ["2024-01-09"]
+
+
+def test_enqueue_embedding_is_idempotent():
+    db = MemorySupabase()
+    repo = SupabaseRepository(db, AsyncMemorySupabase(db))
+    stock_id = repo.get_or_create_stock("AAA")["id"]
+    stored = repo.insert_analysis(analysis(stock_id, "2024-01-02", "2024-02-01T00:00:00+00:00"))
+
+    repo.enqueue_embedding(stored["id"])
+    repo.enqueue_embedding(stored["id"])
+    asyncio.run(repo.enqueue_embedding_async(stored["id"]))
+    queued = db.tables[PENDING_EMBEDDINGS_TABLE]
+    assert [row["analysis_id"] for row in queued] == [stored["id"]]
+
+
+def test_duckdb_backend_skips_embedding(monkeypatch):
+    repo = duckdb_repo()
+    monkeypatch.setattr(graph, "get_repository", lambda: repo)
+    monkeypatch.setattr(main, "get_repository", lambda: repo)
+
+    def unreachable(*args, **kwargs):
+        raise AssertionError("embedding needs Postgres")
+
+    monkeypatch.setattr(graph, "embed_text", unreachable)
+    monkeypatch.setattr(graph, "get_embedding_batcher", unreachable)
+    monkeypatch.setattr(graph.embedding_worker, "wake", unreachable)
+    monkeypatch.setattr(main.embedding_worker, "start", unreachable)
+    monkeypatch.setattr(main, "prune_checkpoints", lambda: None)
+    monkeypatch.setattr(settings, "database_backend", "memory")  # no clients to open
+    monkeypatch.setattr(settings, "embedding_worker_enabled", True)
+
+    state = {"analysis_id": "a", "final_report": "thesis"}
+    for deferred in (True, False):
+        monkeypatch.setattr(settings, "embedding_deferred", deferred)
+        assert graph.embed_report(state) == {"embedding_status": "disabled"}
+        assert graph.index_embedding(state) == {"embedding_status": "disabled"}
+        assert asyncio.run(graph.aindex_embedding(state)) == {"embedding_status": "disabled"}
+
+    async def serve():
+        async with main.lifespan(main.app):
+            pass
+
+    asyncio.run(serve())
+    repo.close()
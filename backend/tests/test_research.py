@@ -0,0 +1,50 @@
+import pytest
+
+from app.agents import researcher
+from app.agents.researcher import parse_batch_response, plan_batches, run_batch_research_agent
+
+
+def _state(ticker: str) -> dict:
+    return {
+        "ticker": ticker,
+        "start_date": "2024-01-01",
+        "end_date": "2024-03-31",
+        "indicators": {"rsi": 55.0, "macd": 0.4, "hist": 0.1, "signal": "neutral"},
+    }
+
+
+def test_parse_batch_response_strips_code_fence():
+    response = (
+        '```json\n[{"ticker": "AAPL", "research_notes": "- uptrend", '
+        '"investment_thesis": "Hold."}]\n```'
+    )
+    parsed = parse_batch_response(response)
+    assert parsed == {"AAPL": {"research_summary": "- uptrend", "final_report": "Hold."}}
+
+
+def test_parse_batch_response_rejects_non_json():
+    with pytest.raises(ValueError):
+        parse_batch_response("RESEARCH NOTES: ...")
+
+
+def test_plan_batches_respects_ticker_limit(monkeypatch):
+    monkeypatch.setattr(researcher.settings, "research_batch_max_tickers", 3)
+    batches = plan_batches([_state(f"T{i}") for i in range(7)])
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+
+
+def test_batch_research_falls_back_for_missing_tickers(monkeypatch):
+    prompts = []
+
+    def fake_generate(prompt: str) -> str:
+        prompts.append(prompt)
+        if len(prompts) == 1:
+            return '[{"ticker": "AAA", "research_notes": "n", "investment_thesis": "Buy."}]'
+        return "RESEARCH NOTES:\nflat\nINVESTMENT THESIS:\nHold."
+
+    monkeypatch.setattr(researcher, "generate_text", fake_generate)
+    states = run_batch_research_agent([_state("AAA"), _state("BBB")])
+
+    assert len(prompts) == 2
+    assert states[0]["final_report"] == "Buy."
+    assert states[1]["final_report"] == "Hold."
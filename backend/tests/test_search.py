@@ -0,0 +1,31 @@
+import asyncio
+
+import httpx
+
+from app.api.routes import search
+from app.main import app
+
+
+def get(**params):
+    async def send():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/search", params=params)
+
+    return asyncio.run(send())
+
+
+def test_search_by_analysis_id_validates_it_before_querying(monkeypatch):
+    fetched = []
+
+    async def fetch(analysis_id):
+        fetched.append(analysis_id)
+        return None
+
+    monkeypatch.setattr(search, "fetch_analysis_embedding_async", fetch)
+    assert get(analysis_id="not-a-uuid").status_code == 422
+    assert fetched == []
+
+    analysis_id = "6f1c1f7e-2a5b-4c1e-9f0e-0d6a5b1e2c3d"
+    assert get(analysis_id=analysis_id).status_code == 404
+    assert fetched == [analysis_id]
@@ -0,0 +1,58 @@
+from app.agents import semantic_cache
+from app.agents.graph import route_after_semantic_cache
+from app.agents.semantic_cache import fetch_prior_analyses, run_semantic_cache
+
+
+def _state() -> dict:
+    return {
+        "ticker": "AAA",
+        "stock_id": "s1",
+        "start_date": "2024-01-02",
+        "end_date": "2024-04-01",
+        "indicators": {"rsi": 55.0, "macd": 0.4, "hist": 0.1, "signal": "neutral"},
+    }
+
+
+def _prior(start: str, end: str) -> dict:
+    return {
+        "id": "a1",
+        "rsi": 56.0,
+        "macd": 0.35,
+        "hist": 0.08,
+        "signal": "neutral",
+        "date_range_start": start,
+        "date_range_end": end,
+        "summary": f"Over {start} to {end} the trend held.",
+    }
+
+
+def test_reuses_prior_thesis_within_window_tolerance(monkeypatch):
+    monkeypatch.setattr(semantic_cache.settings, "semantic_cache_enabled", True)
+    monkeypatch.setattr(semantic_cache, "get_repository", lambda: None)
+    monkeypatch.setattr(
+        semantic_cache,
+        "fetch_recent_analyses",
+        lambda *args, **kwargs: [_prior("2024-01-01", "2024-03-31")],
+    )
+
+    state = _state()
+    state.update(fetch_prior_analyses(state))
+    state.update(run_semantic_cache(state))
+    assert state["reused_analysis_id"] == "a1"
+    assert state["final_report"] == "Over 2024-01-02 to 2024-04-01 the trend held."
+    assert route_after_semantic_cache(state) == "store_results"
+
+
+def test_skips_prior_with_different_window(monkeypatch):
+    monkeypatch.setattr(semantic_cache.settings, "semantic_cache_enabled", True)
+    state = {**_state(), "prior_analyses": [_prior("2023-04-01", "2024-03-31")]}
+    state.update(run_semantic_cache(state))
+    assert state["reused_analysis_id"] is None
+    assert route_after_semantic_cache(state) == "research"
+
+
+def test_skips_prior_with_drifted_indicators(monkeypatch):
+    monkeypatch.setattr(semantic_cache.settings, "semantic_cache_enabled", True)
+    prior = {**_prior("2024-01-01", "2024-03-31"), "rsi": 60.0}
+    state = {**_state(), "prior_analyses": [prior]}
+    assert run_semantic_cache(state) == {"reused_analysis_id": None}
@@ -0,0 +1,38 @@
+import pytest
+
+from app.core.metrics import MetricsRegistry
+from app.core.timing import current_timings, span, start_request, traced
+
+
+def test_spans_attach_to_current_request():
+    timings = start_request()
+
+    @traced("db.fetch")
+    def fetch():
+        return [1, 2, 3]
+
+    fetch()
+    fetch()
+    with pytest.raises(ValueError):
+        with span("node.research", ticker="AAA"):
+            raise ValueError("boom")
+
+    breakdown = current_timings().breakdown()
+    assert [entry["name"] for entry in breakdown] == ["db.fetch", "db.fetch", "node.research"]
+    assert breakdown[0]["rows"] == 3
+    assert breakdown[2]["error"] is True
+    assert timings.server_timing().startswith('db-fetch;dur=')
+    assert '"2 calls"' in timings.server_timing()
+
+
+def test_histogram_rendering_and_quantile():
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 2.0):
+        registry.observe("latency_seconds", value, route="/analyze")
+
+    text = registry.render_prometheus()
+    assert 'latency_seconds_bucket{route="/analyze",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/analyze",le="1.0"} 3' in text
+    assert 'latency_seconds_bucket{route="/analyze",le="+Inf"} 4' in text
+    assert registry.summary_mean("latency_seconds", route="/analyze") == pytest.approx(0.7625)
+    assert 0.1 < registry.quantile("latency_seconds", 0.5, route="/analyze") <= 1.0
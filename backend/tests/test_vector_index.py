@@ -0,0 +1,86 @@
+from contextlib import contextmanager
+from datetime import date, datetime
+
+from app.services import semantic_search
+from app.services.vector_index import IndexedAnalysis, VectorIndex
+
+
+def _index() -> VectorIndex:
+    index = VectorIndex(dimensions=3)
+    index.add(
+        [
+            IndexedAnalysis("a1", "AAA", datetime(2024, 1, 5)),
+            IndexedAnalysis("a2", "AAA", datetime(2024, 2, 5)),
+            IndexedAnalysis("b1", "BBB", datetime(2024, 2, 6)),
+        ],
+        [[1.0, 0.0, 0.0], [0.9, 0.1, 0.0], [0.0, 1.0, 0.0]],
+    )
+    return index
+
+
+def test_search_ranks_by_cosine_similarity():
+    matches = _index().search([1.0, 0.0, 0.0], limit=2)
+    assert [m.analysis_id for m in matches] == ["a1", "a2"]
+    assert matches[0].score > matches[1].score
+
+
+def test_search_applies_filters_before_ranking():
+    index = _index()
+    matches = index.search([1.0, 0.0, 0.0], limit=5, ticker="BBB")
+    assert [m.analysis_id for m in matches] == ["b1"]
+
+    matches = index.search([1.0, 0.0, 0.0], limit=5, start_date=date(2024, 2, 1), exclude_id="b1")
+    assert [m.analysis_id for m in matches] == ["a2"]
+
+
+class _FakeRefreshDb:
+    """Answers LocalSearchIndex refresh pages from a list of committed embeddings."""
+
+    def __init__(self):
+        self.rows = []
+
+    @contextmanager
+    def connection(self):
+        yield self
+
+    @contextmanager
+    def cursor(self):
+        yield self
+
+    def execute(self, sql, params):
+        after = params["after"]
+        rows = sorted(
+            row
+            for row in self.rows
+            if after is None or (row[3], row[0]) > (after, params["after_id"])
+        )[: params["limit"]]
+        self._page = [
+            row[:4] + (None if row[0] in params["loaded"] else row[4],) for row in rows
+        ]
+
+    def fetchall(self):
+        return self._page
+
+
+def test_local_refresh_picks_up_embeddings_committed_behind_the_high_water(monkeypatch):
+    db = _FakeRefreshDb()
+    monkeypatch.setattr(semantic_search, "get_pg_connection", db.connection)
+    index = semantic_search.LocalSearchIndex(3, 0.0, lookback_seconds=60.0, page_size=2)
+
+    def commit(analysis_id, minute):
+        stamp = datetime(2024, 2, 1, 12, minute)
+        db.rows.append((analysis_id, "AAA", stamp, stamp, [1.0, float(minute), 0.0]))
+
+    commit("a1", 0)
+    commit("a2", 1)
+    commit("a3", 5)
+    index.refresh()
+    assert len(index.index) == 3
+
+    # Its transaction started before a3's but committed after the last refresh
+    commit("a4", 4)
+    index.refresh()
+    assert len(index.index) == 4
+    assert index.index.vector("a4") is not None
+    index.refresh()
+    assert len(index.index) == 4
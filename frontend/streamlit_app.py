@@ -1,6 +1,8 @@
 import json
 import os
+import threading
 import time
+from collections import OrderedDict
 from datetime import date, timedelta
 
 import plotly.graph_objects as go
@@ -21,6 +23,11 @@ BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
 PING_REQUEST_TIMEOUT = 20
 PING_INTERVAL_SECS = 3
 PING_ATTEMPT_LIMIT = 10
+OHLC_COLUMNS = ("date", "open", "high", "low", "close", "volume")
+# Candles the chart can usefully show; longer ranges are bucketed by the backend
+CHART_MAX_POINTS = 600
+# Bodies kept for revalidation, least recently used dropped first
+VALIDATED_MAX_ENTRIES = 256
 
 SIGNAL_COLORS = {
     "bullish": "#00c48c",
@@ -204,47 +211,97 @@ if not st.session_state.backend_ready:
     st.rerun()
 
 
+@st.cache_resource
+def _validated_responses() -> tuple[OrderedDict, threading.Lock]:
+    # Shared by every session, so guarded by a lock
+    return OrderedDict(), threading.Lock()
+
+
+def get_json(path: str, params: dict | None = None, timeout: int = 10) -> dict:
+    """GET with If-None-Match, reusing the last body when the backend answers 304."""
+    validated, lock = _validated_responses()
+    key = (path, tuple(sorted((params or {}).items())))
+    with lock:
+        cached = validated.get(key)
+        if cached is not None:
+            validated.move_to_end(key)
+    headers = {"If-None-Match": cached[0]} if cached is not None else {}
+    response = requests.get(
+        f"{BACKEND_URL}{path}", params=params, headers=headers, timeout=timeout
+    )
+    if response.status_code == 304 and cached is not None:
+        return cached[1]
+    response.raise_for_status()
+    body = response.json()
+    if "ETag" in response.headers:
+        with lock:
+            validated[key] = (response.headers["ETag"], body)
+            validated.move_to_end(key)
+            while len(validated) > VALIDATED_MAX_ENTRIES:
+                validated.popitem(last=False)
+    return body
+
+
 @st.cache_data(ttl=60)
 def fetch_stocks() -> list[dict]:
     try:
-        response = requests.get(f"{BACKEND_URL}/stocks", timeout=10)
-        response.raise_for_status()
-        return response.json().get("stocks", [])
+        return get_json("/stocks").get("stocks", [])
     except Exception:
         return []
 
 
 @st.cache_data(ttl=30)
-def fetch_analyses(ticker: str) -> list[dict]:
+def fetch_analyses(ticker: str, before: str | None = None) -> dict:
+    """One page of analysis metadata, newest first; theses come from fetch_thesis."""
+    params = {"ticker": ticker, **({"before": before} if before else {})}
     try:
-        response = requests.get(f"{BACKEND_URL}/analyses", params={"ticker": ticker}, timeout=10)
-        response.raise_for_status()
-        return response.json().get("analyses", [])
+        return get_json("/analyses", params)
     except Exception:
-        return []
+        return {"analyses": [], "next_cursor": None}
+
+
+@st.cache_data(ttl=3600)
+def fetch_thesis(analysis_id: str) -> str:
+    try:
+        return get_json(f"/analyses/{analysis_id}").get("summary") or "No summary available."
+    except Exception:
+        return "Could not load the thesis."
 
 
 @st.cache_data(ttl=60)
 def fetch_ohlc(ticker: str, start_date: str | None = None, end_date: str | None = None) -> dict:
+    """Columnar OHLC (parallel date/open/high/low/close/volume lists) for the chart."""
+    columns: dict[str, list] = {name: [] for name in OHLC_COLUMNS}
     try:
-        params: dict[str, str] = {"ticker": ticker}
+        params: dict[str, str | int] = {
+            "ticker": ticker,
+            "format": "columns",
+            "max_points": CHART_MAX_POINTS,
+        }
         if start_date:
             params["start_date"] = start_date
         if end_date:
             params["end_date"] = end_date
-        response = requests.get(f"{BACKEND_URL}/ohlc", params=params, timeout=10)
-        response.raise_for_status()
-        return response.json()
+        while True:
+            page = get_json("/ohlc", params)
+            for name in OHLC_COLUMNS:
+                columns[name].extend(page[name])
+            if not page.get("next_cursor"):
+                break
+            params["after"] = page["next_cursor"]
     except Exception:
-        return {"ticker": ticker, "data": []}
+        columns = {name: [] for name in OHLC_COLUMNS}
+    return {"ticker": ticker, **columns}
 
 
 @st.cache_data(ttl=30)
-def latest_signal(ticker: str) -> str:
-    analyses = fetch_analyses(ticker)
-    if analyses:
-        return analyses[0].get("signal", "neutral").lower()
-    return "neutral"
+def fetch_latest_signals() -> dict[str, str]:
+    """Signal of the newest analysis per ticker, from one request for the whole sidebar."""
+    try:
+        latest = get_json("/analyses/latest").get("analyses", [])
+    except Exception:
+        return {}
+    return {row["ticker"]: (row.get("signal") or "neutral").lower() for row in latest}
 
 
 with st.spinner(""):
@@ -298,9 +355,10 @@ with st.sidebar:
     if not filtered_tickers:
         st.caption("No stocks match your search.")
     else:
+        signals = fetch_latest_signals()
         for ticker in filtered_tickers:
             info = stock_map[ticker]
-            sig = latest_signal(ticker)
+            sig = signals.get(ticker, "neutral")
             s_color = SIGNAL_COLORS.get(sig, SIGNAL_COLORS["neutral"])
             s_bg = SIGNAL_BG.get(sig, SIGNAL_BG["neutral"])
             is_active = ticker == st.session_state.selected_stock
@@ -335,18 +393,20 @@ with st.sidebar:
         fetch_stocks.clear()
         fetch_analyses.clear()
         fetch_ohlc.clear()
-        latest_signal.clear()
+        fetch_latest_signals.clear()
         st.rerun()
 
 
 selected_ticker: str = st.session_state.selected_stock
 stock_info = stock_map.get(selected_ticker, {})
 
-analyses = fetch_analyses(selected_ticker)
-ohlc_response = fetch_ohlc(selected_ticker)
-ohlc_data = ohlc_response.get("data", [])
+history = fetch_analyses(selected_ticker)
+analyses = history["analyses"]
+ohlc = fetch_ohlc(selected_ticker)
+# The chart series is downsampled, so count days from the coverage summary
+trading_days = stock_info.get("row_count") or len(ohlc["date"])
 
-latest_close = ohlc_data[-1]["close"] if ohlc_data else None
+latest_close = ohlc["close"][-1] if ohlc["close"] else None
 latest_sig = analyses[0].get("signal", "neutral").lower() if analyses else "neutral"
 
 
@@ -377,11 +437,13 @@ st.markdown(
                     <p class="stat-label">Latest Close</p>
                 </div>
                 <div class="stat-block">
-                    <p class="stat-value">{len(ohlc_data)}</p>
+                    <p class="stat-value">{trading_days}</p>
                     <p class="stat-label">Trading Days</p>
                 </div>
                 <div class="stat-block">
-                    <p class="stat-value">{len(analyses)}</p>
+                    <p class="stat-value">
+                        {len(analyses)}{"+" if history["next_cursor"] else ""}
+                    </p>
                     <p class="stat-label">Analyses Run</p>
                 </div>
             </div>
@@ -392,13 +454,13 @@ st.markdown(
 )
 
 
-if ohlc_data:
-    dates = [d["date"] for d in ohlc_data]
-    opens = [d["open"] for d in ohlc_data]
-    highs = [d["high"] for d in ohlc_data]
-    lows = [d["low"] for d in ohlc_data]
-    closes = [d["close"] for d in ohlc_data]
-    volumes = [d.get("volume", 0) for d in ohlc_data]
+if ohlc["date"]:
+    dates = ohlc["date"]
+    opens = ohlc["open"]
+    highs = ohlc["high"]
+    lows = ohlc["low"]
+    closes = ohlc["close"]
+    volumes = ohlc["volume"]
     vol_colors = ["#00c48c" if closes[i] >= opens[i] else "#ff4b4b" for i in range(len(closes))]
 
     fig = make_subplots(
@@ -555,6 +617,16 @@ if st.session_state.active_tab == "history":
             unsafe_allow_html=True,
         )
     else:
+        # Later pages stay loaded across reruns until the ticker changes
+        pages_key = f"history_pages_{selected_ticker}"
+        cursor = history["next_cursor"]
+        for _ in range(st.session_state.get(pages_key, 1) - 1):
+            if not cursor:
+                break
+            page = fetch_analyses(selected_ticker, cursor)
+            analyses = analyses + page["analyses"]
+            cursor = page["next_cursor"]
+
         for analysis in analyses:
             sig = analysis.get("signal", "neutral").lower()
             s_color = SIGNAL_COLORS.get(sig, SIGNAL_COLORS["neutral"])
@@ -564,7 +636,6 @@ if st.session_state.active_tab == "history":
             d_start = analysis.get("date_range_start", "—")
             d_end = analysis.get("date_range_end", "—")
             created = analysis.get("created_at", "")[:16].replace("T", " ")
-            summary = analysis.get("summary", "No summary available.")
 
             st.markdown(
                 f"""
@@ -598,12 +669,17 @@ if st.session_state.active_tab == "history":
                 unsafe_allow_html=True,
             )
 
-            with st.expander("View AI Thesis", expanded=False):
+            # Theses are fetched only when opened
+            if st.toggle("View AI Thesis", key=f"thesis_{analysis['id']}"):
                 st.markdown(
-                    f'<p class="thesis-text">{summary}</p>',
+                    f'<p class="thesis-text">{fetch_thesis(analysis["id"])}</p>',
                     unsafe_allow_html=True,
                 )
 
+        if cursor and st.button("Load older analyses", use_container_width=True):
+            st.session_state[pages_key] = st.session_state.get(pages_key, 1) + 1
+            st.rerun()
+
 
 else:
     st.markdown("<div style='padding-top:0.5rem'>", unsafe_allow_html=True)
@@ -773,7 +849,7 @@ else:
                 )
 
             fetch_analyses.clear()
-            latest_signal.clear()
+            fetch_latest_signals.clear()
         else:
             step_placeholder.empty()
             st.error(f"Analysis failed: {api_response.text}")
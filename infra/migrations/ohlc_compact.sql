@@ -0,0 +1,93 @@
+-- Converts ohlc_daily from the original layout (uuid id, numeric prices, per-row
+-- source_file_hash and created_at, key indexed twice) to the compact one in supabase.sql.
+--
+--   psql "$SUPABASE_DB_URL" -f infra/migrations/ohlc_compact.sql
+--
+-- Apply the current infra/supabase.sql first (it adds stock_coverage.last_source_file_hash).
+-- The table is locked until the copy commits, so run it while nothing is ingesting.
+-- The old table is kept as ohlc_daily_legacy; drop it once the row counts below match.
+
+\set ON_ERROR_STOP on
+
+begin;
+
+lock table ohlc_daily in access exclusive mode;
+
+-- Every column is not null in the compact layout. Rather than leave incomplete bars
+-- behind, stop here (nothing has changed yet) so they can be fixed or deleted first.
+do $$
+declare
+    incomplete bigint;
+begin
+    select count(*) into incomplete
+    from ohlc_daily
+    where stock_id is null or date is null
+       or open is null or high is null or low is null or close is null or volume is null;
+    if incomplete > 0 then
+        raise exception 'ohlc_daily has % rows with null columns', incomplete
+            using hint = 'Fix or delete them, then rerun; the migration changed nothing.';
+    end if;
+end
+$$;
+
+alter table ohlc_daily rename to ohlc_daily_legacy;
+alter table ohlc_daily_legacy rename constraint ohlc_daily_pkey to ohlc_daily_legacy_pkey;
+drop index if exists idx_ohlc_stock_date;
+
+-- double precision, not real: float4 keeps ~7 significant digits, too few for prices
+-- above 100k with cents, and the API works in float64 anyway.
+create table ohlc_daily (
+    stock_id uuid not null references stocks(id),
+    date date not null,
+    open double precision not null,
+    high double precision not null,
+    low double precision not null,
+    close double precision not null,
+    volume bigint not null,
+    primary key (stock_id, date)
+);
+
+-- Partitioning only pays off for very large universes, where each partition's key index
+-- stays cache-resident. To use it, replace the create table above with:
+--
+--   create table ohlc_daily (...same columns...) partition by hash (stock_id);
+--   create table ohlc_daily_p0 partition of ohlc_daily
+--       for values with (modulus 8, remainder 0);
+--   ...one per remainder up to 7
+--
+-- and skip the cluster step below (cluster each partition instead).
+
+-- Inserted in key order, so each stock's bars are physically contiguous and a range
+-- scan reads a few adjacent heap pages instead of one page per bar
+insert into ohlc_daily (stock_id, date, open, high, low, close, volume)
+select stock_id, date, open::float8, high::float8, low::float8, close::float8, volume
+from ohlc_daily_legacy
+order by stock_id, date;
+
+-- Keep the provenance the per-row hash carried: the file behind each stock's last ingest
+update stock_coverage c
+set last_source_file_hash = latest.source_file_hash
+from (
+    select distinct on (stock_id) stock_id, source_file_hash
+    from ohlc_daily_legacy
+    where stock_id is not null
+    order by stock_id, created_at desc
+) latest
+where latest.stock_id = c.stock_id and c.last_source_file_hash is null;
+
+commit;
+
+-- Later ingests append at the end of the heap; after large backfills run
+-- `cluster ohlc_daily;` (exclusive lock while it rewrites) to restore the key order.
+-- That order is also why there is no BRIN index on date: BRIN needs date to follow
+-- physical order, and here it only does within each stock.
+alter table ohlc_daily cluster on ohlc_daily_pkey;
+analyze ohlc_daily;
+
+select
+    (select count(*) from ohlc_daily_legacy) as legacy_rows,
+    (select count(*) from ohlc_daily) as compact_rows,
+    pg_size_pretty(pg_total_relation_size('ohlc_daily_legacy')) as legacy_size,
+    pg_size_pretty(pg_total_relation_size('ohlc_daily')) as compact_size;
+
+-- drop table ohlc_daily_legacy;
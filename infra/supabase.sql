@@ -10,18 +10,17 @@ create table if not exists stocks (
     created_at timestamp default now()
 );
 
+-- Narrow fixed-width rows keyed by (stock_id, date); infra/migrations/ohlc_compact.sql
+-- converts tables created with the earlier uuid/numeric layout
 create table if not exists ohlc_daily (
-    id uuid primary key default gen_random_uuid(),
-    stock_id uuid references stocks(id),
+    stock_id uuid not null references stocks(id),
     date date not null,
-    open numeric,
-    high numeric,
-    low numeric,
-    close numeric,
-    volume bigint,
-    source_file_hash text,
-    created_at timestamp default now(),
-    unique (stock_id, date)
+    open double precision not null,
+    high double precision not null,
+    low double precision not null,
+    close double precision not null,
+    volume bigint not null,
+    primary key (stock_id, date)
 );
 
 create table if not exists analyses (
@@ -44,5 +43,131 @@ create table if not exists analysis_embeddings (
     created_at timestamp default now()
 );
 
-create index if not exists idx_ohlc_stock_date on ohlc_daily (stock_id, date);
 create index if not exists idx_analysis_stock on analyses (stock_id);
+
+create table if not exists embedding_cache (
+    content_hash text not null,
+    model text not null,
+    embedding vector not null,
+    created_at timestamp default now(),
+    primary key (content_hash, model)
+);
+
+create unique index if not exists idx_analysis_embeddings_analysis
+    on analysis_embeddings (analysis_id);
+-- SEARCH_BACKEND=local refreshes by keyset over (created_at, analysis_id)
+create index if not exists idx_analysis_embeddings_created
+    on analysis_embeddings (created_at, analysis_id);
+
+create table if not exists pending_embeddings (
+    analysis_id uuid primary key references analyses(id) on delete cascade,
+    attempts integer not null default 0,
+    last_error text,
+    next_attempt_at timestamp not null default now(),
+    created_at timestamp default now()
+);
+
+create index if not exists idx_pending_embeddings_due
+    on pending_embeddings (next_attempt_at);
+
+-- HNSW on plain vector stops at 2000 dimensions; index a half-precision copy instead
+-- (pgvector >= 0.7). Searches re-rank the index candidates at full precision.
+create index if not exists idx_analysis_embeddings_hnsw
+    on analysis_embeddings using hnsw ((embedding::halfvec(3072)) halfvec_cosine_ops);
+create index if not exists idx_analysis_created on analyses (created_at);
+
+alter table analyses add column if not exists hist numeric;
+
+-- One row per stock with ingested OHLC, kept current by the loader so /stocks is one query
+create table if not exists stock_coverage (
+    stock_id uuid primary key references stocks(id) on delete cascade,
+    ticker text not null,
+    min_date date not null,
+    max_date date not null,
+    row_count bigint not null,
+    last_ingested_at timestamp not null default now()
+);
+
+create index if not exists idx_stock_coverage_ticker on stock_coverage (ticker);
+-- ETag/Last-Modified of /stocks read the newest ingest across all tickers
+create index if not exists idx_stock_coverage_last_ingested
+    on stock_coverage (last_ingested_at desc);
+
+-- Recomputes from the (stock_id, date) key, so re-ingesting overlapping dates keeps counts
+-- exact. The source file hash is kept here once per ingest rather than on every bar.
+alter table stock_coverage add column if not exists last_source_file_hash text;
+drop function if exists refresh_stock_coverage(uuid);
+create or replace function refresh_stock_coverage(
+    p_stock_id uuid, p_source_file_hash text default null
+)
+returns void
+language sql
+as $$
+    insert into stock_coverage (
+        stock_id, ticker, min_date, max_date, row_count, last_ingested_at, last_source_file_hash
+    )
+    select s.id, s.ticker, min(o.date), max(o.date), count(*), now(), p_source_file_hash
+    from stocks s
+    join ohlc_daily o on o.stock_id = s.id
+    where s.id = p_stock_id
+    group by s.id, s.ticker
+    on conflict (stock_id) do update set
+        min_date = excluded.min_date,
+        max_date = excluded.max_date,
+        row_count = excluded.row_count,
+        last_ingested_at = excluded.last_ingested_at,
+        last_source_file_hash = excluded.last_source_file_hash;
+$$;
+
+-- Backfill stocks ingested before stock_coverage existed
+insert into stock_coverage (stock_id, ticker, min_date, max_date, row_count)
+select s.id, s.ticker, min(o.date), max(o.date), count(*)
+from stocks s
+join ohlc_daily o on o.stock_id = s.id
+group by s.id, s.ticker
+on conflict (stock_id) do nothing;
+
+-- History pages are keyset scans by (stock_id, created_at desc, id desc), the id ordering
+-- analyses created at the same instant; the included columns make them index-only, and
+-- summary stays out of the index since pages leave it out
+create index if not exists idx_analyses_stock_created_id
+    on analyses (stock_id, created_at desc, id desc)
+    include (date_range_start, date_range_end, rsi, macd, signal);
+drop index if exists idx_analyses_stock_created;
+drop index if exists idx_analysis_stock;
+
+-- Newest analysis per stock in one call. A LIMIT 1 lateral probe of
+-- idx_analyses_stock_created_id per stock costs O(stocks), where DISTINCT ON over analyses
+-- would read every analysis
+create or replace function latest_analyses(p_tickers text[] default null)
+returns table (
+    ticker text,
+    id uuid,
+    date_range_start date,
+    date_range_end date,
+    rsi numeric,
+    macd numeric,
+    signal text,
+    created_at timestamp
+)
+language sql
+stable
+as $$
+    select s.ticker, a.id, a.date_range_start, a.date_range_end, a.rsi, a.macd, a.signal,
+           a.created_at
+    from stocks s
+    cross join lateral (
+        -- Only the returned columns, so the probe stays index-only and never reads summary
+        select analyses.id, analyses.date_range_start, analyses.date_range_end, analyses.rsi,
+               analyses.macd, analyses.signal, analyses.created_at
+        from analyses
+        where analyses.stock_id = s.id
+        order by analyses.created_at desc, analyses.id desc
+        limit 1
+    ) a
+    where p_tickers is null or s.ticker = any(p_tickers)
+    order by s.ticker;
+$$;
+
+-- The (stock_id, date) key already serves every range scan
+drop index if exists idx_ohlc_stock_date;